@@ -0,0 +1,214 @@
+"""
+Respostas Condicionais e Compressão
+ETags derivadas da impressão dos dados (304 antes de serializar) e gzip/brotli acima de um tamanho mínimo
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, Optional
+
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+# Sufixo da ETag por codificação: a representação comprimida é outra
+# sequência de bytes, então a ETag forte também muda
+SUFIXOS_CODIFICACAO = {"br": "-br", "gzip": "-gzip"}
+
+# Comprimir corpos grandes fora do event loop
+LIMITE_COMPRESSAO_NO_LOOP = 256 * 1024
+
+
+def etag(*partes: Any) -> str:
+    """
+    ETag forte a partir das partes que determinam a resposta (ticker, período,
+    intervalo, formato, impressão da última barra, versão dos indicadores...)
+    """
+    from ..services.indicadores_registro import VERSAO_INDICADORES
+
+    resumo = hashlib.blake2b(digest_size=16)
+    for parte in (VERSAO_INDICADORES, *partes):
+        resumo.update(parte if isinstance(parte, bytes) else repr(parte).encode())
+        resumo.update(b"\x1f")
+    return f'"{resumo.hexdigest()}"'
+
+
+def ultima_modificacao(dados: pd.DataFrame, intervalo: str = "1d") -> Optional[datetime]:
+    """
+    Data da última barra, só quando ela já está fechada (pregão anterior a
+    hoje). A barra do dia (ou a semana/mês em curso) muda sem mudar a data,
+    então nesses casos só a ETag vale como validador.
+    """
+    from ..services.calendario_service import FUSO_B3, calendario_service
+
+    if dados.empty or intervalo != "1d":
+        return None
+    ultima = pd.Timestamp(dados.index[-1])
+    ultima = ultima.tz_localize(FUSO_B3) if ultima.tz is None else ultima.tz_convert(FUSO_B3)
+    if ultima.date() >= calendario_service.agora().date():
+        return None
+    return ultima.to_pydatetime()
+
+
+def nao_modificado(request: Request, etag_atual: str,
+                   modificacao: Optional[datetime] = None) -> Optional[Response]:
+    """
+    304 se o cliente já tem esta versão (If-None-Match, ou If-Modified-Since
+    quando não há If-None-Match); None quando a resposta precisa ser montada
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if not _corresponde(if_none_match, etag_atual):
+            return None
+    elif modificacao is not None and request.headers.get("if-modified-since"):
+        try:
+            desde = parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            return None
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=timezone.utc)
+        if modificacao.replace(microsecond=0) > desde:
+            return None
+    else:
+        return None
+    return validadores(Response(status_code=304), etag_atual, modificacao)
+
+
+def validadores(resposta: Response, etag_atual: str, modificacao: Optional[datetime] = None) -> Response:
+    """
+    Coloca ETag/Last-Modified na resposta (no-cache: o navegador sempre
+    revalida; Vary: Accept porque o formato é negociado)
+    """
+    resposta.headers["ETag"] = etag_atual
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.headers["Vary"] = "Accept"
+    if modificacao is not None:
+        resposta.headers["Last-Modified"] = format_datetime(modificacao.astimezone(timezone.utc), usegmt=True)
+    return resposta
+
+
+def _corresponde(if_none_match: str, etag_atual: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110), ignorando o sufixo de codificação"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata.startswith("W/"):
+            candidata = candidata[2:]
+        for sufixo in SUFIXOS_CODIFICACAO.values():
+            if candidata.endswith(f'{sufixo}"'):
+                candidata = candidata[:-len(sufixo) - 1] + '"'
+                break
+        if candidata == etag_atual:
+            return True
+    return False
+
+
+def _codificacao(accept_encoding: str) -> Optional[str]:
+    """Melhor codificação aceita pelo cliente: br (se instalado) ou gzip"""
+    aceitas: List[str] = []
+    for item in accept_encoding.split(","):
+        partes = [p.strip() for p in item.split(";")]
+        qualidade = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith("q="):
+                try:
+                    qualidade = float(parametro[2:])
+                except ValueError:
+                    qualidade = 0.0
+        if qualidade > 0:
+            aceitas.append(partes[0].lower())
+    if brotli is not None and ("br" in aceitas or "*" in aceitas):
+        return "br"
+    if "gzip" in aceitas or "*" in aceitas:
+        return "gzip"
+    return None
+
+
+def _comprimir(corpo: bytes, codificacao: str, nivel_gzip: int, qualidade_brotli: int) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=qualidade_brotli)
+    return gzip.compress(corpo, compresslevel=nivel_gzip, mtime=0)
+
+
+class CompressaoMiddleware:
+    """
+    Middleware ASGI de compressão (br/gzip) das respostas com corpo único
+
+    Respostas em streaming, já codificadas, 304/204 ou menores que `minimo`
+    passam intactas. Corpos grandes são comprimidos numa thread para não
+    segurar o event loop.
+    """
+
+    def __init__(self, app, minimo: int = 1024, nivel_gzip: int = 6, qualidade_brotli: int = 4):
+        self.app = app
+        self.minimo = minimo
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requisicao = Headers(scope=scope)
+        codificacao = _codificacao(requisicao.get("accept-encoding", ""))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        repassar = False
+
+        async def enviar(mensagem):
+            nonlocal inicio, repassar
+            if mensagem["type"] == "http.response.start":
+                inicio = mensagem
+                return
+            if mensagem["type"] != "http.response.body" or repassar:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            cabecalhos = MutableHeaders(raw=inicio["headers"])
+            etag_atual = cabecalhos.get("etag")
+            if inicio["status"] == 304 and etag_atual:
+                # Devolve a ETag na forma em que o cliente a recebeu (com sufixo, se comprimida)
+                sufixada = etag_atual[:-1] + SUFIXOS_CODIFICACAO[codificacao] + '"'
+                if sufixada in requisicao.get("if-none-match", ""):
+                    cabecalhos["ETag"] = sufixada
+                    cabecalhos.add_vary_header("Accept-Encoding")
+            if (mensagem.get("more_body", False) or len(corpo) < self.minimo
+                    or inicio["status"] in (204, 304) or "content-encoding" in cabecalhos):
+                # Streaming (SSE, arquivos) ou nada a ganhar: segue como veio
+                repassar = True
+                await send(inicio)
+                await send(mensagem)
+                return
+
+            if len(corpo) > LIMITE_COMPRESSAO_NO_LOOP:
+                comprimido = await asyncio.to_thread(
+                    _comprimir, corpo, codificacao, self.nivel_gzip, self.qualidade_brotli
+                )
+            else:
+                comprimido = _comprimir(corpo, codificacao, self.nivel_gzip, self.qualidade_brotli)
+
+            cabecalhos["Content-Encoding"] = codificacao
+            cabecalhos["Content-Length"] = str(len(comprimido))
+            cabecalhos.add_vary_header("Accept-Encoding")
+            if etag_atual and etag_atual.endswith('"'):
+                cabecalhos["ETag"] = etag_atual[:-1] + SUFIXOS_CODIFICACAO[codificacao] + '"'
+            await send(inicio)
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, enviar)
@@ -5,16 +5,38 @@ Sistema Avançado de Visualização de Ações Brasileiras
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 from datetime import datetime
-from typing import Any
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+import numpy as np
 import pandas as pd
+from pydantic import BaseModel, Field
+
+from . import condicional, serializacao
 
 logger = logging.getLogger(__name__)
 
+# Indicadores calculados para cada tela (o restante do registro fica de fora)
+INDICADORES_ACAO = [
+    'RSI', 'SMA_20', 'SMA_50', 'SMA_200', 'MACD', 'Signal',
+    'BB_Upper', 'BB_Middle', 'BB_Lower', 'Volatility',
+]
+INDICADORES_SCORE = ['RSI', 'MACD', 'Signal', 'SMA_20', 'SMA_50', 'Volume_SMA']
+INDICADORES_PADROES = ['Doji', 'Martelo', 'Engolfo_Alta', 'Engolfo_Baixa']
+INDICADORES_AVANCADOS = ['VWAP', 'OBV', 'MFI', 'Force_Index', 'AD', 'ROC', 'Momentum', 'ADX']
+
+# Campo da resposta -> coluna, para os indicadores avançados
+CAMPOS_AVANCADOS = [
+    ("vwap", "VWAP"), ("obv", "OBV"), ("mfi", "MFI"), ("force_index", "Force_Index"),
+    ("accumulation_distribution", "AD"), ("roc", "ROC"), ("momentum", "Momentum"), ("adx", "ADX"),
+]
+CAMPOS_AVANCADOS_HISTORICO = [("vwap", "VWAP"), ("obv", "OBV"), ("mfi", "MFI"), ("adx", "ADX")]
+
 app = FastAPI(
     title="Visualizador B3 API",
     description="Sistema Avançado de Visualização de Ações Brasileiras",
@@ -28,18 +50,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# gzip (ou brotli, se instalado) nas respostas acima de 1 KB
+app.add_middleware(condicional.CompressaoMiddleware, minimo=int(os.getenv("B3_COMPRESSAO_MINIMO", "1024")))
+
 
 @app.on_event("startup")
 async def startup_event():
     """Start application."""
     logger.info("🚀 Visualizador B3 API iniciada")
+    
+    if os.getenv("B3_AGENDADOR_ATIVO", "1") != "0":
+        _registrar_tarefas_agendadas()
+        from ..services.agendador_service import agendador_service
+        agendador_service.iniciar()
+    
     logger.info("📊 Servidor pronto para receber requisições")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work."""
+    from ..services.agendador_service import agendador_service
+    from ..services.b3_async_service import b3_async_service
+    from ..services.fetch_executor_service import fetch_executor_service
+    
+    await agendador_service.parar()
+    await b3_async_service.fechar()
+    fetch_executor_service.encerrar()
+
+
+def _registrar_tarefas_agendadas():
+    """Tarefas que renovam os caches das telas principais antes de expirarem."""
+    from ..services.agendador_service import agendador_service
+    from ..services.b3_data_service import b3_service
+    from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
+    from ..services.indicadores_universo_service import indicadores_universo_service
+    from ..services.anomalias_service import anomalias_service
+    from ..services.indicadores_tempo_real_service import indicadores_tempo_real_service
+    from ..services.memo_indicadores_service import memo_indicadores_service, impressao
+    
+    def aquecer_universo():
+        # Snapshot e tudo que deriva dele: rankings, setores, o scanner de
+        # anomalias e os indicadores intradiários. Fora do pregão o snapshot em
+        # cache continua válido e nada é baixado.
+        snapshot = b3_service.buscar_snapshot_universo(forcar=calendario_service.em_negociacao())
+        anomalias_service.atualizar_snapshot(snapshot)
+        indicadores_tempo_real_service.atualizar_snapshot(snapshot)
+        ttl = calendario_service.ttl('cotacao')
+        for tipo in ("variacao", "volume"):
+            cache_service.set(f"ranking_{tipo}", _montar_ranking(tipo, forcar=True), ttl_seconds=ttl)
+        cache_service.set("setores", _montar_setores(), ttl_seconds=ttl)
+    
+    def aquecer_ibovespa():
+        # Renova o histórico e deixa pronta a resposta que /api/b3/ibovespa memoriza
+        dados = b3_service.buscar_ibovespa("1y")
+        marca = impressao(dados)
+        chave = ('ibovespa', '1y', None)
+        if marca is not None and memo_indicadores_service.obter(chave, marca) is None:
+            memo_indicadores_service.guardar(chave, marca, _montar_ibovespa(dados, "1y"))
+    
+    def aquecer_indicadores_universo():
+        # Fora do pregão a matriz em cache vale até a próxima abertura
+        matriz = indicadores_universo_service.obter(forcar=calendario_service.em_negociacao())
+        if matriz is not None and matriz.tickers:
+            anomalias_service.aquecer(matriz.tickers, matriz.datas, matriz.precos)
+            indicadores_tempo_real_service.aquecer(matriz.tickers, matriz.datas, matriz.precos)
+    
+    # Cada tarefa roda antes de expirar o TTL das chaves que renova (o intervalo
+    # acompanha a fase do pregão; o valor fixo é só o máximo)
+    agendador_service.registrar("universo", aquecer_universo, intervalo=90, classe_ttl='cotacao')
+    agendador_service.registrar("ibovespa", aquecer_ibovespa, intervalo=240, atraso_inicial=5,
+                                classe_ttl='barra_diaria')
+    agendador_service.registrar("indicadores_universo", aquecer_indicadores_universo, intervalo=110,
+                                atraso_inicial=10, classe_ttl='indicador')
+
+
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "Visualizador B3 - API de Ações Brasileiras",
         "status": "ativo",
@@ -49,7 +140,7 @@ def root():
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
@@ -58,21 +149,44 @@ def health_check():
     }
 
 
+@app.get("/api/monitoramento/agendador")
+async def get_status_agendador():
+    """Tempos e falhas das tarefas de aquecimento em segundo plano."""
+    from ..services.agendador_service import agendador_service
+    
+    return {
+        **agendador_service.status(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+@app.get("/api/monitoramento/memo")
+async def get_status_memo(detalhado: bool = Query(default=False)):
+    """Uso do memo de indicadores (com os bytes estimados de cada entrada se detalhado)."""
+    from ..services.memo_indicadores_service import memo_indicadores_service
+    
+    resultado = await asyncio.to_thread(memo_indicadores_service.estatisticas)
+    if detalhado:
+        resultado["tamanhos"] = await asyncio.to_thread(memo_indicadores_service.tamanhos)
+    return {**resultado, "timestamp": datetime.now().isoformat()}
+
+
 # ============= Endpoints Específicos B3 =============
 
 @app.get("/api/b3/acoes/principais")
-def get_principais_acoes_b3():
+async def get_principais_acoes_b3():
     """Retorna as principais ações da B3 com dados em tempo real."""
-    from ..services.b3_data_service import b3_service
+    from ..services.b3_async_service import b3_async_service
     from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
     
-    # Cache de 3 minutos
+    # Cache enquanto a cotação for válida
     cache_key = "acoes_principais"
     cached = cache_service.get(cache_key)
     if cached:
         return cached
     
-    acoes = b3_service.obter_principais_acoes()
+    acoes = await b3_async_service.obter_principais_acoes()
     result = {
         "acoes": acoes,
         "total": len(acoes),
@@ -80,111 +194,267 @@ def get_principais_acoes_b3():
         "timestamp": datetime.now().isoformat(),
     }
     
-    cache_service.set(cache_key, result, ttl_seconds=180)
+    cache_service.set(cache_key, result, ttl_seconds=calendario_service.ttl('cotacao'))
     return result
 
 
 @app.get("/api/b3/acao/{ticker}")
-def get_dados_acao_b3(
+async def get_dados_acao_b3(
+    request: Request,
     ticker: str,
-    periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
+    periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$"),
+    intervalo: str = Query(default="1d", regex="^(1d|1wk|1mo|3mo)$"),
+    formato: str = Query(default="linhas", regex="^(linhas|colunar)$"),
+    desde: Optional[str] = Query(default=None, description="Cursor (data AAAA-MM-DD) da última barra que o cliente já tem"),
+    pontos: Optional[int] = Query(default=None, ge=10, le=10000, description="Máximo de pontos (largura do gráfico em px)")
 ):
-    """Retorna dados históricos completos de uma ação brasileira."""
-    from ..services.b3_data_service import b3_service
+    """
+    Retorna dados históricos completos de uma ação brasileira (barras diárias ou agregadas).
+    
+    formato=linhas: lista de registros (um objeto por pregão);
+    formato=colunar: um array por campo, bem menor para períodos longos.
+    Com Accept: application/vnd.apache.arrow.stream ou application/msgpack,
+    as mesmas colunas em formato binário (o parâmetro formato é ignorado).
+    
+    Com desde, só as barras depois do cursor (a barra em formação volta
+    sempre, pois pode ter sido atualizada), com os indicadores calculados
+    sobre o histórico completo; o próximo cursor vem no campo cursor.
+    Cursor na última barra já fechada: nenhuma barra.
+    
+    Com pontos, barras consecutivas viram no máximo esse número de candles
+    (máxima/mínima preservadas, volume somado, indicadores da última barra).
+    """
+    from ..services import decimacao
+    from ..services.b3_async_service import b3_async_service
+    from ..services.memo_indicadores_service import memo_indicadores_service, impressao
     
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
-    info = b3_service.buscar_info_acao(ticker)
+    # Cursor inválido é 400 antes de qualquer busca (e nunca um 304)
+    inicio = _cursor(desde)
+    dados, info = await asyncio.gather(
+        b3_async_service.buscar_dados_acao(ticker, periodo, INDICADORES_ACAO, intervalo),
+        b3_async_service.buscar_info_acao(ticker),
+    )
     
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
     
-    # Converter para formato JSON
-    dados_json = []
-    for idx, row in dados.iterrows():
-        dados_json.append({
-            "data": idx.strftime("%Y-%m-%d"),
-            "abertura": float(row['Open']) if pd.notna(row['Open']) else None,
-            "maxima": float(row['High']) if pd.notna(row['High']) else None,
-            "minima": float(row['Low']) if pd.notna(row['Low']) else None,
-            "fechamento": float(row['Close']) if pd.notna(row['Close']) else None,
-            "volume": int(row['Volume']) if pd.notna(row['Volume']) else None,
-            "rsi": float(row['RSI']) if 'RSI' in row and pd.notna(row['RSI']) else None,
-            "sma_20": float(row['SMA_20']) if 'SMA_20' in row and pd.notna(row['SMA_20']) else None,
-            "sma_50": float(row['SMA_50']) if 'SMA_50' in row and pd.notna(row['SMA_50']) else None,
-            "sma_200": float(row['SMA_200']) if 'SMA_200' in row and pd.notna(row['SMA_200']) else None,
-            "macd": float(row['MACD']) if 'MACD' in row and pd.notna(row['MACD']) else None,
-            "macd_signal": float(row['Signal']) if 'Signal' in row and pd.notna(row['Signal']) else None,
-            "bb_upper": float(row['BB_Upper']) if 'BB_Upper' in row and pd.notna(row['BB_Upper']) else None,
-            "bb_middle": float(row['BB_Middle']) if 'BB_Middle' in row and pd.notna(row['BB_Middle']) else None,
-            "bb_lower": float(row['BB_Lower']) if 'BB_Lower' in row and pd.notna(row['BB_Lower']) else None,
-            "volatilidade": float(row['Volatility']) if 'Volatility' in row and pd.notna(row['Volatility']) else None,
-            })
-        
-        return {
+    mime = serializacao.formato_binario(request.headers.get("accept"))
+    marca = impressao(dados)
+    
+    # Mesma última barra e mesma info: o cliente já tem a resposta
+    tag = condicional.etag('acao', ticker.upper(), periodo, intervalo, mime or formato, desde, pontos, marca, info)
+    modificacao = condicional.ultima_modificacao(dados, intervalo)
+    resposta = condicional.nao_modificado(request, tag, modificacao)
+    if resposta is not None:
+        return resposta
+    
+    cursor = serializacao.datas(dados.index[-1:])[0]
+    if inicio is not None:
+        dados = _a_partir(dados, inicio, em_formacao=modificacao is None)
+    total_barras = len(dados)
+    
+    if mime:
+        if pontos:
+            dados = decimacao.velas(dados, pontos)
+        metadados = {
+            "ticker": ticker, "info": info, "periodo": periodo, "intervalo": intervalo,
+            "desde": desde, "cursor": cursor, "pontos": pontos,
+            "total_barras": total_barras, "total_registros": len(dados),
+        }
+        colunas = serializacao.colunas_numpy(dados, serializacao.CAMPOS_ACAO)
+        resposta = await b3_async_service.calcular(serializacao.resposta_binaria, mime, colunas, metadados)
+        return condicional.validadores(resposta, tag, modificacao)
+    
+    serializar = _colunas_acao if formato == "colunar" else _serializar_acao
+    montar = (lambda d: serializar(decimacao.velas(d, pontos))) if pontos else serializar
+    if desde is not None:
+        # Poucas barras: serializar direto sai mais barato que memorizar cada cursor
+        dados_json = montar(dados)
+    else:
+        # Série serializada reaproveitada até chegar uma barra nova (a cotação em info segue à parte)
+        chave = ('acao', ticker.upper(), periodo, intervalo, formato, pontos)
+        dados_json = memo_indicadores_service.obter(chave, marca)
+        if dados_json is None:
+            dados_json = await b3_async_service.calcular(montar, dados)
+            memo_indicadores_service.guardar(chave, marca, dados_json)
+    
+    resposta = serializacao.resposta_json({
         "ticker": ticker,
         "info": info,
         "dados": dados_json,
         "periodo": periodo,
-        "total_registros": len(dados_json),
-    }
+        "intervalo": intervalo,
+        "formato": formato,
+        "desde": desde,
+        "cursor": cursor,
+        "pontos": pontos,
+        "total_barras": total_barras,
+        "total_registros": len(dados_json["data"]) if formato == "colunar" else len(dados_json),
+    })
+    return condicional.validadores(resposta, tag, modificacao)
+
+
+def _cursor(desde: Optional[str]) -> Optional[pd.Timestamp]:
+    """Data do cursor desde (None se ausente); 400 se o cursor não for uma data."""
+    if desde is None:
+        return None
+    try:
+        inicio = pd.Timestamp(desde)
+    except ValueError:
+        inicio = pd.NaT
+    if pd.isna(inicio):
+        raise HTTPException(status_code=400, detail=f"Cursor inválido: {desde} (use AAAA-MM-DD)")
+    return inicio
+
+
+def _a_partir(dados: pd.DataFrame, inicio: pd.Timestamp, em_formacao: bool = False) -> pd.DataFrame:
+    """Barras depois da data do cursor; com em_formacao, a última barra vem sempre (ainda pode mudar)."""
+    # O cursor é a data local do pregão (como em serializacao.datas)
+    if dados.index.tz is not None:
+        inicio = inicio.tz_localize(dados.index.tz) if inicio.tz is None else inicio.tz_convert(dados.index.tz)
+    posicao = dados.index.searchsorted(inicio.normalize(), side='right')
+    if em_formacao:
+        posicao = min(posicao, len(dados) - 1)
+    return dados.iloc[posicao:]
+
+
+def _colunas_acao(dados: pd.DataFrame) -> dict:
+    """Histórico com indicadores como um array por campo (NaN vira null no JSON)."""
+    return serializacao.colunas(dados, serializacao.CAMPOS_ACAO)
+
+
+def _serializar_acao(dados: pd.DataFrame) -> list:
+    """Converte o histórico com indicadores para o formato JSON da API (um registro por pregão)."""
+    return serializacao.registros(_colunas_acao(dados))
 
 
 @app.get("/api/b3/ibovespa")
-def get_ibovespa(periodo: str = Query(default="1y")):
-    """Retorna dados históricos do índice IBOVESPA."""
-    from ..services.b3_data_service import b3_service
-    from ..services.cache_service import cache_service
-    
-    # Cache de 5 minutos por período
-    cache_key = f"ibovespa_{periodo}"
-    cached = cache_service.get(cache_key)
-    if cached:
-        return cached
+async def get_ibovespa(
+    request: Request,
+    periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$"),
+    desde: Optional[str] = Query(default=None, description="Cursor (data AAAA-MM-DD) da última barra que o cliente já tem"),
+    pontos: Optional[int] = Query(default=None, ge=10, le=10000, description="Máximo de pontos (largura do gráfico em px)")
+):
+    """
+    Retorna dados históricos do índice IBOVESPA (JSON, Arrow IPC ou MessagePack).
     
-    dados = b3_service.buscar_ibovespa(periodo)
+    Com desde, só as barras depois do cursor (ver /api/b3/acao); as
+    variações continuam calculadas sobre o período inteiro. Com pontos, a
+    linha de fechamento é reduzida por LTTB a no máximo esse número de pontos.
+    """
+    from ..services.b3_async_service import b3_async_service
+    from ..services.memo_indicadores_service import memo_indicadores_service, impressao
     
+    inicio = _cursor(desde)
+    dados = await b3_async_service.buscar_ibovespa(periodo)
     if dados.empty:
         raise HTTPException(status_code=404, detail="Dados do IBOVESPA não disponíveis")
     
-    dados_json = []
-    for idx, row in dados.iterrows():
-        dados_json.append({
-            "data": idx.strftime("%Y-%m-%d"),
-            "fechamento": float(row['Close']),
-            "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0,
-        })
+    mime = serializacao.formato_binario(request.headers.get("accept"))
+    marca = impressao(dados)
+    tag = condicional.etag('ibovespa', periodo, mime, desde, pontos, marca)
+    modificacao = condicional.ultima_modificacao(dados)
+    resposta = condicional.nao_modificado(request, tag, modificacao)
+    if resposta is not None:
+        return resposta
+    
+    em_formacao = modificacao is None
+    if mime:
+        recorte = _recorte_ibovespa(dados, inicio, pontos, em_formacao)
+        colunas = serializacao.colunas_numpy(recorte, [("fechamento", "Close"), ("volume", "Volume")])
+        metadados = {
+            "indice": "IBOVESPA", "periodo": periodo, **_variacoes_ibovespa(dados),
+            "desde": desde, "cursor": serializacao.datas(dados.index[-1:])[0], "pontos": pontos,
+        }
+        resposta = await b3_async_service.calcular(serializacao.resposta_binaria, mime, colunas, metadados)
+        return condicional.validadores(resposta, tag, modificacao)
     
-    # Calcular variação
-    variacao_dia = 0
-    variacao_periodo = 0
-    if len(dados_json) >= 2:
-        variacao_dia = ((dados_json[-1]['fechamento'] / dados_json[-2]['fechamento']) - 1) * 100
-        variacao_periodo = ((dados_json[-1]['fechamento'] / dados_json[0]['fechamento']) - 1) * 100
+    if desde is not None:
+        result = _montar_ibovespa(dados, periodo, _recorte_ibovespa(dados, inicio, pontos, em_formacao))
+        result["desde"] = desde
+    else:
+        # Resposta reaproveitada até a última barra do índice mudar
+        chave = ('ibovespa', periodo, pontos)
+        result = memo_indicadores_service.obter(chave, marca)
+        if result is None:
+            result = await b3_async_service.calcular(
+                _montar_ibovespa, dados, periodo, _recorte_ibovespa(dados, None, pontos)
+            )
+            memo_indicadores_service.guardar(chave, marca, result)
     
-    result = {
+    return condicional.validadores(serializacao.resposta_json(result), tag, modificacao)
+
+
+def _recorte_ibovespa(dados: pd.DataFrame, inicio: Optional[pd.Timestamp], pontos: Optional[int],
+                      em_formacao: bool = False) -> pd.DataFrame:
+    """Barras enviadas: depois do cursor (ver _a_partir) e/ou reduzidas por LTTB sobre o fechamento."""
+    from ..services import decimacao
+    
+    if inicio is not None:
+        dados = _a_partir(dados, inicio, em_formacao)
+    if pontos and not dados.empty:
+        dados = dados.iloc[decimacao.lttb(dados['Close'].to_numpy(dtype=float), pontos)]
+    return dados
+
+
+def _montar_ibovespa(dados: pd.DataFrame, periodo: str, recorte: Optional[pd.DataFrame] = None):
+    """Monta a resposta do IBOVESPA (None se não houver dados); recorte: barras enviadas, se não todas."""
+    if dados.empty:
+        return None
+    if recorte is None:
+        recorte = dados
+    
+    dados_json = serializacao.registros({
+        "data": serializacao.datas(recorte.index),
+        "fechamento": recorte['Close'].to_numpy(dtype=float),
+        "volume": recorte['Volume'].fillna(0).to_numpy(dtype=float).astype('int64'),
+    })
+    
+    return {
         "indice": "IBOVESPA",
         "dados": dados_json,
-        "variacao_dia": round(variacao_dia, 2),
-        "variacao_periodo": round(variacao_periodo, 2),
+        **_variacoes_ibovespa(dados),
         "periodo": periodo,
+        "cursor": serializacao.datas(dados.index[-1:])[0],
     }
+
+
+def _variacoes_ibovespa(dados: pd.DataFrame) -> dict:
+    """Variação do último pregão e do período (%)."""
+    variacao_dia = 0
+    variacao_periodo = 0
+    fechamentos = dados['Close']
+    if len(fechamentos) >= 2:
+        variacao_dia = ((fechamentos.iloc[-1] / fechamentos.iloc[-2]) - 1) * 100
+        variacao_periodo = ((fechamentos.iloc[-1] / fechamentos.iloc[0]) - 1) * 100
     
-    cache_service.set(cache_key, result, ttl_seconds=300)
-    return result
+    return {
+        "variacao_dia": round(float(variacao_dia), 2),
+        "variacao_periodo": round(float(variacao_periodo), 2),
+    }
 
 
 @app.get("/api/b3/setores")
-def get_desempenho_setores():
+async def get_desempenho_setores():
     """Retorna o desempenho dos setores da B3."""
-    from ..services.b3_data_service import b3_service
     from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
     
-    # Cache de 5 minutos
+    # Cache enquanto a cotação for válida (renovado pelo agendador)
     cache_key = "setores"
     cached = cache_service.get(cache_key)
     if cached:
         return cached
     
+    result = await asyncio.to_thread(_montar_setores)
+    cache_service.set(cache_key, result, ttl_seconds=calendario_service.ttl('cotacao'))
+    return result
+
+
+def _montar_setores():
+    """Monta a resposta de desempenho dos setores a partir do snapshot."""
+    from ..services.b3_data_service import b3_service
+    
     setores = b3_service.buscar_comparacao_setores()
     
     setores_lista = [
@@ -195,51 +465,55 @@ def get_desempenho_setores():
     # Ordenar por variação
     setores_lista = sorted(setores_lista, key=lambda x: x['variacao'], reverse=True)
     
-    result = {
+    return {
         "setores": setores_lista,
         "total": len(setores_lista),
         "timestamp": datetime.now().isoformat(),
     }
-    
-    cache_service.set(cache_key, result, ttl_seconds=300)
-    return result
 
 
 @app.get("/api/b3/ranking")
-def get_ranking_acoes(tipo: str = Query(default="variacao", regex="^(variacao|volume)$")):
+async def get_ranking_acoes(tipo: str = Query(default="variacao", regex="^(variacao|volume)$")):
     """Retorna ranking de ações por variação ou volume."""
-    from ..services.b3_data_service import b3_service
     from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
     
-    # Tentar cache primeiro (2 minutos)
+    # Tentar cache primeiro (renovado pelo agendador)
     cache_key = f"ranking_{tipo}"
     cached = cache_service.get(cache_key)
     if cached:
         return cached
     
+    result = await asyncio.to_thread(_montar_ranking, tipo)
+    
+    # Cachear enquanto a cotação for válida
+    cache_service.set(cache_key, result, ttl_seconds=calendario_service.ttl('cotacao'))
+    
+    return result
+
+
+def _montar_ranking(tipo: str, forcar: bool = False):
+    """Monta a resposta do ranking por variação ou volume a partir do snapshot."""
+    from ..services.b3_data_service import b3_service
+    
     if tipo == "variacao":
-        ranking = b3_service.buscar_ranking_variacao(limit=20)
+        ranking = b3_service.buscar_ranking_variacao(limit=20, forcar=forcar)
     else:
-        ranking = b3_service.obter_principais_acoes()
-        ranking = sorted(ranking, key=lambda x: x.get('volume', 0), reverse=True)[:20]
+        snapshot = b3_service.buscar_snapshot_universo()
+        ranking = b3_service.snapshot_para_lista(snapshot.nlargest(20, 'volume')) if not snapshot.empty else []
     
-    result = {
+    return {
         "ranking": ranking,
         "tipo": tipo,
         "total": len(ranking),
         "timestamp": datetime.now().isoformat(),
     }
-    
-    # Cachear por 2 minutos
-    cache_service.set(cache_key, result, ttl_seconds=120)
-    
-    return result
 
 
 @app.get("/api/b3/correlacoes")
-def get_correlacoes(
+async def get_correlacoes(
     tickers: str = Query(..., description="Tickers separados por vírgula (ex: PETR4,VALE3,ITUB4)"),
-    periodo: str = Query(default="6mo")
+    periodo: str = Query(default="6mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
 ):
     """Retorna matriz de correlação entre ações com dados avançados."""
     from ..services.b3_data_service import b3_service
@@ -249,7 +523,7 @@ def get_correlacoes(
     if len(lista_tickers) < 2:
         raise HTTPException(status_code=400, detail="Forneça ao menos 2 tickers")
     
-    correlacoes = b3_service.calcular_correlacoes(lista_tickers, periodo)
+    correlacoes = await asyncio.to_thread(b3_service.calcular_correlacoes, lista_tickers, periodo)
     
     if correlacoes.empty:
         raise HTTPException(status_code=404, detail="Não foi possível calcular correlações")
@@ -279,7 +553,7 @@ def get_correlacoes(
                         'forca': abs(float(corr))  # Para espessura da linha
                     })
         
-        return {
+    return {
         "correlacoes": correlacoes_json,
         "pares": pares,
         "tickers": lista_tickers,
@@ -288,63 +562,103 @@ def get_correlacoes(
 
 
 @app.get("/api/b3/comparacao")
-def get_comparacao_acoes(
+async def get_comparacao_acoes(
+    request: Request,
     tickers: str = Query(..., description="Tickers separados por vírgula"),
-    periodo: str = Query(default="1y")
+    periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
 ):
-    """Compara o desempenho de múltiplas ações."""
-    from ..services.b3_data_service import b3_service
+    """Compara o desempenho de múltiplas ações (JSON, Arrow IPC ou MessagePack)."""
+    from ..services.b3_async_service import b3_async_service
+    from ..services.memo_indicadores_service import impressao
     
     lista_tickers = [t.strip() for t in tickers.split(',')]
     
     if len(lista_tickers) < 2:
         raise HTTPException(status_code=400, detail="Forneça ao menos 2 tickers para comparação")
     
+    # Só o fechamento é usado: nenhum indicador é calculado
+    dados_por_ticker = await b3_async_service.buscar_varios(lista_tickers, periodo, indicadores=[])
+    
+    mime = serializacao.formato_binario(request.headers.get("accept"))
+    tag = condicional.etag(
+        'comparacao', lista_tickers, periodo, mime,
+        [(ticker, impressao(dados)) for ticker, dados in dados_por_ticker.items()],
+    )
+    resposta = condicional.nao_modificado(request, tag)
+    if resposta is not None:
+        return resposta
+    
+    if mime:
+        def montar_binario():
+            series = {}
+            variacoes = {}
+            for ticker, dados in dados_por_ticker.items():
+                fechamentos = dados['Close'].to_numpy(dtype=float)
+                series[ticker] = {
+                    "data": dados.index,
+                    "valor_normalizado": np.round(fechamentos / fechamentos[0] * 100, 2),
+                }
+                variacoes[ticker] = round(float((fechamentos[-1] / fechamentos[0] - 1) * 100), 2)
+            metadados = {"tickers": lista_tickers, "periodo": periodo, "base": 100, "variacao_periodo": variacoes}
+            return serializacao.resposta_binaria(mime, series, metadados, rotulo="ticker")
+        
+        return condicional.validadores(await b3_async_service.calcular(montar_binario), tag)
+    
+    comparacao = await b3_async_service.calcular(_normalizar_base_100, dados_por_ticker)
+    
+    resposta = serializacao.resposta_json({
+        "comparacao": comparacao,
+        "tickers": lista_tickers,
+        "periodo": periodo,
+        "base": 100,
+    })
+    return condicional.validadores(resposta, tag)
+
+
+def _normalizar_base_100(dados_por_ticker: dict) -> dict:
+    """Séries de fechamento normalizadas (base 100) e variação no período."""
     comparacao = {}
     
-    for ticker in lista_tickers:
-        dados = b3_service.buscar_dados_acao(ticker, periodo)
+    for ticker, dados in dados_por_ticker.items():
         if not dados.empty:
             # Normalizar preços (base 100)
             precos_normalizados = (dados['Close'] / dados['Close'].iloc[0]) * 100
             
             comparacao[ticker] = {
-                "dados": [
-                    {
-                        "data": idx.strftime("%Y-%m-%d"),
-                        "valor_normalizado": round(float(val), 2)
-                    }
-                    for idx, val in precos_normalizados.items()
-                ],
+                "dados": serializacao.registros({
+                    "data": serializacao.datas(precos_normalizados.index),
+                    "valor_normalizado": precos_normalizados.round(2).to_numpy(dtype=float),
+                }),
                 "variacao_periodo": round(((dados['Close'].iloc[-1] / dados['Close'].iloc[0]) - 1) * 100, 2),
             }
     
-    return {
-        "comparacao": comparacao,
-        "tickers": lista_tickers,
-        "periodo": periodo,
-        "base": 100,
-    }
+    return comparacao
 
 
 # ============= Endpoints de Análise Avançada =============
 
 @app.get("/api/b3/analise/score/{ticker}")
-def get_score_tecnico(ticker: str, periodo: str = Query(default="3mo")):
+async def get_score_tecnico(ticker: str, periodo: str = Query(default="3mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
     """Retorna Score Técnico e Recomendação Automática"""
-    from ..services.b3_data_service import b3_service
-    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    from ..services.b3_async_service import b3_async_service
     
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, INDICADORES_SCORE)
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
     
+    return await b3_async_service.calcular(_analise_score, ticker, dados)
+
+
+def _analise_score(ticker: str, dados: pd.DataFrame) -> dict:
+    """Score, pivots, suportes/resistências e anomalias (dados com INDICADORES_SCORE)."""
+    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    
     score = AnaliseTecnicaAvancada.calcular_score_tecnico(dados)
     pivot = AnaliseTecnicaAvancada.calcular_pivot_points(dados)
     anomalias = AnaliseTecnicaAvancada.detectar_anomalias(dados)
     suporte_resistencia = AnaliseTecnicaAvancada.detectar_suportes_resistencias(dados)
-        
-        return {
+    
+    return {
         "ticker": ticker,
         "score": score['score'],
         "recomendacao": score['recomendacao'],
@@ -352,20 +666,59 @@ def get_score_tecnico(ticker: str, periodo: str = Query(default="3mo")):
         "pivot_points": pivot,
         "suportes": suporte_resistencia['suportes'],
         "resistencias": suporte_resistencia['resistencias'],
+        "niveis": {
+            "suportes": suporte_resistencia['suportes_detalhe'],
+            "resistencias": suporte_resistencia['resistencias_detalhe'],
+        },
         "anomalias": anomalias,
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/api/b3/analise/score/{ticker}/historico")
+async def get_score_tecnico_historico(ticker: str, periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
+    """Retorna o Score Técnico e a recomendação de cada pregão do período"""
+    from ..services.b3_async_service import b3_async_service
+    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, INDICADORES_SCORE)
+    if dados.empty:
+        raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
+    
+    def montar():
+        serie = AnaliseTecnicaAvancada.calcular_score_tecnico_serie(dados)
+        return serializacao.registros({
+            "data": serializacao.datas(serie.index),
+            "score": serie['score'].round(1).to_numpy(dtype=float),
+            "recomendacao": serie['recomendacao'].to_numpy(dtype=object),
+            "fechamento": dados['Close'].to_numpy(dtype=float),
+        })
+    
+    historico = await b3_async_service.calcular(montar)
+    
+    return serializacao.resposta_json({
+        "ticker": ticker,
+        "periodo": periodo,
+        "historico": historico,
+        "total_registros": len(historico),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
 @app.get("/api/b3/analise/padroes/{ticker}")
-def get_padroes_candles(ticker: str, periodo: str = Query(default="1mo")):
+async def get_padroes_candles(ticker: str, periodo: str = Query(default="1mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
     """Detecta padrões de candles"""
-    from ..services.b3_data_service import b3_service
+    from ..services.b3_async_service import b3_async_service
     
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, INDICADORES_PADROES)
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
     
+    return _analise_padroes(ticker, dados)
+
+
+def _analise_padroes(ticker: str, dados: pd.DataFrame) -> dict:
+    """Padrões de candle dos últimos 10 pregões (dados com INDICADORES_PADROES)."""
     # Últimos 10 dias com padrões
     padroes_encontrados = []
     for i in range(max(0, len(dados) - 10), len(dados)):
@@ -388,7 +741,7 @@ def get_padroes_candles(ticker: str, periodo: str = Query(default="1mo")):
                 'preco': float(row['Close'])
             })
         
-        return {
+    return {
         "ticker": ticker,
         "padroes": padroes_encontrados,
         "total": len(padroes_encontrados)
@@ -396,18 +749,24 @@ def get_padroes_candles(ticker: str, periodo: str = Query(default="1mo")):
 
 
 @app.get("/api/b3/analise/volume-profile/{ticker}")
-def get_volume_profile(ticker: str, periodo: str = Query(default="3mo")):
+async def get_volume_profile(ticker: str, periodo: str = Query(default="3mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
     """Retorna Volume Profile da ação"""
-    from ..services.b3_data_service import b3_service
-    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    from ..services.b3_async_service import b3_async_service
     
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, indicadores=[])
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
     
+    return await b3_async_service.calcular(_analise_volume_profile, ticker, dados, periodo)
+
+
+def _analise_volume_profile(ticker: str, dados: pd.DataFrame, periodo: str) -> dict:
+    """Volume Profile do período."""
+    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    
     volume_profile = AnaliseTecnicaAvancada.calcular_volume_profile(dados)
-        
-        return {
+    
+    return {
         "ticker": ticker,
         "profile": volume_profile['profile'],
         "poc": volume_profile['poc'],
@@ -417,51 +776,59 @@ def get_volume_profile(ticker: str, periodo: str = Query(default="3mo")):
 
 
 @app.get("/api/b3/analise/indicadores-avancados/{ticker}")
-def get_indicadores_avancados(ticker: str, periodo: str = Query(default="6mo")):
-    """Retorna todos os indicadores avançados"""
-    from ..services.b3_data_service import b3_service
+async def get_indicadores_avancados(request: Request, ticker: str, periodo: str = Query(default="6mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
+    """
+    Retorna todos os indicadores avançados
     
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
+    Em JSON, os valores atuais e os últimos 30 pregões; em Arrow IPC ou
+    MessagePack (cabeçalho Accept), a série completa do período.
+    """
+    from ..services.b3_async_service import b3_async_service
+    from ..services.memo_indicadores_service import impressao
+    
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, INDICADORES_AVANCADOS)
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
     
-    ultimo = dados.iloc[-1]
+    mime = serializacao.formato_binario(request.headers.get("accept"))
+    tag = condicional.etag('indicadores-avancados', ticker.upper(), periodo, mime, impressao(dados))
+    modificacao = condicional.ultima_modificacao(dados)
+    resposta = condicional.nao_modificado(request, tag, modificacao)
+    if resposta is not None:
+        return resposta
+    
+    if mime:
+        colunas = serializacao.colunas_numpy(dados, [("fechamento", "Close"), *CAMPOS_AVANCADOS])
+        metadados = {"ticker": ticker, "periodo": periodo, "total_registros": len(dados)}
+        resposta = await b3_async_service.calcular(serializacao.resposta_binaria, mime, colunas, metadados)
+        return condicional.validadores(resposta, tag, modificacao)
+    
+    indicadores = _analise_indicadores_avancados(ticker, dados)
+    return condicional.validadores(serializacao.resposta_json(indicadores), tag, modificacao)
+
+
+def _analise_indicadores_avancados(ticker: str, dados: pd.DataFrame) -> dict:
+    """Valores atuais dos indicadores avançados e os últimos 30 pregões."""
+    ultimo = serializacao.colunas_numpy(dados.iloc[-1:], CAMPOS_AVANCADOS)
+    recentes = dados.iloc[-30:]
     
-    indicadores = {
+    return {
         "ticker": ticker,
-        "preco_atual": float(ultimo['Close']),
-        "vwap": float(ultimo.get('VWAP', 0)) if pd.notna(ultimo.get('VWAP')) else None,
-        "obv": float(ultimo.get('OBV', 0)) if pd.notna(ultimo.get('OBV')) else None,
-        "mfi": float(ultimo.get('MFI', 0)) if pd.notna(ultimo.get('MFI')) else None,
-        "force_index": float(ultimo.get('Force_Index', 0)) if pd.notna(ultimo.get('Force_Index')) else None,
-        "accumulation_distribution": float(ultimo.get('AD', 0)) if pd.notna(ultimo.get('AD')) else None,
-        "roc": float(ultimo.get('ROC', 0)) if pd.notna(ultimo.get('ROC')) else None,
-        "momentum": float(ultimo.get('Momentum', 0)) if pd.notna(ultimo.get('Momentum')) else None,
-        "adx": float(ultimo.get('ADX', 0)) if pd.notna(ultimo.get('ADX')) else None,
+        "preco_atual": float(dados['Close'].iloc[-1]),
+        **{campo: ultimo[campo][0] for campo, _ in CAMPOS_AVANCADOS},
     
         # Série temporal dos últimos 30 dias
-        "historico": [
-            {
-                "data": idx.strftime("%Y-%m-%d"),
-                "vwap": float(row.get('VWAP', 0)) if pd.notna(row.get('VWAP')) else None,
-                "obv": float(row.get('OBV', 0)) if pd.notna(row.get('OBV')) else None,
-                "mfi": float(row.get('MFI', 0)) if pd.notna(row.get('MFI')) else None,
-                "adx": float(row.get('ADX', 0)) if pd.notna(row.get('ADX')) else None,
-            }
-            for idx, row in dados.tail(30).iterrows()
-        ]
+        "historico": serializacao.registros(serializacao.colunas(recentes, CAMPOS_AVANCADOS_HISTORICO)),
     }
-    
-    return indicadores
 
 
 @app.post("/api/b3/analise/comparador")
-def comparar_acoes_avancado(
+async def comparar_acoes_avancado(
     tickers: str = Query(..., description="Tickers separados por vírgula"),
-    periodo: str = Query(default="1y")
+    periodo: str = Query(default="1y", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
 ):
     """Compara múltiplas ações com métricas avançadas"""
-    from ..services.b3_data_service import b3_service
+    from ..services.b3_async_service import b3_async_service
     from ..services.analise_tecnica_avancada import ComparadorAcoes
     
     lista_tickers = [t.strip() for t in tickers.split(',')]
@@ -469,13 +836,9 @@ def comparar_acoes_avancado(
     if len(lista_tickers) < 2:
         raise HTTPException(status_code=400, detail="Forneça ao menos 2 tickers")
     
-    acoes_dados = {}
-    for ticker in lista_tickers:
-        dados = b3_service.buscar_dados_acao(ticker, periodo)
-        if not dados.empty:
-            acoes_dados[ticker] = dados
+    acoes_dados = await b3_async_service.buscar_varios(lista_tickers, periodo, indicadores=[])
     
-    comparacao = ComparadorAcoes.comparar_metricas(acoes_dados)
+    comparacao = await b3_async_service.calcular(ComparadorAcoes.comparar_metricas, acoes_dados)
     
     return {
         "comparacao": comparacao.to_dict(orient='records'),
@@ -485,18 +848,24 @@ def comparar_acoes_avancado(
 
 
 @app.get("/api/b3/analise/fibonacci/{ticker}")
-def get_fibonacci(ticker: str, periodo: str = Query(default="3mo")):
+async def get_fibonacci(ticker: str, periodo: str = Query(default="3mo", regex="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")):
     """Retorna níveis de Fibonacci, Camarilla e extensões"""
-    from ..services.b3_data_service import b3_service
-    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+    from ..services.b3_async_service import b3_async_service
 
-    dados = b3_service.buscar_dados_acao(ticker, periodo)
+    dados = await b3_async_service.buscar_dados_acao(ticker, periodo, indicadores=[])
     if dados.empty:
         raise HTTPException(status_code=404, detail=f"Ação {ticker} não encontrada")
 
+    return await b3_async_service.calcular(_analise_fibonacci, ticker, dados, periodo)
+
+
+def _analise_fibonacci(ticker: str, dados: pd.DataFrame, periodo: str) -> dict:
+    """Níveis de Fibonacci, Camarilla e extensões do período."""
+    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+
     fibonacci = AnaliseTecnicaAvancada.calcular_fibonacci(dados)
         
-        return {
+    return {
         "ticker": ticker,
         **fibonacci,
         "periodo": periodo,
@@ -505,7 +874,7 @@ def get_fibonacci(ticker: str, periodo: str = Query(default="3mo")):
 
 
 @app.get("/api/b3/screener")
-def screener_acoes(
+async def screener_acoes(
     pl_max: float = Query(default=None),
     rsi_max: float = Query(default=None),
     rsi_min: float = Query(default=None),
@@ -513,73 +882,65 @@ def screener_acoes(
     volume_min: float = Query(default=None)
 ):
     """
-    Screener de ações com filtros personalizados (com cache de 5 minutos)
+    Screener de ações com filtros personalizados (todo o universo, indicadores vetorizados)
     """
     from ..services.b3_data_service import b3_service
-    from ..services.analise_tecnica_avancada import AnaliseTecnicaAvancada
     from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
+    from ..services.indicadores_universo_service import indicadores_universo_service
+    from ..services.metadados_service import metadados_service
     
     # Criar chave única para este filtro
     cache_key = f"screener_{pl_max}_{rsi_max}_{rsi_min}_{score_min}_{volume_min}"
     
-    # Verificar cache (5 minutos)
+    # Verificar cache
     cached = cache_service.get(cache_key)
     if cached is not None:
         logger.info(f"📦 Screener retornado do cache")
         return cached
     
     logger.info(f"🔍 Processando Screener (sem cache)...")
-    resultados = []
     
-    # Buscar apenas 15 ações para não demorar muito
-    acoes_para_analisar = b3_service.PRINCIPAIS_ACOES[:15]
+    # Últimos valores de todos os tickers, calculados de uma vez (mantidos pelo agendador)
+    tabela = await asyncio.to_thread(indicadores_universo_service.ultimos)
     
-    for ticker_sa in acoes_para_analisar:
-        try:
+    resultados = []
+    if not tabela.empty:
+        tabela = tabela[tabela['barras'] >= 20]
+        
+        # P/L dos metadados em disco (sem rede); desconhecido não passa em pl_max
+        metadados = {ticker: metadados_service.consultar(ticker) or {} for ticker in tabela.index}
+        pl = pd.Series({t: m.get('p_l') or 0 for t, m in metadados.items()}, dtype=float).reindex(tabela.index)
+        pl_filtro = pl.where(pl != 0, 999999)
+        rsi = tabela['RSI'].fillna(50)
+        volume = tabela['Volume'].fillna(0)
+        
+        # Aplicar filtros
+        filtro = pd.Series(True, index=tabela.index)
+        if pl_max:
+            filtro &= pl_filtro <= pl_max
+        if rsi_max:
+            filtro &= rsi <= rsi_max
+        if rsi_min:
+            filtro &= rsi >= rsi_min
+        if volume_min:
+            filtro &= volume >= volume_min
+        if score_min:
+            filtro &= tabela['Score'] >= score_min
+        
+        for ticker_sa, linha in tabela[filtro].iterrows():
             ticker = ticker_sa.replace('.SA', '')
-            dados = b3_service.buscar_dados_acao(ticker, '3mo')
-            
-            if dados.empty or len(dados) < 20:
-                continue
-            
-            info = b3_service.buscar_info_acao(ticker)
-            ultimo = dados.iloc[-1]
-            
-            # Extrair valores com proteção contra None/NaN
-            pl_valor = float(info.get('p_l', 0)) if info.get('p_l') and pd.notna(info.get('p_l')) else 999999
-            rsi_valor = float(ultimo.get('RSI', 50)) if pd.notna(ultimo.get('RSI')) else 50
-            volume_valor = float(ultimo.get('Volume', 0)) if pd.notna(ultimo.get('Volume')) else 0
-            
-            # Aplicar filtros
-            if pl_max and pl_valor > pl_max:
-                continue
-            if rsi_max and rsi_valor > rsi_max:
-                continue
-            if rsi_min and rsi_valor < rsi_min:
-                continue
-            if volume_min and volume_valor < volume_min:
-                continue
-            
-            # Calcular score
-            score_data = AnaliseTecnicaAvancada.calcular_score_tecnico(dados)
-            
-            if score_min and score_data['score'] < score_min:
-                continue
-            
+            cotacao = b3_service.cotacao_em_cache(ticker_sa)
             resultados.append({
-                'ticker': str(ticker),
-                'nome': str(info.get('nome', ticker)),
-                'preco': float(info.get('preco_atual', 0)) if info.get('preco_atual') else 0.0,
-                'pl': float(pl_valor) if pl_valor < 999999 else 0.0,
-                'rsi': float(rsi_valor),
-                'score': float(score_data['score']),
-                'recomendacao': str(score_data['recomendacao']),
-                'volume': float(volume_valor)
+                'ticker': ticker,
+                'nome': str(metadados[ticker_sa].get('nome') or ticker),
+                'preco': float(cotacao['preco_atual']) if cotacao else float(linha['Close']),
+                'pl': float(pl[ticker_sa]),
+                'rsi': float(rsi[ticker_sa]),
+                'score': round(float(linha['Score']), 1),
+                'recomendacao': str(linha['Recomendacao']),
+                'volume': float(volume[ticker_sa]),
             })
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao analisar {ticker_sa} no screener: {e}")
-            continue
     
     # Ordenar por score
     resultados = sorted(resultados, key=lambda x: x['score'], reverse=True)
@@ -596,23 +957,109 @@ def screener_acoes(
         }
     }
     
-    # Cachear resultado por 5 minutos (300 segundos)
-    cache_service.set(cache_key, response, ttl=300)
+    # Cachear resultado pelo TTL de indicadores (até a próxima abertura fora do pregão)
+    cache_service.set(cache_key, response, ttl_seconds=calendario_service.ttl('indicador'))
     logger.info(f"✅ Screener processado e cacheado: {len(resultados)} resultados")
     
     return response
 
 
+@app.get("/api/b3/screener/suportes-resistencias")
+async def screener_suportes_resistencias(
+    distancia_max: float = Query(default=2.0, gt=0, le=20, description="Distância máxima (%) entre o preço e o nível"),
+    toques_min: int = Query(default=2, ge=1, description="Mínimo de toques no nível"),
+    tipo: Optional[str] = Query(default=None, regex="^(suporte|resistencia)$")
+):
+    """
+    Ações do universo negociando perto de um suporte ou resistência relevante
+    (níveis de todos os tickers detectados de uma vez sobre a matriz do universo)
+    """
+    from ..services.b3_data_service import b3_service
+    from ..services.cache_service import cache_service
+    from ..services.calendario_service import calendario_service
+    from ..services.indicadores_universo_service import indicadores_universo_service
+    
+    cache_key = f"screener_sr_{distancia_max}_{toques_min}_{tipo}"
+    cached = cache_service.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    niveis, tabela = await asyncio.gather(
+        asyncio.to_thread(indicadores_universo_service.suportes_resistencias),
+        asyncio.to_thread(indicadores_universo_service.ultimos),
+    )
+    
+    resultados = []
+    if not niveis.empty and not tabela.empty:
+        # Cotação em memória quando houver; senão o último fechamento da matriz
+        precos = tabela['Close'].astype(float)
+        for ticker in precos.index:
+            cotacao = b3_service.cotacao_em_cache(ticker)
+            if cotacao and cotacao['preco_atual']:
+                precos[ticker] = cotacao['preco_atual']
+        niveis = niveis[niveis['toques'] >= toques_min]
+        if tipo:
+            niveis = niveis[niveis['tipo'] == tipo]
+        preco = precos.reindex(niveis['ticker']).to_numpy()
+        distancia = (niveis['nivel'].to_numpy() / preco - 1) * 100
+        proximos = niveis.assign(preco=preco, distancia_pct=distancia)[np.abs(distancia) <= distancia_max]
+        for linha in proximos.iloc[np.argsort(np.abs(proximos['distancia_pct'].to_numpy()), kind='stable')].itertuples():
+            resultados.append({
+                'ticker': linha.ticker.replace('.SA', ''),
+                'tipo': linha.tipo,
+                'nivel': round(float(linha.nivel), 2),
+                'toques': int(linha.toques),
+                'volume': float(linha.volume),
+                'preco': round(float(linha.preco), 2),
+                'distancia_pct': round(float(linha.distancia_pct), 2),
+            })
+    
+    response = {
+        "resultados": resultados,
+        "total": len(resultados),
+        "filtros_aplicados": {"distancia_max": distancia_max, "toques_min": toques_min, "tipo": tipo},
+    }
+    cache_service.set(cache_key, response, ttl_seconds=calendario_service.ttl('cotacao'))
+    return response
+
+
+@app.get("/api/b3/anomalias")
+async def get_anomalias_universo(
+    severidade: str = Query(default=None, regex="^(alta|media)$"),
+    desde: int = Query(default=None, ge=0)
+):
+    """
+    Anomalias vigentes em todo o universo (volume, gap, volatilidade, variação intraday)
+    
+    Com `desde`, inclui os eventos de anomalia posteriores a essa sequência.
+    """
+    from ..services.anomalias_service import anomalias_service
+    
+    anomalias = anomalias_service.anomalias(severidade)
+    resultado = {
+        "anomalias": anomalias,
+        "total": len(anomalias),
+        "sequencia": anomalias_service.sequencia,
+        "timestamp": datetime.now().isoformat(),
+    }
+    if desde is not None:
+        resultado["eventos"] = anomalias_service.eventos_desde(desde)
+    return resultado
+
+
 @app.get("/api/b3/heatmap/market-cap")
-def get_heatmap_market_cap():
+async def get_heatmap_market_cap():
     """Retorna dados para Treemap de Market Cap"""
     from ..services.b3_data_service import b3_service
 
-    acoes = b3_service.obter_principais_acoes()
+    snapshot = await asyncio.to_thread(b3_service.buscar_snapshot_universo, incluir_market_cap=True)
+    acoes = b3_service.snapshot_para_lista(snapshot) if not snapshot.empty else []
 
     # Agrupar por setor
     setores_data = {}
     for acao in acoes:
+        if not acao['market_cap']:
+            continue
         setor = acao.get('setor', 'Outros')
         if setor not in setores_data:
             setores_data[setor] = []
@@ -621,29 +1068,161 @@ def get_heatmap_market_cap():
             'ticker': acao['ticker'].replace('.SA', ''),
             'nome': acao['nome'],
             'market_cap': acao.get('market_cap', 0),
+            # Sem metadados ainda: peso provisório pelo volume financeiro do dia
+            'market_cap_estimado': bool(acao.get('market_cap_estimado', False)),
             'variacao': acao.get('variacao_dia', 0),
             'preco': acao.get('preco_atual', 0)
         })
         
-        return {
+    return {
         "setores": setores_data,
         "total_acoes": len(acoes)
     }
 
 
+# ============= Lote (várias análises em uma requisição) =============
+
+# Análise do lote -> (indicadores necessários, período padrão do endpoint equivalente)
+ANALISES_LOTE = {
+    "acao": (INDICADORES_ACAO, "1y"),
+    "score": (INDICADORES_SCORE, "3mo"),
+    "padroes": (INDICADORES_PADROES, "1mo"),
+    "fibonacci": ([], "3mo"),
+    "volume_profile": ([], "3mo"),
+    "indicadores_avancados": (INDICADORES_AVANCADOS, "6mo"),
+}
+
+# Barras diárias: o lote usa o intervalo padrão de /api/b3/acao
+INTERVALO_LOTE = "1d"
+
+AnaliseLote = Literal["acao", "score", "padroes", "fibonacci", "volume_profile", "indicadores_avancados"]
+
+
+class ItemLote(BaseModel):
+    ticker: str = Field(..., min_length=1, max_length=12)
+    analises: List[AnaliseLote] = Field(..., min_length=1)
+    periodo: Optional[str] = Field(default=None, pattern="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
+
+
+class PedidoLote(BaseModel):
+    itens: List[ItemLote] = Field(..., min_length=1, max_length=50)
+    periodo: Optional[str] = Field(default=None, pattern="^(1d|5d|1mo|3mo|6mo|1y|2y|5y|max)$")
+
+
+@app.post("/api/b3/batch")
+async def batch_analises(pedido: PedidoLote):
+    """
+    Várias análises de vários tickers em uma requisição
+    
+    Cada (ticker, período) é buscado uma única vez, com a união dos
+    indicadores das análises pedidas, e analisado num único cálculo; os
+    tickers rodam concorrentemente. O período vale, nesta ordem, o do item,
+    o do pedido ou o padrão do endpoint equivalente de cada análise, então
+    as respostas são as mesmas dos endpoints individuais. Falhas ficam
+    restritas à análise (campo erro), sem derrubar o lote.
+    """
+    from ..services.b3_async_service import b3_async_service
+    
+    # (ticker, período) -> análises; tickers repetidos no pedido se juntam
+    grupos: Dict[tuple, List[str]] = {}
+    for item in pedido.itens:
+        ticker = item.ticker.strip().upper()
+        for analise in item.analises:
+            periodo = item.periodo or pedido.periodo or ANALISES_LOTE[analise][1]
+            analises = grupos.setdefault((ticker, periodo), [])
+            if analise not in analises:
+                analises.append(analise)
+    
+    tickers_info = sorted({ticker for (ticker, _), analises in grupos.items() if "acao" in analises})
+    infos_tarefa = asyncio.gather(*(b3_async_service.buscar_info_acao(t) for t in tickers_info))
+    
+    async def processar(ticker: str, periodo: str, analises: List[str]) -> Dict[str, Any]:
+        indicadores = list(dict.fromkeys(c for a in analises for c in ANALISES_LOTE[a][0]))
+        try:
+            dados = await b3_async_service.buscar_dados_acao(ticker, periodo, indicadores)
+        except Exception as e:
+            logger.error(f"❌ Lote: erro ao buscar {ticker} ({periodo}): {e}")
+            return {analise: {"erro": str(e)} for analise in analises}
+        if dados.empty:
+            return {analise: {"erro": f"Ação {ticker} não encontrada"} for analise in analises}
+        return await b3_async_service.calcular(_analises_lote, ticker, periodo, analises, dados)
+    
+    chaves = list(grupos)
+    resultados, infos = await asyncio.gather(
+        asyncio.gather(*(processar(t, p, grupos[(t, p)]) for t, p in chaves)),
+        infos_tarefa,
+    )
+    info_por_ticker = dict(zip(tickers_info, infos))
+    
+    resposta: Dict[str, Dict[str, Any]] = {}
+    for (ticker, periodo), analises in zip(chaves, resultados):
+        if "acao" in analises and "erro" not in analises["acao"]:
+            analises["acao"]["info"] = info_por_ticker.get(ticker)
+        resposta.setdefault(ticker, {}).update(analises)
+    
+    return serializacao.resposta_json({
+        "resultados": resposta,
+        "total_tickers": len(resposta),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def _analises_lote(ticker: str, periodo: str, analises: List[str], dados: pd.DataFrame) -> Dict[str, Any]:
+    """Roda as análises pedidas sobre o mesmo frame (uma falha não afeta as demais)."""
+    funcoes = {
+        "acao": lambda: _analise_acao(ticker, dados, periodo),
+        "score": lambda: _analise_score(ticker, dados),
+        "padroes": lambda: _analise_padroes(ticker, dados),
+        "fibonacci": lambda: _analise_fibonacci(ticker, dados, periodo),
+        "volume_profile": lambda: _analise_volume_profile(ticker, dados, periodo),
+        "indicadores_avancados": lambda: _analise_indicadores_avancados(ticker, dados),
+    }
+    resultado = {}
+    for analise in analises:
+        try:
+            resultado[analise] = funcoes[analise]()
+        except Exception as e:
+            logger.error(f"❌ Lote: erro em {analise} de {ticker}: {e}")
+            resultado[analise] = {"erro": str(e)}
+    return resultado
+
+
+def _analise_acao(ticker: str, dados: pd.DataFrame, periodo: str) -> dict:
+    """Histórico diário com indicadores, como /api/b3/acao em formato=linhas (sem info)."""
+    from ..services.memo_indicadores_service import memo_indicadores_service, impressao
+    
+    chave = ('acao', ticker.upper(), periodo, INTERVALO_LOTE, "linhas", None)
+    marca = impressao(dados)
+    dados_json = memo_indicadores_service.obter(chave, marca)
+    if dados_json is None:
+        dados_json = _serializar_acao(dados)
+        memo_indicadores_service.guardar(chave, marca, dados_json)
+    
+    return {
+        "ticker": ticker,
+        "info": None,  # preenchida pelo lote (buscada uma vez por ticker)
+        "dados": dados_json,
+        "periodo": periodo,
+        "intervalo": INTERVALO_LOTE,
+        "formato": "linhas",
+        "cursor": serializacao.datas(dados.index[-1:])[0],
+        "total_registros": len(dados),
+    }
+
+
 # ============= Paper Trading Endpoints =============
 
 @app.get("/api/paper-trading/carteira/{usuario_id}")
-def get_carteira_paper_trading(usuario_id: str):
+async def get_carteira_paper_trading(usuario_id: str):
     """Retorna carteira de paper trading do usuário"""
     from ..services.paper_trading_service import paper_trading_service
     
-    carteira = paper_trading_service.obter_carteira(usuario_id)
+    carteira = await asyncio.to_thread(paper_trading_service.obter_carteira, usuario_id)
     return carteira
 
 
 @app.post("/api/paper-trading/comprar")
-def comprar_acao_paper_trading(
+async def comprar_acao_paper_trading(
     usuario_id: str = Query(...),
     ticker: str = Query(...),
     quantidade: int = Query(...),
@@ -652,12 +1231,12 @@ def comprar_acao_paper_trading(
     """Simula compra de ação"""
     from ..services.paper_trading_service import paper_trading_service
     
-    resultado = paper_trading_service.comprar_acao(usuario_id, ticker, quantidade, preco)
+    resultado = await asyncio.to_thread(paper_trading_service.comprar_acao, usuario_id, ticker, quantidade, preco)
     return resultado
 
 
 @app.post("/api/paper-trading/vender")
-def vender_acao_paper_trading(
+async def vender_acao_paper_trading(
     usuario_id: str = Query(...),
     ticker: str = Query(...),
     quantidade: int = Query(...),
@@ -666,37 +1245,38 @@ def vender_acao_paper_trading(
     """Simula venda de ação"""
     from ..services.paper_trading_service import paper_trading_service
     
-    resultado = paper_trading_service.vender_acao(usuario_id, ticker, quantidade, preco)
+    resultado = await asyncio.to_thread(paper_trading_service.vender_acao, usuario_id, ticker, quantidade, preco)
     return resultado
 
 
 @app.get("/api/paper-trading/patrimonio/{usuario_id}")
-def get_patrimonio_paper_trading(usuario_id: str, tickers: str = Query(default="")):
+async def get_patrimonio_paper_trading(usuario_id: str, tickers: str = Query(default="")):
     """Calcula patrimônio total da carteira"""
     from ..services.paper_trading_service import paper_trading_service
-    from ..services.b3_data_service import b3_service
+    from ..services.b3_async_service import b3_async_service
     
-    carteira = paper_trading_service.obter_carteira(usuario_id)
+    carteira = await asyncio.to_thread(paper_trading_service.obter_carteira, usuario_id)
     
-    # Buscar preços atuais
+    # Buscar preços atuais (concorrentes)
+    tickers_carteira = list(carteira['posicoes'].keys())
+    infos = await asyncio.gather(*map(b3_async_service.buscar_info_acao, tickers_carteira))
     precos_atuais = {}
-    for ticker in carteira['posicoes'].keys():
-        try:
-            info = b3_service.buscar_info_acao(ticker)
+    for ticker, info in zip(tickers_carteira, infos):
+        if info is not None:
             precos_atuais[ticker] = info.get('preco_atual', 0)
-        except:
+        else:
             precos_atuais[ticker] = carteira['posicoes'][ticker]['preco_medio']
     
-    patrimonio = paper_trading_service.calcular_patrimonio(usuario_id, precos_atuais)
+    patrimonio = await asyncio.to_thread(paper_trading_service.calcular_patrimonio, usuario_id, precos_atuais)
     return patrimonio
 
 
 @app.post("/api/paper-trading/resetar/{usuario_id}")
-def resetar_carteira_paper_trading(usuario_id: str):
+async def resetar_carteira_paper_trading(usuario_id: str):
     """Reseta a carteira para o estado inicial"""
     from ..services.paper_trading_service import paper_trading_service
     
-    resultado = paper_trading_service.resetar_carteira(usuario_id)
+    resultado = await asyncio.to_thread(paper_trading_service.resetar_carteira, usuario_id)
     return resultado
 
 
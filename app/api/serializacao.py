@@ -0,0 +1,263 @@
+"""
+Serialização das Respostas da API
+Colunas NumPy direto para JSON (orjson), Arrow IPC ou MessagePack, sem conversão linha a linha
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, o json da biblioteca padrão com conversão prévia
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MIME_ARROW = "application/vnd.apache.arrow.stream"
+MIME_MSGPACK = "application/msgpack"
+
+# Campo da resposta -> coluna do histórico (na ordem da resposta)
+CAMPOS_ACAO: List[Tuple[str, str]] = [
+    ("abertura", "Open"),
+    ("maxima", "High"),
+    ("minima", "Low"),
+    ("fechamento", "Close"),
+    ("volume", "Volume"),
+    ("rsi", "RSI"),
+    ("sma_20", "SMA_20"),
+    ("sma_50", "SMA_50"),
+    ("sma_200", "SMA_200"),
+    ("macd", "MACD"),
+    ("macd_signal", "Signal"),
+    ("bb_upper", "BB_Upper"),
+    ("bb_middle", "BB_Middle"),
+    ("bb_lower", "BB_Lower"),
+    ("volatilidade", "Volatility"),
+]
+
+# Campos inteiros (quando não há lacunas)
+CAMPOS_INTEIROS = {"volume"}
+
+
+def resposta_json(conteudo: Any, status_code: int = 200) -> Response:
+    """
+    Resposta JSON que aceita arrays e escalares NumPy (NaN/inf viram null)
+
+    Devolver um Response pula o jsonable_encoder do FastAPI, que percorre
+    cada valor em Python antes da serialização.
+    """
+    if orjson is not None:
+        return Response(
+            orjson.dumps(conteudo, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS),
+            status_code=status_code,
+            media_type="application/json",
+        )
+    return JSONResponse(jsonable_encoder(_para_python(conteudo)), status_code=status_code)
+
+
+def _para_python(valor: Any) -> Any:
+    """Converte arrays/escalares NumPy em tipos nativos (NaN -> None) para o json padrão"""
+    if isinstance(valor, dict):
+        return {chave: _para_python(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_para_python(v) for v in valor]
+    if isinstance(valor, np.ndarray):
+        return lista(valor)
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not np.isfinite(valor):
+        return None
+    return valor
+
+
+def lista(valores: np.ndarray) -> list:
+    """Array -> lista Python com None no lugar de NaN (vetorizado)"""
+    valores = np.asarray(valores)
+    if valores.dtype.kind != 'f':
+        return valores.tolist()
+    objetos = valores.astype(object)
+    objetos[~np.isfinite(valores)] = None
+    return objetos.tolist()
+
+
+def datas(indice: pd.Index) -> List[str]:
+    """Datas no formato AAAA-MM-DD (lista: o orjson não serializa arrays de objetos)"""
+    indice = pd.DatetimeIndex(indice)
+    if indice.tz is not None:
+        indice = indice.tz_localize(None)  # data local do pregão
+    return np.datetime_as_string(indice.to_numpy().astype('datetime64[D]'), unit='D').tolist()
+
+
+def colunas(dados: pd.DataFrame, campos: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Um array por campo (colunas ausentes viram null); ordem: data e os campos.
+    Inteiros sem lacunas saem como int64, os demais como float64 com NaN.
+    """
+    resultado = colunas_numpy(dados, campos)
+    resultado["data"] = datas(resultado["data"])
+    return resultado
+
+
+def colunas_numpy(dados: pd.DataFrame, campos: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    Como colunas(), mas com a data ainda como DatetimeIndex. Colunas float64
+    são as do próprio frame (sem cópia), prontas para os formatos binários.
+    """
+    resultado: Dict[str, Any] = {"data": pd.DatetimeIndex(dados.index)}
+    ausente = np.full(len(dados), np.nan)
+    for campo, coluna in campos:
+        valores = dados[coluna].to_numpy() if coluna in dados.columns else ausente
+        if valores.dtype != np.float64:
+            valores = valores.astype(np.float64)
+        if campo in CAMPOS_INTEIROS and not np.isnan(valores).any():
+            valores = valores.astype(np.int64)
+        resultado[campo] = valores
+    return resultado
+
+
+def registros(colunas_por_campo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Colunas -> lista de registros (um dict por linha), sem iterrows"""
+    nomes = list(colunas_por_campo)
+    valores = [_valores_registro(nome, colunas_por_campo[nome]) for nome in nomes]
+    return [dict(zip(nomes, linha)) for linha in zip(*valores)]
+
+
+def _valores_registro(nome: str, valores: Any) -> list:
+    valores = np.asarray(valores)
+    if nome in CAMPOS_INTEIROS and valores.dtype.kind == 'f':
+        # Inteiro onde houver valor (como o int() da versão por linha)
+        convertidos = np.full(len(valores), None, dtype=object)
+        validos = np.isfinite(valores)
+        convertidos[validos] = valores[validos].astype(np.int64).tolist()
+        return convertidos.tolist()
+    return lista(valores)
+
+
+# ============= Formatos binários =============
+
+def formato_binario(accept: Optional[str]) -> Optional[str]:
+    """
+    Tipo binário pedido no cabeçalho Accept (pela qualidade q), se a biblioteca
+    dele estiver instalada; None quando o JSON é o preferido
+    """
+    if not accept:
+        return None
+    disponiveis = {MIME_ARROW: pa is not None, MIME_MSGPACK: msgpack is not None}
+    preferencias = []
+    for posicao, item in enumerate(accept.split(",")):
+        partes = [p.strip() for p in item.split(";")]
+        qualidade = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith("q="):
+                try:
+                    qualidade = float(parametro[2:])
+                except ValueError:
+                    qualidade = 0.0
+        preferencias.append((-qualidade, posicao, partes[0].lower()))
+
+    for qualidade, _, mime in sorted(preferencias):
+        if qualidade == 0:
+            break
+        if disponiveis.get(mime):
+            return mime
+        if mime in ("application/json", "*/*", "application/*"):
+            return None
+    return None
+
+
+def resposta_binaria(mime: str, dados: Dict[str, Any], metadados: Dict[str, Any],
+                     rotulo: Optional[str] = None) -> Response:
+    """
+    Séries em Arrow IPC (stream) ou MessagePack
+
+    Args:
+        mime: MIME_ARROW ou MIME_MSGPACK (ver formato_binario)
+        dados: Colunas de uma série ({'data': DatetimeIndex, campo: array}), ou,
+            com `rotulo`, várias séries {nome: colunas} com os mesmos campos
+        metadados: Campos escalares da resposta (ticker, período, info...)
+        rotulo: Nome da coluna que identifica a série quando há várias (ex.: 'ticker')
+
+    No Arrow, cada série vira um record batch montado sobre os próprios arrays
+    (sem cópia para objetos Python); os metadados vão, em JSON, nos metadados
+    do schema (chave 'metadados'). No MessagePack, cada coluna numérica é
+    {'tipo': dtype NumPy, 'dados': bytes little-endian} e as datas são texto.
+    """
+    series = dados if rotulo else {None: dados}
+    if mime == MIME_ARROW:
+        return Response(_arrow(series, metadados, rotulo), media_type=MIME_ARROW)
+
+    empacotadas = {nome: {campo: _coluna_msgpack(valores) for campo, valores in colunas_serie.items()}
+                   for nome, colunas_serie in series.items()}
+    conteudo = {**_para_python(metadados), "dados": empacotadas if rotulo else empacotadas[None]}
+    return Response(msgpack.packb(conteudo, use_bin_type=True), media_type=MIME_MSGPACK)
+
+
+def _arrow(series: Dict[Optional[str], Dict[str, Any]], metadados: Dict[str, Any],
+           rotulo: Optional[str]) -> bytes:
+    lotes = []
+    for nome, colunas_serie in series.items():
+        # from_pandas: NaN vira nulo (só ganha um bitmap de validade; os valores não são copiados)
+        arrays = {campo: pa.array(valores, from_pandas=True) for campo, valores in colunas_serie.items()}
+        if rotulo:
+            indices = pa.array(np.zeros(len(colunas_serie["data"]), dtype=np.int32))
+            arrays = {rotulo: pa.DictionaryArray.from_arrays(indices, pa.array([nome], pa.string())), **arrays}
+        lotes.append(pa.RecordBatch.from_pydict(arrays))
+
+    if lotes:
+        # O stream tem um schema só, mas uma coluna pode vir com tipos diferentes
+        # por série (volume int64 numa e float64 noutra, ou só nulos): vale o
+        # tipo mais largo, e cada lote é convertido para ele
+        schema = pa.unify_schemas([lote.schema for lote in lotes], promote_options="permissive")
+        lotes = [_no_schema(lote, schema) for lote in lotes]
+    else:
+        schema = pa.schema([("data", pa.timestamp("ns"))])
+    schema = schema.with_metadata({"metadados": _json_bytes(metadados)})
+
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, schema) as escritor:
+        for lote in lotes:
+            escritor.write_batch(lote.replace_schema_metadata(schema.metadata))
+    return saida.getvalue().to_pybytes()
+
+
+def _no_schema(lote: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """Lote com as colunas e tipos do schema unificado (nulos onde a série não tem o campo)"""
+    if lote.schema.equals(schema):
+        return lote
+    colunas = [
+        lote.column(campo.name).cast(campo.type) if campo.name in lote.schema.names
+        else pa.nulls(lote.num_rows, campo.type)
+        for campo in schema
+    ]
+    return pa.RecordBatch.from_arrays(colunas, schema=schema)
+
+
+def _coluna_msgpack(valores: Any) -> Any:
+    if isinstance(valores, pd.DatetimeIndex):
+        return datas(valores)
+    valores = np.asarray(valores)
+    if valores.dtype.kind in "fiub":
+        valores = valores.astype(valores.dtype.newbyteorder("<"), copy=False)
+        return {"tipo": valores.dtype.str, "dados": valores.tobytes()}
+    return valores.tolist()
+
+
+def _json_bytes(conteudo: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(conteudo, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_para_python(conteudo), default=str).encode()
@@ -0,0 +1,145 @@
+"""
+Agendador de Tarefas em Segundo Plano
+Pré-aquece e renova caches antes de expirarem, no próprio processo da API
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from .calendario_service import TTLS, calendario_service
+
+logger = logging.getLogger(__name__)
+
+
+class Tarefa:
+    """Tarefa periódica com métricas de execução"""
+
+    def __init__(self, nome: str, funcao: Callable[[], Any], intervalo: float, atraso_inicial: float = 0,
+                 classe_ttl: Optional[str] = None):
+        """
+        Args:
+            nome: Identificador da tarefa
+            funcao: Função síncrona executada em thread separada
+            intervalo: Segundos entre execuções (o máximo, com classe_ttl)
+            atraso_inicial: Segundos de espera antes da primeira execução
+            classe_ttl: Classe de TTL (calendario_service) das chaves que a tarefa
+                renova; o intervalo fica abaixo desse TTL em todas as fases do pregão
+        """
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.classe_ttl = classe_ttl
+        self.atraso_inicial = atraso_inicial
+        self.execucoes = 0
+        self.falhas = 0
+        self.ultima_execucao: Optional[datetime] = None
+        self.ultima_duracao_ms: Optional[float] = None
+        self.ultimo_erro: Optional[str] = None
+        self.proxima_execucao: Optional[datetime] = None
+        self.em_execucao = False
+
+    def proximo_intervalo(self, momento: Optional[datetime] = None) -> float:
+        """Segundos até a próxima execução (recalculado a cada uma: o TTL muda com a fase do dia)"""
+        if self.classe_ttl is None:
+            return self.intervalo
+        return min(self.intervalo, calendario_service.intervalo_renovacao(self.classe_ttl, momento))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'nome': self.nome,
+            'intervalo_segundos': self.proximo_intervalo(),
+            'classe_ttl': self.classe_ttl,
+            'execucoes': self.execucoes,
+            'falhas': self.falhas,
+            'em_execucao': self.em_execucao,
+            'ultima_execucao': self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            'ultima_duracao_ms': self.ultima_duracao_ms,
+            'ultimo_erro': self.ultimo_erro,
+            'proxima_execucao': self.proxima_execucao.isoformat() if self.proxima_execucao else None,
+        }
+
+
+class AgendadorService:
+    """Executa tarefas periódicas no event loop da aplicação"""
+
+    def __init__(self):
+        self._tarefas: Dict[str, Tarefa] = {}
+        self._execucoes: List[asyncio.Task] = []
+
+    def registrar(self, nome: str, funcao: Callable[[], Any], intervalo: float, atraso_inicial: float = 0,
+                  classe_ttl: Optional[str] = None):
+        """Registra uma tarefa periódica (antes de iniciar)"""
+        tarefa = Tarefa(nome, funcao, intervalo, atraso_inicial, classe_ttl)
+        if classe_ttl is not None:
+            if classe_ttl not in TTLS['pregao']:
+                raise ValueError(f"Classe de TTL desconhecida: {classe_ttl}")
+            if tarefa.proximo_intervalo() >= calendario_service.ttl(classe_ttl):
+                raise ValueError(f"Tarefa '{nome}' renovaria depois de as chaves expirarem")
+        self._tarefas[nome] = tarefa
+
+    @property
+    def ativo(self) -> bool:
+        return any(not execucao.done() for execucao in self._execucoes)
+
+    def iniciar(self):
+        """Inicia todas as tarefas registradas (chamar dentro do event loop)"""
+        if self.ativo:
+            return
+        self._execucoes = [
+            asyncio.create_task(self._loop(tarefa), name=f"agendador-{tarefa.nome}")
+            for tarefa in self._tarefas.values()
+        ]
+        logger.info(f"⏰ Agendador iniciado com {len(self._execucoes)} tarefas")
+
+    async def parar(self):
+        """Cancela as tarefas e aguarda o encerramento"""
+        for execucao in self._execucoes:
+            execucao.cancel()
+        await asyncio.gather(*self._execucoes, return_exceptions=True)
+        self._execucoes = []
+        logger.info("⏰ Agendador encerrado")
+
+    async def _loop(self, tarefa: Tarefa):
+        tarefa.proxima_execucao = datetime.now() + timedelta(seconds=tarefa.atraso_inicial)
+        await asyncio.sleep(tarefa.atraso_inicial)
+        while True:
+            await self._executar(tarefa)
+            intervalo = tarefa.proximo_intervalo()
+            tarefa.proxima_execucao = datetime.now() + timedelta(seconds=intervalo)
+            await asyncio.sleep(intervalo)
+
+    async def _executar(self, tarefa: Tarefa):
+        inicio = time.perf_counter()
+        tarefa.em_execucao = True
+        try:
+            await asyncio.to_thread(tarefa.funcao)
+            tarefa.ultimo_erro = None
+        except Exception as e:
+            tarefa.falhas += 1
+            tarefa.ultimo_erro = str(e)
+            logger.error(f"❌ Tarefa agendada '{tarefa.nome}' falhou: {e}")
+        finally:
+            tarefa.em_execucao = False
+            tarefa.execucoes += 1
+            tarefa.ultima_execucao = datetime.now()
+            tarefa.ultima_duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def tarefas(self) -> List[Tarefa]:
+        """Tarefas registradas"""
+        return list(self._tarefas.values())
+
+    def status(self) -> Dict[str, Any]:
+        """Métricas de todas as tarefas (para monitoramento)"""
+        return {
+            'ativo': self.ativo,
+            'tarefas': [tarefa.status() for tarefa in self._tarefas.values()],
+        }
+
+
+# Instância global
+agendador_service = AgendadorService()
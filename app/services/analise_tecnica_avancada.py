@@ -8,6 +8,8 @@ import numpy as np
 from typing import Dict, List, Tuple, Any
 from datetime import datetime, timedelta
 
+from . import indicadores_kernels
+
 
 class AnaliseTecnicaAvancada:
     """Classe para análises técnicas avançadas"""
@@ -80,39 +82,17 @@ class AnaliseTecnicaAvancada:
     @staticmethod
     def calcular_obv(dados: pd.DataFrame) -> pd.Series:
         """Calcula OBV (On Balance Volume)"""
-        obv = pd.Series(index=dados.index, dtype=float)
-        obv.iloc[0] = dados['Volume'].iloc[0]
-        
-        for i in range(1, len(dados)):
-            if dados['Close'].iloc[i] > dados['Close'].iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] + dados['Volume'].iloc[i]
-            elif dados['Close'].iloc[i] < dados['Close'].iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] - dados['Volume'].iloc[i]
-            else:
-                obv.iloc[i] = obv.iloc[i-1]
-        
-        return obv
+        obv = indicadores_kernels.obv(dados['Close'].to_numpy(), dados['Volume'].to_numpy())
+        return pd.Series(obv, index=dados.index)
     
     @staticmethod
     def calcular_mfi(dados: pd.DataFrame, periodo: int = 14) -> pd.Series:
         """Calcula MFI (Money Flow Index)"""
-        typical_price = (dados['High'] + dados['Low'] + dados['Close']) / 3
-        money_flow = typical_price * dados['Volume']
-        
-        positive_flow = pd.Series(0, index=dados.index)
-        negative_flow = pd.Series(0, index=dados.index)
-        
-        for i in range(1, len(dados)):
-            if typical_price.iloc[i] > typical_price.iloc[i-1]:
-                positive_flow.iloc[i] = money_flow.iloc[i]
-            elif typical_price.iloc[i] < typical_price.iloc[i-1]:
-                negative_flow.iloc[i] = money_flow.iloc[i]
-        
-        positive_mf = positive_flow.rolling(window=periodo).sum()
-        negative_mf = negative_flow.rolling(window=periodo).sum()
-        
-        mfi = 100 - (100 / (1 + (positive_mf / negative_mf)))
-        return mfi
+        mfi = indicadores_kernels.mfi(
+            dados['High'].to_numpy(), dados['Low'].to_numpy(),
+            dados['Close'].to_numpy(), dados['Volume'].to_numpy(), periodo,
+        )
+        return pd.Series(mfi, index=dados.index)
     
     @staticmethod
     def calcular_force_index(dados: pd.DataFrame, periodo: int = 13) -> pd.Series:
@@ -239,28 +219,31 @@ class AnaliseTecnicaAvancada:
         }
     
     @staticmethod
-    def detectar_suportes_resistencias(dados: pd.DataFrame, janela: int = 20) -> Dict[str, List[float]]:
-        """Detecta níveis de suporte e resistência"""
-        highs = dados['High'].rolling(window=janela, center=True).max()
-        lows = dados['Low'].rolling(window=janela, center=True).min()
-        
-        resistencias = []
-        suportes = []
-        
-        for i in range(janela, len(dados) - janela):
-            if dados['High'].iloc[i] == highs.iloc[i]:
-                resistencias.append(dados['High'].iloc[i])
-            if dados['Low'].iloc[i] == lows.iloc[i]:
-                suportes.append(dados['Low'].iloc[i])
-        
-        # Agrupar níveis próximos
-        resistencias = list(set([round(r, 2) for r in resistencias]))
-        suportes = list(set([round(s, 2) for s in suportes]))
-        
-        return {
-            'resistencias': sorted(resistencias, reverse=True)[:5],
-            'suportes': sorted(suportes, reverse=True)[:5]
-        }
+    def detectar_suportes_resistencias(dados: pd.DataFrame, janela: int = 20,
+                                       tolerancia: float = 0.005, limite: int = 5) -> Dict[str, Any]:
+        """
+        Detecta níveis de suporte e resistência
+        
+        Máximas/mínimas locais (extremos da janela centrada) são agrupadas quando
+        ficam a menos de `tolerancia` (fração do preço) umas das outras. Os níveis
+        mais tocados (e, no empate, com mais volume) são os retornados, do maior
+        para o menor preço.
+        """
+        volume = dados['Volume'].to_numpy(dtype=float)
+        resultado: Dict[str, Any] = {}
+        for chave, coluna, maximo in (('resistencias', 'High', True), ('suportes', 'Low', False)):
+            precos = dados[coluna].to_numpy(dtype=float)
+            toques = indicadores_kernels.extremos_locais(precos, janela, maximo=maximo)
+            niveis = indicadores_kernels.agrupar_niveis(precos[toques], volume[toques], tolerancia)
+            
+            principais = np.argsort(-niveis['nivel'][:limite], kind='stable')
+            resultado[chave] = [round(float(n), 2) for n in niveis['nivel'][:limite][principais]]
+            resultado[f'{chave}_detalhe'] = [
+                {'nivel': round(float(n), 2), 'toques': int(t), 'volume': float(v)}
+                for n, t, v in zip(niveis['nivel'][:limite][principais], niveis['toques'][:limite][principais],
+                                   niveis['peso'][:limite][principais])
+            ]
+        return resultado
     
     @staticmethod
     def calcular_score_tecnico(dados: pd.DataFrame) -> Dict[str, Any]:
@@ -309,7 +292,10 @@ class AnaliseTecnicaAvancada:
         
         # Volume
         volume_atual = ultimo['Volume']
-        volume_medio = dados['Volume'].rolling(20).mean().iloc[-1]
+        if 'Volume_SMA' in dados.columns:
+            volume_medio = ultimo['Volume_SMA']
+        else:
+            volume_medio = dados['Volume'].rolling(20).mean().iloc[-1]
         if volume_atual > volume_medio * 1.5:
             scores.append(75)
             sinais.append('Volume Alto')
@@ -321,17 +307,7 @@ class AnaliseTecnicaAvancada:
             sinais.append('Volume Normal')
         
         score_final = sum(scores) / len(scores)
-        
-        if score_final >= 75:
-            recomendacao = 'COMPRA FORTE 🟢🟢'
-        elif score_final >= 60:
-            recomendacao = 'COMPRA 🟢'
-        elif score_final >= 40:
-            recomendacao = 'NEUTRO 🟡'
-        elif score_final >= 25:
-            recomendacao = 'VENDA 🔴'
-        else:
-            recomendacao = 'VENDA FORTE 🔴🔴'
+        recomendacao = str(indicadores_kernels.recomendacao(score_final))
         
         return {
             'score': round(score_final, 1),
@@ -339,6 +315,30 @@ class AnaliseTecnicaAvancada:
             'sinais': sinais
         }
     
+    @staticmethod
+    def calcular_score_tecnico_serie(dados: pd.DataFrame) -> pd.DataFrame:
+        """
+        Score Técnico (0-100) e recomendação de todas as barras em uma passada,
+        com as mesmas regras de calcular_score_tecnico
+        """
+        def coluna(nome: str, padrao: np.ndarray) -> np.ndarray:
+            return dados[nome].to_numpy(dtype=float) if nome in dados.columns else padrao
+        
+        close = dados['Close'].to_numpy(dtype=float)
+        volume = dados['Volume'].to_numpy(dtype=float)
+        ausente = np.full(len(dados), np.nan)
+        
+        # Colunas ausentes caem nos mesmos ramos que os padrões da versão escalar
+        score = indicadores_kernels.score_tecnico(
+            coluna('RSI', ausente), coluna('MACD', ausente), coluna('Signal', ausente), close,
+            coluna('SMA_20', close), coluna('SMA_50', close), volume,
+            coluna('Volume_SMA', indicadores_kernels.media_movel(volume, 20)),
+        )
+        return pd.DataFrame(
+            {'score': score, 'recomendacao': indicadores_kernels.recomendacao(score)},
+            index=dados.index,
+        )
+    
     @staticmethod
     def detectar_anomalias(dados: pd.DataFrame) -> List[Dict[str, Any]]:
         """Detecta anomalias no comportamento da ação"""
@@ -347,6 +347,8 @@ class AnaliseTecnicaAvancada:
         if len(dados) < 20:
             return anomalias
         
+        # Só as barras que entram nas janelas de 20 pregões anteriores à última
+        dados = dados.iloc[-22:]
         ultimo = dados.iloc[-1]
         
         # Volume anormal
@@ -398,13 +400,10 @@ class AnaliseTecnicaAvancada:
         price_max = dados['High'].max()
         
         price_bins = np.linspace(price_min, price_max, bins + 1)
-        volume_at_price = np.zeros(bins)
-        
-        for _, row in dados.iterrows():
-            typical_price = (row['High'] + row['Low'] + row['Close']) / 3
-            bin_idx = np.digitize(typical_price, price_bins) - 1
-            if 0 <= bin_idx < bins:
-                volume_at_price[bin_idx] += row['Volume']
+        volume_at_price = indicadores_kernels.perfil_volume(
+            dados['High'].to_numpy(), dados['Low'].to_numpy(),
+            dados['Close'].to_numpy(), dados['Volume'].to_numpy(), price_bins,
+        )
         
         # Encontrar POC (Point of Control) - preço com maior volume
         poc_idx = np.argmax(volume_at_price)
@@ -0,0 +1,294 @@
+"""
+Scanner de Anomalias do Universo
+Estatísticas de volume e retorno em buffers circulares por ticker, atualizadas a cada barra ou cotação
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Pregões usados nas médias de volume e no desvio dos retornos
+JANELA = 20
+
+# Mesmos limites de AnaliseTecnicaAvancada.detectar_anomalias
+MULTIPLO_VOLUME = 3
+GAP_PCT = 5
+MULTIPLO_VOLATILIDADE = 3
+VARIACAO_INTRADAY_PCT = 10
+
+MAX_EVENTOS = 500
+
+# Colunas da barra corrente
+ABERTURA, MAXIMA, MINIMA, FECHAMENTO, VOLUME = range(5)
+
+
+class AnomaliasService:
+    """
+    Scanner de anomalias de todo o universo
+
+    Cada ticker é uma linha de arrays NumPy: volumes e retornos dos últimos
+    JANELA pregões fechados (buffers circulares), o fechamento do pregão
+    anterior e a barra corrente. Uma cotação nova substitui a barra corrente;
+    uma barra de data posterior fecha a corrente e a empurra para os buffers.
+    O custo por atualização é O(JANELA), independente do tamanho do histórico.
+    """
+
+    def __init__(self, janela: int = JANELA):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._linhas: Dict[str, int] = {}
+        self._tickers: List[str] = []
+        self._volumes = np.empty((0, janela))
+        self._retornos = np.empty((0, janela))
+        self._posicao = np.zeros(0, dtype=np.int64)
+        self._preenchidos = np.zeros(0, dtype=np.int64)
+        self._fechamento_anterior = np.empty(0)
+        self._barra = np.empty((0, 5))
+        self._data = np.empty(0, dtype='datetime64[D]')
+        # (ticker, tipo) -> anomalia vigente na barra corrente
+        self._ativas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._eventos: Deque[Dict[str, Any]] = deque(maxlen=MAX_EVENTOS)
+        self._sequencia = 0
+        self._ultimas_barras: Optional[pd.DataFrame] = None
+
+    # ============= Estado =============
+
+    def aquecer(self, tickers: List[str], datas: pd.DatetimeIndex, precos: Dict[str, np.ndarray]):
+        """
+        (Re)inicia o estado a partir de matrizes OHLCV (tickers × datas, NaN onde
+        o ticker não negociou), como as de MatrizUniverso. A última barra de cada
+        ticker vira a barra corrente; as anteriores alimentam os buffers.
+        """
+        n = len(tickers)
+        volumes = np.full((n, self.janela), np.nan)
+        retornos = np.full((n, self.janela), np.nan)
+        preenchidos = np.zeros(n, dtype=np.int64)
+        fechamento_anterior = np.full(n, np.nan)
+        barra = np.full((n, 5), np.nan)
+        data = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+        dias = _dias(datas)
+
+        colunas = [precos[c] for c in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        for linha in range(n):
+            validos = np.flatnonzero(~np.isnan(colunas[FECHAMENTO][linha]))
+            if len(validos) == 0:
+                continue
+            corrente, fechados = validos[-1], validos[:-1][-(self.janela + 1):]
+            barra[linha] = [coluna[linha, corrente] for coluna in colunas]
+            data[linha] = dias[corrente]
+            if len(fechados) == 0:
+                continue
+
+            fechamentos = colunas[FECHAMENTO][linha, fechados]
+            fechamento_anterior[linha] = fechamentos[-1]
+            # Volume e retorno de cada pregão fechado (o mais antigo não tem retorno)
+            quantidade = len(fechados) - 1
+            if quantidade == 0:
+                continue
+            # Do mais antigo para o mais recente a partir da posição 0: quando o
+            # buffer está cheio, a próxima escrita (posição 0) descarta o mais antigo
+            volumes[linha, :quantidade] = colunas[VOLUME][linha, fechados[1:]]
+            retornos[linha, :quantidade] = fechamentos[1:] / fechamentos[:-1] - 1
+            preenchidos[linha] = quantidade
+
+        with self._lock:
+            self._tickers = list(tickers)
+            self._linhas = {ticker: linha for linha, ticker in enumerate(tickers)}
+            self._volumes, self._retornos = volumes, retornos
+            self._preenchidos = preenchidos
+            self._posicao = preenchidos % self.janela
+            self._fechamento_anterior, self._barra, self._data = fechamento_anterior, barra, data
+            # As últimas cotações podem ser mais novas que o histórico; as
+            # anomalias vigentes são mantidas para não repetir eventos
+            if self._ultimas_barras is not None:
+                self._aplicar(self._ultimas_barras)
+            for chave in [c for c in self._ativas if c[0] not in self._linhas]:
+                del self._ativas[chave]
+            self._detectar(np.arange(len(self._tickers)))
+        logger.info(f"🚨 Scanner de anomalias aquecido com {n} tickers ({len(self._ativas)} anomalias)")
+
+    def atualizar(self, barras: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Aplica barras/cotações novas (índice = ticker; colunas data, Open, High,
+        Low, Close, Volume) e retorna as anomalias que surgiram com elas
+        """
+        if barras.empty:
+            return []
+
+        with self._lock:
+            self._ultimas_barras = barras
+            return self._detectar(self._aplicar(barras))
+
+    def _aplicar(self, barras: pd.DataFrame) -> np.ndarray:
+        """Atualiza o estado com as barras e retorna as linhas alteradas"""
+        linhas = np.array([self._linha(ticker) for ticker in barras.index], dtype=np.int64)
+        datas = _dias(pd.DatetimeIndex(barras['data']))
+        valores = barras[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype=float)
+
+        atual = self._data[linhas]
+        sem_barra = np.isnat(atual)
+        nova = ~sem_barra & (datas > atual)
+        mesma = ~sem_barra & (datas == atual)
+
+        # Pregão novo: a barra corrente fecha e entra nos buffers
+        fechar = linhas[nova]
+        if len(fechar):
+            anterior = self._fechamento_anterior[fechar]
+            fechamento = self._barra[fechar, FECHAMENTO]
+            posicao = self._posicao[fechar]
+            self._volumes[fechar, posicao] = self._barra[fechar, VOLUME]
+            self._retornos[fechar, posicao] = fechamento / anterior - 1
+            self._posicao[fechar] = (posicao + 1) % self.janela
+            self._preenchidos[fechar] = np.minimum(self._preenchidos[fechar] + 1, self.janela)
+            self._fechamento_anterior[fechar] = fechamento
+
+        aplicar = sem_barra | nova | mesma
+        self._barra[linhas[aplicar]] = valores[aplicar]
+        self._data[linhas[aplicar]] = datas[aplicar]
+        return linhas[aplicar]
+
+    def atualizar_snapshot(self, snapshot: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Aplica o snapshot de cotações do universo (B3DataService.buscar_snapshot_universo)"""
+        if snapshot.empty or 'data' not in snapshot.columns:
+            return []
+        barras = pd.DataFrame({
+            'data': snapshot['data'],
+            'Open': snapshot['abertura'],
+            'High': snapshot['maxima'],
+            'Low': snapshot['minima'],
+            'Close': snapshot['preco_atual'],
+            'Volume': snapshot['volume'],
+        }).dropna(subset=['Open', 'Close'])  # sem abertura: o ticker não negociou no pregão
+        return self.atualizar(barras)
+
+    def _linha(self, ticker: str) -> int:
+        """Linha do ticker (tickers fora do aquecimento ganham uma linha vazia)"""
+        linha = self._linhas.get(ticker)
+        if linha is None:
+            linha = len(self._tickers)
+            self._linhas[ticker] = linha
+            self._tickers.append(ticker)
+            self._volumes = np.vstack([self._volumes, np.full((1, self.janela), np.nan)])
+            self._retornos = np.vstack([self._retornos, np.full((1, self.janela), np.nan)])
+            self._posicao = np.append(self._posicao, 0)
+            self._preenchidos = np.append(self._preenchidos, 0)
+            self._fechamento_anterior = np.append(self._fechamento_anterior, np.nan)
+            self._barra = np.vstack([self._barra, np.full((1, 5), np.nan)])
+            self._data = np.append(self._data, np.datetime64('NaT', 'D'))
+        return linha
+
+    # ============= Detecção =============
+
+    def _detectar(self, linhas: np.ndarray) -> List[Dict[str, Any]]:
+        """Reavalia as linhas (vetorizado) e registra as anomalias novas como eventos"""
+        if len(linhas) == 0:
+            return []
+
+        barra = self._barra[linhas]
+        anterior = self._fechamento_anterior[linhas]
+        cheio = self._preenchidos[linhas] >= self.janela
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_medio = self._volumes[linhas].mean(axis=1)
+            volume_desvio = self._volumes[linhas].std(axis=1, ddof=1)
+            volatilidade_media = self._retornos[linhas].std(axis=1, ddof=1)
+            gap_pct = np.abs((barra[:, ABERTURA] - anterior) / anterior) * 100
+            retorno = barra[:, FECHAMENTO] / anterior - 1
+            variacao_intraday = (barra[:, MAXIMA] - barra[:, MINIMA]) / barra[:, MINIMA] * 100
+            # Desvios-padrão da barra corrente em relação à janela (volume e retorno)
+            z_volume = (barra[:, VOLUME] - volume_medio) / volume_desvio
+            z_retorno = retorno / volatilidade_media
+
+            condicoes = {
+                'VOLUME_ALTO': cheio & (barra[:, VOLUME] > volume_medio * MULTIPLO_VOLUME),
+                'GAP': gap_pct > GAP_PCT,
+                'VOLATILIDADE': cheio & (np.abs(retorno) > volatilidade_media * MULTIPLO_VOLATILIDADE),
+                'VARIACAO_INTRADAY': variacao_intraday > VARIACAO_INTRADAY_PCT,
+            }
+
+        novas = []
+        sinalizadas = set()
+        agora = datetime.now().isoformat()
+        for tipo, condicao in condicoes.items():
+            # Só as linhas sinalizadas passam pelo Python (normalmente poucas)
+            for i in np.flatnonzero(condicao):
+                ticker = self._tickers[linhas[i]]
+                chave = (ticker, tipo)
+                sinalizadas.add(chave)
+
+                if tipo == 'VOLUME_ALTO':
+                    mensagem = (f'Volume {MULTIPLO_VOLUME}x acima da média! '
+                                f'({barra[i, VOLUME] / 1e6:.1f}M vs {volume_medio[i] / 1e6:.1f}M)')
+                    severidade = 'alta'
+                elif tipo == 'GAP':
+                    mensagem, severidade = f'Gap de {gap_pct[i]:.1f}% na abertura!', 'alta'
+                elif tipo == 'VOLATILIDADE':
+                    mensagem, severidade = f'Volatilidade {MULTIPLO_VOLATILIDADE}x acima do normal!', 'media'
+                else:
+                    mensagem, severidade = f'Variação intraday de {variacao_intraday[i]:.1f}%!', 'media'
+
+                z = {'VOLUME_ALTO': z_volume[i], 'VOLATILIDADE': z_retorno[i]}.get(tipo, np.nan)
+                data = str(self._data[linhas[i]])
+                vigente = self._ativas.get(chave)
+                anomalia = {
+                    'ticker': ticker.replace('.SA', ''),
+                    'tipo': tipo,
+                    'mensagem': mensagem,
+                    'severidade': severidade,
+                    'data': data,
+                    'variacao_dia': round(float(retorno[i] * 100), 2) if np.isfinite(retorno[i]) else 0.0,
+                    'z_score': round(float(z), 2) if np.isfinite(z) else None,
+                    'detectada_em': vigente['detectada_em'] if vigente and vigente['data'] == data else agora,
+                }
+                self._ativas[chave] = anomalia
+                # Evento só na primeira vez que a anomalia aparece na barra
+                if vigente is None or vigente['data'] != data:
+                    self._sequencia += 1
+                    evento = {**anomalia, 'sequencia': self._sequencia}
+                    self._eventos.append(evento)
+                    novas.append(evento)
+
+        # Anomalias das linhas reavaliadas que deixaram de valer
+        reavaliados = {self._tickers[linha] for linha in linhas}
+        for chave in [c for c in self._ativas if c[0] in reavaliados and c not in sinalizadas]:
+            del self._ativas[chave]
+        return novas
+
+    # ============= Consulta =============
+
+    def anomalias(self, severidade: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Anomalias vigentes em todo o universo (alta severidade primeiro)"""
+        with self._lock:
+            ativas = list(self._ativas.values())
+        if severidade:
+            ativas = [a for a in ativas if a['severidade'] == severidade]
+        return sorted(ativas, key=lambda a: (a['severidade'] != 'alta', a['ticker'], a['tipo']))
+
+    def eventos_desde(self, sequencia: int = 0) -> List[Dict[str, Any]]:
+        """Eventos de anomalia posteriores à sequência informada"""
+        with self._lock:
+            return [evento for evento in self._eventos if evento['sequencia'] > sequencia]
+
+    @property
+    def sequencia(self) -> int:
+        return self._sequencia
+
+
+def _dias(datas: pd.DatetimeIndex) -> np.ndarray:
+    """Datas como datetime64[D] na data local do pregão (ignora fuso e horário)"""
+    if datas.tz is not None:
+        datas = datas.tz_localize(None)
+    return datas.to_numpy().astype('datetime64[D]')
+
+
+# Instância global
+anomalias_service = AnomaliasService()
@@ -0,0 +1,241 @@
+"""
+Serviço Assíncrono de Dados da B3
+Downloads não bloqueantes (httpx com keep-alive) e cálculos pesados fora do event loop
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from .b3_data_service import b3_service
+from .calendario_service import calendario_service
+from .fetch_executor_service import fetch_executor_service
+from .historico_service import historico_service, Baixador
+from .memo_indicadores_service import INTERVALO_DIARIO
+from .metadados_service import metadados_service
+
+logger = logging.getLogger(__name__)
+
+# API de gráficos do Yahoo (a mesma usada pelo yfinance para o histórico)
+URL_CHART = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+
+# Pool de conexões reaproveitadas entre requisições
+LIMITES_CONEXOES = httpx.Limits(
+    max_connections=int(os.getenv("B3_HTTP_MAX_CONEXOES", "20")),
+    max_keepalive_connections=int(os.getenv("B3_HTTP_MAX_CONEXOES", "20")),
+    keepalive_expiry=60,
+)
+TIMEOUT_HTTP = httpx.Timeout(10.0, connect=5.0)
+CABECALHOS = {"User-Agent": "Mozilla/5.0 (visualizador-b3)"}
+
+# Threads para indicadores e serialização (pandas/numpy liberam o GIL na maior parte)
+MAX_THREADS_CALCULO = int(os.getenv("B3_THREADS_CALCULO", str(os.cpu_count() or 4)))
+
+
+class B3AsyncService:
+    """Versão assíncrona do B3DataService para os endpoints da API"""
+
+    def __init__(self, max_threads_calculo: int = MAX_THREADS_CALCULO):
+        """
+        Args:
+            max_threads_calculo: Threads dedicadas ao trabalho de CPU (indicadores, JSON)
+        """
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self._calculo = ThreadPoolExecutor(max_workers=max_threads_calculo, thread_name_prefix="b3-calculo")
+        # Downloads em andamento, compartilhados por requisições simultâneas
+        self._em_voo: Dict[Tuple[str, Tuple], asyncio.Task] = {}
+
+    # ------------------------------------------------------------------
+    # Infraestrutura
+    # ------------------------------------------------------------------
+
+    def cliente(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartilhado (criado no primeiro uso, dentro do event loop)"""
+        if self._cliente is None or self._cliente.is_closed:
+            self._cliente = httpx.AsyncClient(
+                limits=LIMITES_CONEXOES, timeout=TIMEOUT_HTTP, headers=CABECALHOS,
+            )
+        return self._cliente
+
+    async def calcular(self, funcao: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa trabalho de CPU no pool de cálculo sem bloquear o event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._calculo, lambda: funcao(*args, **kwargs))
+
+    async def fechar(self):
+        """Fecha o cliente HTTP e o pool de cálculo"""
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+        self._calculo.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Histórico
+    # ------------------------------------------------------------------
+
+    async def buscar_dados_acao(self, ticker: str, periodo: str = '1y',
+                                indicadores: Optional[Iterable[str]] = None,
+                                intervalo: str = INTERVALO_DIARIO) -> pd.DataFrame:
+        """Equivalente assíncrono de B3DataService.buscar_dados_acao"""
+        ticker_sa = ticker if ticker.endswith('.SA') else f"{ticker}.SA"
+        baixador = await self._prebaixar(ticker_sa, b3_service.periodo_canonico(periodo))
+        return await self.calcular(
+            b3_service.buscar_dados_acao, ticker_sa, periodo, baixador,
+            indicadores=indicadores, intervalo=intervalo,
+        )
+
+    async def buscar_varios(self, tickers: List[str], periodo: str = '1y',
+                            indicadores: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """Busca vários tickers concorrentemente (apenas os não vazios)"""
+        resultados = await asyncio.gather(
+            *(self.buscar_dados_acao(ticker, periodo, indicadores) for ticker in tickers),
+            return_exceptions=True,
+        )
+        return {
+            ticker: dados for ticker, dados in zip(tickers, resultados)
+            if isinstance(dados, pd.DataFrame) and not dados.empty
+        }
+
+    async def buscar_ibovespa(self, periodo: str = '1y') -> pd.DataFrame:
+        """Equivalente assíncrono de B3DataService.buscar_ibovespa"""
+        baixador = await self._prebaixar('^BVSP', b3_service.periodo_canonico(periodo))
+        return await self.calcular(b3_service.buscar_ibovespa, periodo, baixador)
+
+    async def _prebaixar(self, ticker: str, periodo: str) -> Optional[Baixador]:
+        """
+        Faz no event loop o download que o histórico local pediria e devolve um
+        baixador que entrega esse resultado. Se o pedido mudar até lá (ou o
+        download falhar), o caminho síncrono com yfinance assume.
+        """
+        pedido = historico_service.pendencia(ticker, periodo)
+        if pedido is None:
+            return None
+
+        chave = (ticker, tuple(sorted(pedido.items())))
+        tarefa = self._em_voo.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(
+                fetch_executor_service.executar_async(self._baixar_chart, ticker, **pedido)
+            )
+            self._em_voo[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_voo.pop(chave, None))
+        try:
+            dados = await asyncio.shield(tarefa)
+        except Exception as e:
+            logger.warning(f"Download assíncrono de {ticker} falhou, usando yfinance: {e}")
+            return None
+
+        sincrono = b3_service.baixador(ticker)
+
+        def baixar(**kwargs) -> pd.DataFrame:
+            return dados if kwargs == pedido else sincrono(**kwargs)
+        return baixar
+
+    async def _baixar_chart(self, ticker: str, period: Optional[str] = None,
+                            start: Optional[str] = None) -> pd.DataFrame:
+        """Barras diárias ajustadas pela API de gráficos (mesmo formato do Ticker.history)"""
+        params: Dict[str, Any] = {'interval': '1d', 'events': 'div,splits', 'includeAdjustedClose': 'true'}
+        if start is not None:
+            params['period1'] = int(pd.Timestamp(start, tz='America/Sao_Paulo').timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period or '1y'
+
+        resposta = await self.cliente().get(URL_CHART.format(ticker=ticker), params=params)
+        resposta.raise_for_status()
+        return self._chart_para_dataframe(resposta.json())
+
+    @staticmethod
+    def _chart_para_dataframe(payload: Dict[str, Any]) -> pd.DataFrame:
+        resultado = (payload.get('chart', {}).get('result') or [None])[0]
+        if not resultado or not resultado.get('timestamp'):
+            return pd.DataFrame()
+
+        cotacoes = resultado['indicators']['quote'][0]
+        fuso = resultado.get('meta', {}).get('exchangeTimezoneName', 'America/Sao_Paulo')
+        indice = pd.to_datetime(resultado['timestamp'], unit='s', utc=True).tz_convert(fuso).normalize()
+        dados = pd.DataFrame({
+            'Open': cotacoes.get('open'),
+            'High': cotacoes.get('high'),
+            'Low': cotacoes.get('low'),
+            'Close': cotacoes.get('close'),
+            'Volume': cotacoes.get('volume'),
+        }, index=indice, dtype=float)
+
+        # auto_adjust do yfinance: OHLC multiplicados por adjclose / close
+        ajustado = (resultado['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+        if ajustado:
+            fator = np.asarray(ajustado, dtype=float) / dados['Close'].to_numpy()
+            for coluna in ('Open', 'High', 'Low', 'Close'):
+                dados[coluna] = dados[coluna].to_numpy() * fator
+
+        dados = dados.dropna(subset=['Close'])
+        return dados[~dados.index.duplicated(keep='last')]
+
+    # ------------------------------------------------------------------
+    # Informações e cotação
+    # ------------------------------------------------------------------
+
+    async def buscar_info_acao(self, ticker: str) -> Dict[str, Any]:
+        """Equivalente assíncrono de B3DataService.buscar_info_acao"""
+        if not ticker.endswith('.SA'):
+            ticker = f"{ticker}.SA"
+        try:
+            estaticos, cotacao = await asyncio.gather(
+                self._buscar_metadados(ticker), self._buscar_cotacao(ticker)
+            )
+            return b3_service.montar_info(ticker, estaticos, cotacao)
+        except Exception as e:
+            logger.error(f"Erro ao buscar info de {ticker}: {e}")
+            return {'ticker': ticker, 'nome': ticker, 'erro': str(e)}
+
+    async def _buscar_metadados(self, ticker: str) -> Dict[str, Any]:
+        # Válidos em disco na imensa maioria das chamadas; Ticker.info só uma vez por dia
+        entrada = metadados_service.consultar_valido(ticker)
+        if entrada is not None:
+            return entrada
+        return await asyncio.to_thread(b3_service.buscar_metadados, ticker)
+
+    async def _buscar_cotacao(self, ticker: str) -> Dict[str, float]:
+        from .cache_service import cache_service
+
+        cotacao = b3_service.cotacao_em_cache(ticker)
+        if cotacao is not None:
+            return cotacao
+
+        async def baixar() -> Dict[str, Any]:
+            resposta = await self.cliente().get(
+                URL_CHART.format(ticker=ticker), params={'range': '1d', 'interval': '1d'}
+            )
+            resposta.raise_for_status()
+            return resposta.json()['chart']['result'][0]['meta']
+
+        meta = await fetch_executor_service.executar_async(baixar)
+        preco = float(meta.get('regularMarketPrice') or 0)
+        anterior = float(meta.get('previousClose') or meta.get('chartPreviousClose') or 0)
+        cotacao = {
+            'preco_atual': preco,
+            'variacao_dia': ((preco / anterior) - 1) * 100 if anterior else 0,
+            'volume': float(meta.get('regularMarketVolume') or 0),
+        }
+        cache_service.set(f"cotacao_{ticker}", cotacao, ttl_seconds=calendario_service.ttl('cotacao'))
+        return cotacao
+
+    async def obter_principais_acoes(self) -> List[Dict[str, Any]]:
+        """Equivalente assíncrono de B3DataService.obter_principais_acoes"""
+        return list(await asyncio.gather(
+            *(self.buscar_info_acao(ticker) for ticker in b3_service.universo.ativos()[:15])
+        ))
+
+
+# Instância global
+b3_async_service = B3AsyncService()
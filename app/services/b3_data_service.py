@@ -9,17 +9,38 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 import logging
+import os
+import threading
 from .analise_tecnica_avancada import AnaliseTecnicaAvancada, ComparadorAcoes
+from .historico_service import historico_service, Baixador, ORDEM_PERIODOS
+from .fetch_executor_service import fetch_executor_service
+from .metadados_service import metadados_service
+from .universo_service import UniversoService
+from .calendario_service import calendario_service
+from .memo_indicadores_service import memo_indicadores_service, impressao, INTERVALO_DIARIO
+from . import reamostragem
+from . import indicadores_registro
 
 logger = logging.getLogger(__name__)
 
 
+# Histórico canônico mantido por ticker: cobre 1y + 200 pregões de aquecimento
+# do SMA_200, de modo que qualquer período menor é apenas um recorte dele
+PERIODO_CANONICO = '2y'
+
+# Ticker.info completos por pedido de market cap para tickers ainda sem
+# metadados gravados (os de maior volume financeiro primeiro); os demais
+# entram com um peso estimado até serem preenchidos
+MAX_MARKET_CAPS_FRIOS = int(os.getenv("B3_MAX_MARKET_CAPS_FRIOS", "10"))
+
+
 class B3DataService:
     """Serviço para buscar dados de ações da B3"""
     
-    # TODAS as principais ações da B3 disponíveis no Yahoo Finance
+    # TODAS as principais ações da B3 disponíveis no Yahoo Finance (lista bruta;
+    # use self.universo para a versão normalizada, sem duplicatas nem símbolos mortos)
     PRINCIPAIS_ACOES = [
         # Petróleo, Gás e Combustíveis
         'PETR3.SA', 'PETR4.SA', 'PRIO3.SA', 'RRRP3.SA', 'RECV3.SA', 
@@ -121,188 +142,372 @@ class B3DataService:
     }
     
     def __init__(self):
-        self.cache: Dict[str, Any] = {}
+        self.universo = UniversoService(self.PRINCIPAIS_ACOES, self.SETORES)
+        self._lock_snapshot = threading.Lock()
         
-    def buscar_dados_acao(self, ticker: str, periodo: str = '1y') -> pd.DataFrame:
+    def buscar_varios(self, tickers: List[str], periodo: str = '1y',
+                      indicadores: Optional[Iterable[str]] = None,
+                      intervalo: str = INTERVALO_DIARIO) -> Dict[str, pd.DataFrame]:
+        """Busca dados históricos de vários tickers em paralelo (apenas os não vazios)"""
+        resultados = fetch_executor_service.mapear(
+            lambda t: self.buscar_dados_acao(t, periodo, indicadores=indicadores, intervalo=intervalo), tickers
+        )
+        return {
+            ticker: dados for ticker, dados in zip(tickers, resultados)
+            if dados is not None and not dados.empty
+        }
+    
+    def buscar_dados_acao(self, ticker: str, periodo: str = '1y',
+                          baixador: Optional[Baixador] = None,
+                          indicadores: Optional[Iterable[str]] = None,
+                          intervalo: str = INTERVALO_DIARIO) -> pd.DataFrame:
         """
         Busca dados históricos de uma ação
         
         Args:
             ticker: Código da ação (ex: 'PETR4.SA')
             periodo: Período de dados ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', 'max')
+            baixador: Download do histórico (padrão: yfinance via executor)
+            indicadores: Colunas de indicadores necessárias (None: todas; []: só preços)
+            intervalo: Duração das barras ('1d', '1wk', '1mo', '3mo'); as maiores
+                que um dia são agregadas do histórico diário, sem novo download
         """
         try:
             if not ticker.endswith('.SA'):
                 ticker = f"{ticker}.SA"
-                
-            acao = yf.Ticker(ticker)
-            dados = acao.history(period=periodo)
             
-            if dados.empty:
+            # Indicadores calculados uma vez sobre o histórico canônico; cada
+            # período é um recorte dele (os indicadores usam as barras anteriores
+            # ao recorte como aquecimento)
+            historico, sessoes = self._historico_com_indicadores(
+                ticker, self.periodo_canonico(periodo), baixador, indicadores, intervalo
+            )
+            if intervalo == INTERVALO_DIARIO:
+                dados = historico_service.fatiar(historico, periodo)
+            else:
+                dados = reamostragem.fatiar(historico, periodo, sessoes)
+            
+            if historico.empty:
                 logger.warning(f"Sem dados para {ticker}")
+                self.universo.registrar_falha(ticker)
                 return pd.DataFrame()
             
-            # Adicionar indicadores técnicos
-            dados = self._calcular_indicadores(dados)
-            
+            self.universo.registrar_sucesso(ticker)
             return dados
         except Exception as e:
             logger.error(f"Erro ao buscar {ticker}: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def periodo_canonico(periodo: str) -> str:
+        """Menor período que cobre o pedido e o histórico canônico"""
+        if periodo in ORDEM_PERIODOS and ORDEM_PERIODOS.index(periodo) > ORDEM_PERIODOS.index(PERIODO_CANONICO):
+            return periodo
+        return PERIODO_CANONICO
+    
+    def _historico_com_indicadores(self, ticker: str, periodo: str,
+                                   baixador: Optional[Baixador] = None,
+                                   indicadores: Optional[Iterable[str]] = None,
+                                   intervalo: str = INTERVALO_DIARIO) -> Tuple[pd.DataFrame, pd.DatetimeIndex]:
+        """
+        Histórico completo do ticker com os indicadores pedidos, e as datas dos
+        pregões do diário de origem. Cada coluna é calculada na primeira vez
+        que alguém a pede e reaproveitada até o histórico local mudar (nova
+        barra ou barra do dia atualizada). O frame devolvido é compartilhado:
+        não deve ser alterado.
+        """
+        historico = historico_service.obter(ticker, periodo, baixador or self.baixador(ticker))
+        if historico.empty:
+            return historico, pd.DatetimeIndex([])
+        
+        # A impressão do diário também identifica as barras agregadas dele
+        marca = impressao(historico)
+        memorizado = memo_indicadores_service.frame(ticker, periodo, marca, intervalo)
+        dados = memorizado if memorizado is not None else reamostragem.reamostrar(historico, intervalo)
+        
+        completo = indicadores_registro.calcular(dados, indicadores)
+        if completo is not dados or memorizado is None:
+            completo = memo_indicadores_service.guardar_frame(ticker, periodo, marca, completo, intervalo)
+        return completo, historico.index
+    
     def buscar_info_acao(self, ticker: str) -> Dict[str, Any]:
         """Busca informações detalhadas de uma ação"""
         try:
             if not ticker.endswith('.SA'):
                 ticker = f"{ticker}.SA"
             
-            acao = yf.Ticker(ticker)
-            info = acao.info
-            
-            return {
-                'ticker': ticker,
-                'nome': info.get('longName', ticker),
-                'setor': info.get('sector', 'N/A'),
-                'preco_atual': info.get('currentPrice', 0),
-                'variacao_dia': info.get('regularMarketChangePercent', 0),
-                'volume': info.get('volume', 0),
-                'market_cap': info.get('marketCap', 0),
-                'p_l': info.get('trailingPE', 0),
-                'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
-                'minima_52s': info.get('fiftyTwoWeekLow', 0),
-                'maxima_52s': info.get('fiftyTwoWeekHigh', 0),
-                'volume_medio': info.get('averageVolume', 0),
-            }
+            # Campos estáticos: disco, renovados diariamente. Campos vivos: cotação barata
+            estaticos = self.buscar_metadados(ticker)
+            cotacao = self._buscar_cotacao(ticker)
+            return self.montar_info(ticker, estaticos, cotacao)
         except Exception as e:
             logger.error(f"Erro ao buscar info de {ticker}: {e}")
             return {'ticker': ticker, 'nome': ticker, 'erro': str(e)}
     
+    @staticmethod
+    def montar_info(ticker: str, estaticos: Dict[str, Any], cotacao: Dict[str, float]) -> Dict[str, Any]:
+        """Combina campos estáticos e cotação no formato de buscar_info_acao"""
+        return {
+            'ticker': ticker,
+            'nome': estaticos['nome'],
+            'setor': estaticos['setor'],
+            'preco_atual': cotacao['preco_atual'],
+            'variacao_dia': cotacao['variacao_dia'],
+            'volume': cotacao['volume'],
+            'market_cap': estaticos['market_cap'],
+            'p_l': estaticos['p_l'],
+            'dividend_yield': estaticos['dividend_yield'],
+            'minima_52s': estaticos['minima_52s'],
+            'maxima_52s': estaticos['maxima_52s'],
+            'volume_medio': estaticos['volume_medio'],
+        }
+    
+    def buscar_metadados(self, ticker: str) -> Dict[str, Any]:
+        """Campos estáticos do ticker (Ticker.info completo no máximo uma vez por dia)"""
+        return metadados_service.obter(
+            ticker, lambda: fetch_executor_service.executar(lambda: yf.Ticker(ticker).info)
+        )
+    
+    def _buscar_cotacao(self, ticker: str) -> Dict[str, float]:
+        """
+        Preço, variação e volume do dia pela fonte mais barata disponível:
+        snapshot do universo já em memória, cache curto ou fast_info
+        """
+        from .cache_service import cache_service
+        
+        cotacao = self.cotacao_em_cache(ticker)
+        if cotacao is not None:
+            return cotacao
+        
+        fast_info = fetch_executor_service.executar(lambda: yf.Ticker(ticker).fast_info)
+        preco = float(fast_info['last_price'] or 0)
+        anterior = float(fast_info['previous_close'] or 0)
+        cotacao = {
+            'preco_atual': preco,
+            'variacao_dia': ((preco / anterior) - 1) * 100 if anterior else 0,
+            'volume': float(fast_info['last_volume'] or 0),
+        }
+        cache_service.set(f"cotacao_{ticker}", cotacao, ttl_seconds=calendario_service.ttl('cotacao'))
+        return cotacao
+    
+    @staticmethod
+    def cotacao_em_cache(ticker: str) -> Optional[Dict[str, float]]:
+        """Cotação já em memória (snapshot do universo ou cache curto), sem rede"""
+        from .cache_service import cache_service
+        
+        snapshot = cache_service.get("snapshot_universo")
+        if snapshot is not None and ticker in snapshot.index:
+            linha = snapshot.loc[ticker]
+            return {
+                'preco_atual': float(linha['preco_atual']),
+                'variacao_dia': float(linha['variacao_dia']),
+                'volume': float(linha['volume']),
+            }
+        return cache_service.get(f"cotacao_{ticker}")
+    
     def buscar_cotacao_tempo_real(self, tickers: List[str]) -> pd.DataFrame:
         """Busca cotações em tempo real de múltiplas ações"""
         try:
             tickers_sa = [t if t.endswith('.SA') else f"{t}.SA" for t in tickers]
-            dados = yf.download(tickers_sa, period='1d', interval='1m', progress=False)
+            dados = fetch_executor_service.executar(
+                yf.download, tickers_sa, period='1d', interval='1m', progress=False
+            )
             return dados
         except Exception as e:
             logger.error(f"Erro ao buscar cotações: {e}")
             return pd.DataFrame()
     
-    def buscar_ibovespa(self, periodo: str = '1y') -> pd.DataFrame:
+    def buscar_snapshot_universo(self, incluir_market_cap: bool = False, forcar: bool = False) -> pd.DataFrame:
+        """
+        Snapshot de cotações de todo o universo em um único download em lote
+        
+        Uma linha por ticker com preço, variação do dia, volume e OHLC do último
+        pregão. Ranking, setores e heatmap leem desta mesma tabela.
+        
+        Args:
+            incluir_market_cap: Preenche a coluna market_cap (cache diário)
+            forcar: Ignora o cache e baixa de novo (usado pelo agendador)
+        """
+        from .cache_service import cache_service
+        
+        cache_key = "snapshot_universo"
+        snapshot = None if forcar else cache_service.get(cache_key)
+        if snapshot is None:
+            # Um único download por vez; quem chega durante o download reaproveita
+            with self._lock_snapshot:
+                snapshot = None if forcar else cache_service.get(cache_key)
+                if snapshot is None:
+                    snapshot = self._baixar_snapshot(self.universo.ativos())
+                    if snapshot.empty:
+                        return snapshot
+                    cache_service.set(cache_key, snapshot, ttl_seconds=calendario_service.ttl('cotacao'))
+        
+        if incluir_market_cap:
+            snapshot = snapshot.copy()
+            snapshot['market_cap'], snapshot['market_cap_estimado'] = self._buscar_market_caps(snapshot)
+        
+        return snapshot
+    
+    def _baixar_snapshot(self, tickers: List[str]) -> pd.DataFrame:
+        """Baixa os últimos pregões de todos os tickers em uma chamada"""
+        logger.info(f"⏳ Baixando snapshot de {len(tickers)} ações em lote...")
+        try:
+            dados = fetch_executor_service.executar(
+                yf.download, tickers, period='5d', interval='1d', group_by='column',
+                auto_adjust=False, threads=True, progress=False,
+            )
+        except Exception as e:
+            logger.error(f"Erro ao baixar snapshot do universo: {e}")
+            return pd.DataFrame()
+        
+        if dados.empty or not isinstance(dados.columns, pd.MultiIndex):
+            return pd.DataFrame()
+        
+        fechamentos = dados['Close'].ffill()
+        validos = fechamentos.columns[fechamentos.iloc[-1].notna()]
+        if len(validos) == 0:
+            return pd.DataFrame()
+        
+        # Símbolos sem cotação entram no cache negativo do universo
+        for ticker in tickers:
+            if ticker in validos:
+                self.universo.registrar_sucesso(ticker)
+            else:
+                self.universo.registrar_falha(ticker)
+        
+        ultimo = dados.xs(dados.index[-1])
+        fechamento = fechamentos[validos].iloc[-1]
+        anterior = fechamentos[validos].iloc[-2] if len(fechamentos) >= 2 else fechamento
+        
+        snapshot = pd.DataFrame({
+            'preco_atual': fechamento,
+            'fechamento_anterior': anterior,
+            'variacao_dia': ((fechamento / anterior) - 1) * 100,
+            'abertura': ultimo['Open'].reindex(validos),
+            'maxima': ultimo['High'].reindex(validos),
+            'minima': ultimo['Low'].reindex(validos),
+            'volume': ultimo['Volume'].reindex(validos).fillna(0),
+            'data': dados.index[-1],
+        })
+        snapshot.index.name = 'ticker'
+        snapshot['nome'] = [self._nome_em_cache(ticker) for ticker in snapshot.index]
+        snapshot['setor'] = [self.universo.setor(ticker) for ticker in snapshot.index]
+        snapshot['market_cap'] = 0.0
+        
+        logger.info(f"✅ Snapshot com {len(snapshot)} ações carregado")
+        return snapshot
+    
+    def _buscar_market_caps(self, snapshot: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """
+        Market cap de cada ticker do snapshot e se ele é estimado
+        
+        Vem dos metadados já gravados, mesmo vencidos (ações em circulação ×
+        preço do snapshot, ou o market cap gravado), sem rede. Só os
+        MAX_MARKET_CAPS_FRIOS tickers sem metadados de maior volume financeiro
+        buscam o Ticker.info; os demais recebem o volume financeiro do dia na
+        escala mediana market cap/volume dos conhecidos.
+        """
+        precos = snapshot['preco_atual']
+        market_caps = pd.Series(
+            [self._market_cap(metadados_service.consultar(ticker), precos[ticker]) for ticker in snapshot.index],
+            index=snapshot.index, dtype=np.float64,
+        )
+        
+        financeiro = (precos * snapshot['volume']).fillna(0)
+        frios = financeiro[market_caps.isna()].nlargest(MAX_MARKET_CAPS_FRIOS).index.tolist()
+        if frios:
+            valores = fetch_executor_service.mapear(
+                lambda ticker: self._market_cap(self.buscar_metadados(ticker), precos[ticker]), frios
+            )
+            market_caps[frios] = [np.nan if valor is None else valor for valor in valores]
+        
+        estimado = market_caps.isna()
+        razoes = (market_caps / financeiro.where(financeiro > 0)).dropna()
+        escala = razoes.median() if len(razoes) else 1.0
+        market_caps[estimado] = financeiro[estimado] * escala
+        return market_caps, estimado
+    
+    @staticmethod
+    def _market_cap(entrada: Optional[Dict[str, Any]], preco: float) -> float:
+        """Market cap pelos metadados (NaN se não houver)"""
+        if not entrada:
+            return np.nan
+        acoes = entrada.get('acoes_em_circulacao') or 0
+        if acoes and preco > 0:
+            return float(acoes * preco)
+        return float(entrada.get('market_cap') or 0) or np.nan
+    
+    @staticmethod
+    def _nome_em_cache(ticker: str) -> str:
+        """Nome dos metadados já gravados, sem acessar a rede"""
+        entrada = metadados_service.consultar(ticker)
+        return entrada['nome'] if entrada else ticker.replace('.SA', '')
+    
+    @staticmethod
+    def snapshot_para_lista(snapshot: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Converte linhas do snapshot no mesmo formato de buscar_info_acao"""
+        colunas = ['nome', 'setor', 'preco_atual', 'variacao_dia', 'volume', 'market_cap']
+        if 'market_cap_estimado' in snapshot.columns:
+            colunas.append('market_cap_estimado')
+        registros = snapshot[colunas].reset_index().to_dict(orient='records')
+        for registro in registros:
+            for campo in ('preco_atual', 'variacao_dia', 'volume', 'market_cap'):
+                registro[campo] = float(registro[campo]) if pd.notna(registro[campo]) else 0
+        return registros
+    
+    def buscar_ibovespa(self, periodo: str = '1y', baixador: Optional[Baixador] = None) -> pd.DataFrame:
         """Busca dados do índice IBOVESPA"""
         try:
-            ibov = yf.Ticker('^BVSP')
-            dados = ibov.history(period=periodo)
-            return dados
+            historico = historico_service.obter(
+                '^BVSP', self.periodo_canonico(periodo), baixador or self.baixador('^BVSP')
+            )
+            return historico_service.fatiar(historico, periodo)
         except Exception as e:
             logger.error(f"Erro ao buscar IBOVESPA: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def baixador(ticker: str):
+        """Função de download do Yahoo Finance usada pelo histórico local"""
+        def baixar(**kwargs) -> pd.DataFrame:
+            return fetch_executor_service.executar(yf.Ticker(ticker).history, **kwargs)
+        return baixar
+    
     def buscar_comparacao_setores(self) -> Dict[str, float]:
-        """Busca performance dos setores"""
+        """Busca performance dos setores (média da variação do dia no snapshot)"""
         desempenho_setores = {}
+        snapshot = self.buscar_snapshot_universo()
+        if snapshot.empty:
+            return desempenho_setores
         
         for setor, tickers in self.SETORES.items():
             try:
-                variacoes = []
-                for ticker in tickers[:3]:  # Pegar top 3 de cada setor
-                    info = self.buscar_info_acao(ticker)
-                    if 'variacao_dia' in info:
-                        variacoes.append(info['variacao_dia'])
-                
-                if variacoes:
-                    desempenho_setores[setor] = np.mean(variacoes)
+                variacoes = snapshot['variacao_dia'].reindex(tickers).dropna()
+                if not variacoes.empty:
+                    desempenho_setores[setor] = float(variacoes.mean())
             except Exception as e:
                 logger.error(f"Erro ao processar setor {setor}: {e}")
         
         return desempenho_setores
     
-    def _calcular_indicadores(self, dados: pd.DataFrame) -> pd.DataFrame:
-        """Calcula indicadores técnicos"""
-        try:
-            # RSI (Relative Strength Index)
-            delta = dados['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            dados['RSI'] = 100 - (100 / (1 + rs))
-            
-            # Médias Móveis
-            dados['SMA_20'] = dados['Close'].rolling(window=20).mean()
-            dados['SMA_50'] = dados['Close'].rolling(window=50).mean()
-            dados['SMA_200'] = dados['Close'].rolling(window=200).mean()
-            
-            # MACD
-            exp1 = dados['Close'].ewm(span=12, adjust=False).mean()
-            exp2 = dados['Close'].ewm(span=26, adjust=False).mean()
-            dados['MACD'] = exp1 - exp2
-            dados['Signal'] = dados['MACD'].ewm(span=9, adjust=False).mean()
-            dados['MACD_Histogram'] = dados['MACD'] - dados['Signal']
-            
-            # Bandas de Bollinger
-            dados['BB_Middle'] = dados['Close'].rolling(window=20).mean()
-            std = dados['Close'].rolling(window=20).std()
-            dados['BB_Upper'] = dados['BB_Middle'] + (std * 2)
-            dados['BB_Lower'] = dados['BB_Middle'] - (std * 2)
-            
-            # Volatilidade
-            dados['Volatility'] = dados['Close'].pct_change().rolling(window=20).std() * np.sqrt(252) * 100
-            
-            # Volume médio
-            dados['Volume_SMA'] = dados['Volume'].rolling(window=20).mean()
-            
-            # Indicadores Avançados
-            dados['VWAP'] = AnaliseTecnicaAvancada.calcular_vwap(dados)
-            dados['OBV'] = AnaliseTecnicaAvancada.calcular_obv(dados)
-            dados['MFI'] = AnaliseTecnicaAvancada.calcular_mfi(dados)
-            dados['Force_Index'] = AnaliseTecnicaAvancada.calcular_force_index(dados)
-            dados['AD'] = AnaliseTecnicaAvancada.calcular_accumulation_distribution(dados)
-            dados['ROC'] = AnaliseTecnicaAvancada.calcular_roc(dados)
-            dados['Momentum'] = AnaliseTecnicaAvancada.calcular_momentum(dados)
-            dados['ADX'] = AnaliseTecnicaAvancada.calcular_adx(dados)
-            
-            # Detectar Padrões
-            dados['Doji'] = AnaliseTecnicaAvancada.detectar_doji(dados)
-            dados['Martelo'] = AnaliseTecnicaAvancada.detectar_martelo(dados)
-            dados['Engolfo_Alta'] = AnaliseTecnicaAvancada.detectar_engolfo_alta(dados)
-            dados['Engolfo_Baixa'] = AnaliseTecnicaAvancada.detectar_engolfo_baixa(dados)
-            
-            return dados
-        except Exception as e:
-            logger.error(f"Erro ao calcular indicadores: {e}")
-            return dados
-    
     def obter_principais_acoes(self) -> List[Dict[str, Any]]:
         """Retorna lista das principais ações com informações básicas"""
-        acoes = []
-        for ticker in self.PRINCIPAIS_ACOES[:15]:  # Top 15
-            try:
-                info = self.buscar_info_acao(ticker)
-                acoes.append(info)
-            except Exception as e:
-                logger.error(f"Erro ao buscar {ticker}: {e}")
-        
-        return acoes
+        infos = fetch_executor_service.mapear(self.buscar_info_acao, self.universo.ativos()[:15])  # Top 15
+        return [info for info in infos if info is not None]
     
-    def buscar_ranking_variacao(self, limit: int = 20) -> List[Dict[str, Any]]:
+    def buscar_ranking_variacao(self, limit: int = 20, forcar: bool = False) -> List[Dict[str, Any]]:
         """Retorna ranking de ações por variação do dia (metade altas, metade quedas)"""
         from .cache_service import cache_service
         
-        # CACHE: evitar buscar 150+ ações toda vez (2 minutos)
+        # CACHE: evitar reordenar o snapshot toda vez
         cache_key = f"ranking_raw_{limit}"
-        cached = cache_service.get(cache_key)
+        cached = None if forcar else cache_service.get(cache_key)
         if cached:
             logger.info("🚀 Ranking retornado do CACHE!")
             return cached
         
-        logger.info(f"⏳ Buscando {len(self.PRINCIPAIS_ACOES)} ações (vai demorar ~90s)...")
-        acoes = []
-        for ticker in self.PRINCIPAIS_ACOES:
-            try:
-                info = self.buscar_info_acao(ticker)
-                if 'variacao_dia' in info:
-                    acoes.append(info)
-            except Exception as e:
-                logger.error(f"Erro ao buscar {ticker}: {e}")
+        snapshot = self.buscar_snapshot_universo()
+        acoes = self.snapshot_para_lista(snapshot) if not snapshot.empty else []
         
         # Ordenar por variação (maior para menor)
         acoes_ordenadas = sorted(acoes, key=lambda x: x.get('variacao_dia', 0), reverse=True)
@@ -316,9 +521,10 @@ class B3DataService:
         # Combinar: altas primeiro, depois quedas
         resultado = maiores_altas + maiores_quedas
         
-        # Cachear por 2 minutos
-        cache_service.set(cache_key, resultado, ttl_seconds=120)
-        logger.info(f"✅ Ranking de {len(resultado)} ações cacheado!")
+        # Cachear enquanto a cotação for válida (até a próxima abertura fora do pregão)
+        if resultado:
+            cache_service.set(cache_key, resultado, ttl_seconds=calendario_service.ttl('cotacao'))
+            logger.info(f"✅ Ranking de {len(resultado)} ações cacheado!")
         
         return resultado
     
@@ -326,7 +532,9 @@ class B3DataService:
         """Calcula matriz de correlação entre ações"""
         try:
             tickers_sa = [t if t.endswith('.SA') else f"{t}.SA" for t in tickers]
-            dados = yf.download(tickers_sa, period=periodo, progress=False)['Close']
+            dados = fetch_executor_service.executar(
+                yf.download, tickers_sa, period=periodo, progress=False
+            )['Close']
             
             if isinstance(dados, pd.Series):
                 return pd.DataFrame()
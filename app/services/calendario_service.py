@@ -0,0 +1,156 @@
+"""
+Calendário de Negociação da B3
+Fases do pregão, feriados e TTLs de cache por classe de dado
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Set
+from zoneinfo import ZoneInfo
+
+FUSO_B3 = ZoneInfo("America/Sao_Paulo")
+
+# Fases do dia de negociação (horário de Brasília)
+PRE_ABERTURA = time(9, 45)
+ABERTURA = time(10, 0)
+FECHAMENTO = time(17, 0)
+FIM_AFTER_MARKET = time(18, 0)
+
+# Quarta-feira de Cinzas: pregão só à tarde
+ABERTURA_CINZAS = time(13, 0)
+
+# Feriados fixos com a bolsa fechada (mês, dia)
+FERIADOS_FIXOS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (11, 20),  # Consciência Negra
+    (12, 24),  # Véspera de Natal
+    (12, 25),  # Natal
+    (12, 31),  # Último dia do ano
+]
+
+# TTL (segundos) por fase do dia e classe de dado. Fora do horário de
+# negociação os dados não mudam e ficam válidos até a próxima abertura.
+TTLS: Dict[str, Dict[str, int]] = {
+    'pre_abertura': {'cotacao': 60, 'barra_diaria': 300, 'indicador': 300, 'metadados': 86400},
+    'pregao': {'cotacao': 60, 'barra_diaria': 120, 'indicador': 120, 'metadados': 86400},
+    'pos_fechamento': {'cotacao': 300, 'barra_diaria': 300, 'indicador': 300, 'metadados': 86400},
+}
+
+TTL_MINIMO = 60
+
+# Fração do TTL entre duas renovações agendadas de uma chave: a tarefa roda
+# antes de a chave expirar, com folga para o tempo da própria busca
+FRACAO_RENOVACAO = 0.75
+
+
+def _pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)"""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+@lru_cache(maxsize=16)
+def feriados(ano: int) -> Set[date]:
+    """Dias sem pregão na B3 no ano (além dos fins de semana)"""
+    pascoa = _pascoa(ano)
+    moveis = {
+        pascoa - timedelta(days=48),  # Segunda de Carnaval
+        pascoa - timedelta(days=47),  # Terça de Carnaval
+        pascoa - timedelta(days=2),   # Sexta-feira Santa
+        pascoa + timedelta(days=60),  # Corpus Christi
+    }
+    return {date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS} | moveis
+
+
+class CalendarioService:
+    """Sabe quando a B3 negocia e por quanto tempo cada dado pode ficar em cache"""
+
+    @staticmethod
+    def agora() -> datetime:
+        return datetime.now(FUSO_B3)
+
+    @staticmethod
+    def dia_util(dia: date) -> bool:
+        """True se houver pregão no dia"""
+        return dia.weekday() < 5 and dia not in feriados(dia.year)
+
+    @staticmethod
+    def _abertura(dia: date) -> time:
+        if dia == _pascoa(dia.year) - timedelta(days=46):
+            return ABERTURA_CINZAS
+        return ABERTURA
+
+    def fase(self, momento: Optional[datetime] = None) -> str:
+        """'pre_abertura', 'pregao', 'pos_fechamento' ou 'fechado'"""
+        momento = (momento or self.agora()).astimezone(FUSO_B3)
+        dia = momento.date()
+        if not self.dia_util(dia):
+            return 'fechado'
+        hora = momento.time()
+        abertura = self._abertura(dia)
+        pre_abertura = (datetime.combine(dia, abertura) - timedelta(minutes=15)).time()
+        if pre_abertura <= hora < abertura:
+            return 'pre_abertura'
+        if abertura <= hora < FECHAMENTO:
+            return 'pregao'
+        if FECHAMENTO <= hora < FIM_AFTER_MARKET:
+            return 'pos_fechamento'
+        return 'fechado'
+
+    def em_negociacao(self, momento: Optional[datetime] = None) -> bool:
+        """True enquanto os preços podem mudar (pré-abertura até o fim do after-market)"""
+        return self.fase(momento) != 'fechado'
+
+    def proxima_abertura(self, momento: Optional[datetime] = None) -> datetime:
+        """Início da próxima pré-abertura a partir do momento dado"""
+        momento = (momento or self.agora()).astimezone(FUSO_B3)
+        dia = momento.date()
+        for _ in range(15):
+            if self.dia_util(dia):
+                inicio = datetime.combine(dia, self._abertura(dia), tzinfo=FUSO_B3) - timedelta(minutes=15)
+                if inicio > momento:
+                    return inicio
+            dia += timedelta(days=1)
+        return momento + timedelta(days=1)
+
+    def ttl(self, classe: str, momento: Optional[datetime] = None) -> int:
+        """
+        TTL em segundos para uma classe de dado
+
+        Args:
+            classe: 'cotacao', 'barra_diaria', 'indicador' ou 'metadados'
+            momento: Instante de referência (padrão: agora)
+        """
+        momento = (momento or self.agora()).astimezone(FUSO_B3)
+        fase = self.fase(momento)
+        if fase == 'fechado':
+            ate_abertura = int((self.proxima_abertura(momento) - momento).total_seconds())
+            if classe == 'metadados':
+                return max(ate_abertura, TTLS['pregao']['metadados'])
+            return max(ate_abertura, TTL_MINIMO)
+        return TTLS[fase][classe]
+
+    def intervalo_renovacao(self, classe: str, momento: Optional[datetime] = None) -> float:
+        """Segundos entre renovações de uma chave da classe, sempre abaixo do TTL vigente"""
+        return self.ttl(classe, momento) * FRACAO_RENOVACAO
+
+
+# Instância global
+calendario_service = CalendarioService()
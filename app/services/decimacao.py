@@ -0,0 +1,140 @@
+"""
+Decimação de Séries
+Reduz históricos longos ao número de pontos que o gráfico consegue desenhar (LTTB para linhas, mín/máx para candles)
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Acima disso (poucos baldes muito largos) a tabela pesaria na memória e o
+# laço por balde já é barato
+LIMITE_TABELA_LTTB = 1 << 17
+
+
+def baldes(n: int, pontos: int, inicio: int = 0) -> np.ndarray:
+    """Início de cada um de `pontos` baldes consecutivos de tamanhos quase iguais sobre [inicio, n)"""
+    return np.linspace(inicio, n, pontos + 1)[:-1].astype(np.int64)
+
+
+def lttb(valores: np.ndarray, pontos: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: posições dos pontos que preservam o
+    desenho da linha (picos e vales incluídos)
+
+    O primeiro e o último ponto são mantidos; o miolo é dividido em
+    `pontos - 2` baldes e, de cada um, fica o ponto que forma o maior
+    triângulo com o escolhido no balde anterior e a média do seguinte.
+    O eixo x é a posição da barra (pregões igualmente espaçados).
+
+    A escolha depende do ponto anterior, então as áreas são calculadas em
+    bloco para todo par (candidato do balde anterior, ponto do balde) e só
+    o encadeamento das escolhas percorre os baldes, consultando a tabela.
+
+    Returns:
+        Posições em ordem crescente (todas, se a série já couber em `pontos`)
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    n = len(valores)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    # Baldes do miolo [1, n-1); o ponto n-1 fica de fora e fecha a linha
+    inicios = baldes(n - 1, pontos - 2, inicio=1)
+    fins = np.append(inicios[1:], n - 1)
+    quantidades = fins - inicios
+
+    # Média de cada balde (para o último, o ponto final)
+    validos = np.isfinite(valores[:n - 1])
+    media_x = np.add.reduceat(x[:n - 1], inicios) / quantidades
+    soma_y = np.add.reduceat(np.where(validos, valores[:n - 1], 0.0), inicios)
+    contagem_y = np.add.reduceat(validos.astype(np.float64), inicios)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_y = soma_y / contagem_y
+    proximo_x = np.append(media_x[1:], x[-1])
+    proximo_y = np.append(media_y[1:], valores[-1])
+
+    largura = int(quantidades.max())
+    if len(inicios) * largura * largura > LIMITE_TABELA_LTTB:
+        escolhas = _lttb_por_balde(valores, x, inicios, fins, proximo_x, proximo_y)
+    else:
+        escolhas = _lttb_tabela(valores, x, inicios, quantidades, largura, proximo_x, proximo_y)
+
+    selecionados = np.empty(pontos, dtype=np.int64)
+    selecionados[0] = 0
+    selecionados[1:-1] = escolhas
+    selecionados[-1] = n - 1
+    return selecionados
+
+
+def _lttb_tabela(valores, x, inicios, quantidades, largura, proximo_x, proximo_y) -> np.ndarray:
+    """Melhor ponto de cada balde para cada candidato do balde anterior, depois o encadeamento"""
+    coluna = np.arange(largura)
+    ocupado = coluna < quantidades[:, None]
+    posicoes = np.minimum(inicios[:, None] + coluna, len(valores) - 2)
+    bx, by = x[posicoes], valores[posicoes]
+
+    # Candidatos a ponto anterior: o balde de trás (para o primeiro, só o ponto 0)
+    ax = np.vstack([np.zeros((1, largura)), bx[:-1]])
+    ay = np.vstack([np.full((1, largura), valores[0]), by[:-1]])
+    cx, cy = proximo_x[:, None, None], proximo_y[:, None, None]
+    ax, ay = ax[:, :, None], ay[:, :, None]
+
+    area = np.abs((ax - cx) * (by[:, None, :] - ay) - (ax - bx[:, None, :]) * (cy - ay))
+    # NaN (barra sem preço ou vizinho sem média) só ganha de posição vazia
+    area = np.nan_to_num(area, nan=-1.0)
+    area[~np.broadcast_to(ocupado[:, None, :], area.shape)] = -2.0
+    melhor = np.argmax(area, axis=2).tolist()
+
+    escolhas = np.empty(len(inicios), dtype=np.int64)
+    anterior = 0
+    for balde, inicio in enumerate(inicios.tolist()):
+        anterior = melhor[balde][anterior]
+        escolhas[balde] = inicio + anterior
+    return escolhas
+
+
+def _lttb_por_balde(valores, x, inicios, fins, proximo_x, proximo_y) -> np.ndarray:
+    """Mesma escolha, balde a balde (área de cada balde em bloco)"""
+    escolhas = np.empty(len(inicios), dtype=np.int64)
+    anterior = 0
+    for balde, (ini, fim) in enumerate(zip(inicios.tolist(), fins.tolist())):
+        ax, ay = x[anterior], valores[anterior]
+        cx, cy = proximo_x[balde], proximo_y[balde]
+        area = np.abs((ax - cx) * (valores[ini:fim] - ay) - (ax - x[ini:fim]) * (cy - ay))
+        anterior = ini + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        escolhas[balde] = anterior
+    return escolhas
+
+
+def velas(dados: pd.DataFrame, pontos: int) -> pd.DataFrame:
+    """
+    Agrupa barras consecutivas em até `pontos` candles sem perder extremos:
+    abertura da primeira barra, máxima/mínima do balde, fechamento da última
+    e volume somado. As demais colunas (indicadores, padrões) ficam com o
+    valor da última barra do balde, alinhadas ao fechamento. Cada candle é
+    rotulado pela data da primeira barra, como na reamostragem.
+    """
+    n = len(dados)
+    if pontos >= n or pontos < 1:
+        return dados
+
+    inicios = baldes(n, pontos)
+    ultimas = np.append(inicios[1:], n) - 1
+
+    resultado = dados.iloc[ultimas].copy()
+    resultado.index = dados.index[inicios]
+    if 'Open' in dados.columns:
+        resultado['Open'] = dados['Open'].to_numpy()[inicios]
+    if 'High' in dados.columns:
+        resultado['High'] = np.fmax.reduceat(dados['High'].to_numpy(dtype=np.float64), inicios)
+    if 'Low' in dados.columns:
+        resultado['Low'] = np.fmin.reduceat(dados['Low'].to_numpy(dtype=np.float64), inicios)
+    if 'Volume' in dados.columns:
+        volume = dados['Volume'].to_numpy()
+        if volume.dtype.kind == 'f':
+            volume = np.nan_to_num(volume)
+        resultado['Volume'] = np.add.reduceat(volume, inicios)
+    return resultado
@@ -0,0 +1,192 @@
+"""
+Executor Compartilhado de Buscas
+Pool de threads com concorrência limitada, rate limit por provedor e retentativas
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCORRENCIA = int(os.getenv("B3_MAX_CONCORRENCIA", "8"))
+
+# Limites por provedor: (requisições por segundo, rajada máxima)
+LIMITES_PROVEDORES: Dict[str, Tuple[float, int]] = {
+    'yahoo': (float(os.getenv("B3_YAHOO_REQ_POR_SEGUNDO", "5")), 10),
+}
+
+PREFIXO_THREADS = "b3-fetch"
+
+# Espera (s) entre tentativas de uma corrotina pegar vaga: mínima e máxima
+ESPERA_VAGA_ASYNC = (0.005, 0.05)
+
+
+class TokenBucket:
+    """Rate limiter token-bucket (thread-safe)"""
+
+    def __init__(self, taxa: float, capacidade: int):
+        """
+        Args:
+            taxa: Tokens repostos por segundo
+            capacidade: Máximo de tokens acumulados (tamanho da rajada)
+        """
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def tentar_adquirir(self) -> float:
+        """Consome um token se houver; senão retorna os segundos até o próximo"""
+        with self._lock:
+            self._repor()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.taxa
+
+    def adquirir(self):
+        """Bloqueia até haver um token disponível"""
+        while (espera := self.tentar_adquirir()) > 0:
+            time.sleep(espera)
+
+    async def adquirir_async(self):
+        """Aguarda um token sem bloquear o event loop"""
+        while (espera := self.tentar_adquirir()) > 0:
+            await asyncio.sleep(espera)
+
+
+class FetchExecutorService:
+    """Distribui buscas em paralelo sem estourar os limites dos provedores"""
+
+    def __init__(self, max_concorrencia: int = MAX_CONCORRENCIA,
+                 limites: Optional[Dict[str, Tuple[float, int]]] = None,
+                 tentativas: int = 3, espera_base: float = 0.5):
+        """
+        Args:
+            max_concorrencia: Número máximo de buscas simultâneas
+            limites: Rate limit por provedor {nome: (req/s, rajada)}
+            tentativas: Tentativas por chamada antes de desistir
+            espera_base: Espera inicial (s) do backoff exponencial com jitter
+        """
+        self.max_concorrencia = max_concorrencia
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self._buckets = {
+            provedor: TokenBucket(taxa, capacidade)
+            for provedor, (taxa, capacidade) in (limites or LIMITES_PROVEDORES).items()
+        }
+        self._pool = ThreadPoolExecutor(max_workers=max_concorrencia, thread_name_prefix=PREFIXO_THREADS)
+        # Vagas de busca simultânea: um orçamento só para qualquer thread que
+        # chame executar() (não só os workers do pool) e para executar_async()
+        self._vagas = threading.BoundedSemaphore(max_concorrencia)
+        self._local = threading.local()
+
+    @contextmanager
+    def _vaga(self):
+        """Ocupa uma vaga de busca (chamadas aninhadas na mesma thread reaproveitam a vaga)"""
+        if getattr(self._local, 'ocupada', False):
+            yield
+            return
+        with self._vagas:
+            self._local.ocupada = True
+            try:
+                yield
+            finally:
+                self._local.ocupada = False
+
+    @asynccontextmanager
+    async def _vaga_async(self):
+        """
+        Ocupa uma vaga do mesmo semáforo de _vaga() sem bloquear o event loop:
+        tenta sem esperar e, se não houver, dorme e tenta de novo (esperar numa
+        thread ocuparia o executor padrão, e um cancelamento deixaria a vaga presa)
+        """
+        espera, espera_maxima = ESPERA_VAGA_ASYNC
+        while not self._vagas.acquire(blocking=False):
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, espera_maxima)
+        try:
+            yield
+        finally:
+            self._vagas.release()
+
+    def executar(self, funcao: Callable[..., Any], *args, provedor: str = 'yahoo', **kwargs) -> Any:
+        """
+        Executa uma chamada ao provedor respeitando o limite de concorrência e
+        o rate limit, com retentativas (a vaga é liberada durante o backoff)
+        """
+        bucket = self._buckets.get(provedor)
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                with self._vaga():
+                    if bucket:
+                        bucket.adquirir()
+                    return funcao(*args, **kwargs)
+            except Exception as e:
+                if tentativa == self.tentativas:
+                    raise
+                # Backoff exponencial com "full jitter"
+                espera = random.uniform(0, self.espera_base * (2 ** (tentativa - 1)))
+                logger.warning(f"Tentativa {tentativa} falhou ({provedor}): {e}. Nova tentativa em {espera:.2f}s")
+                time.sleep(espera)
+
+    async def executar_async(self, funcao: Callable[..., Awaitable[Any]], *args,
+                             provedor: str = 'yahoo', **kwargs) -> Any:
+        """Versão assíncrona de executar() para corrotinas (mesmo limite, rate limit e retentativas)"""
+        bucket = self._buckets.get(provedor)
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                async with self._vaga_async():
+                    if bucket:
+                        await bucket.adquirir_async()
+                    return await funcao(*args, **kwargs)
+            except Exception as e:
+                if tentativa == self.tentativas:
+                    raise
+                espera = random.uniform(0, self.espera_base * (2 ** (tentativa - 1)))
+                logger.warning(f"Tentativa {tentativa} falhou ({provedor}): {e}. Nova tentativa em {espera:.2f}s")
+                await asyncio.sleep(espera)
+
+    def mapear(self, funcao: Callable[[Any], Any], itens: Iterable[Any]) -> List[Any]:
+        """
+        Aplica a função a cada item em paralelo, preservando a ordem
+
+        Itens que falham retornam None (o erro é logado). Chamadas feitas de dentro
+        do próprio pool rodam em sequência para não esgotar os workers.
+        """
+        itens = list(itens)
+        if threading.current_thread().name.startswith(PREFIXO_THREADS):
+            return [self._seguro(funcao, item) for item in itens]
+        futuros = [self._pool.submit(self._seguro, funcao, item) for item in itens]
+        return [futuro.result() for futuro in futuros]
+
+    @staticmethod
+    def _seguro(funcao: Callable[[Any], Any], item: Any) -> Any:
+        try:
+            return funcao(item)
+        except Exception as e:
+            logger.error(f"Erro ao processar {item}: {e}")
+            return None
+
+    def encerrar(self):
+        """Encerra o pool de threads"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Instância global
+fetch_executor_service = FetchExecutorService()
@@ -0,0 +1,128 @@
+"""
+Frame Compacto
+Representação em colunas de um histórico com indicadores, com menos memória que o DataFrame float64
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Colunas mantidas no tipo original: volume é serializado como inteiro e
+# float32 só representa inteiros exatos até 2^24 (~16,7 milhões)
+COLUNAS_EXATAS = {'Volume'}
+
+# Dígitos significativos tentados na volta para float64: o menor número de
+# dígitos que reproduz o mesmo float32 (como o repr do float32), para que
+# 35.47 não saia como 35.470001220703125 no JSON; 9 sempre basta
+DIGITOS_FLOAT32 = (6, 7, 8, 9)
+
+
+def _arredondar(valores: np.ndarray, casas: np.ndarray) -> np.ndarray:
+    """Arredonda cada valor ao número de casas decimais (negativo: dezenas, centenas...)"""
+    # Potências de 10 positivas são exatas em float64: dividir por elas (em vez
+    # de multiplicar por 10^-k) devolve o double mais próximo do decimal
+    escala = 10.0 ** np.abs(casas)
+    return np.where(casas >= 0, np.round(valores * escala) / escala, np.round(valores / escala) * escala)
+
+
+def arredondar_float32(valores: np.ndarray) -> np.ndarray:
+    """float32 -> float64 pelo decimal mais curto que representa o mesmo float32"""
+    resultado = valores.astype(np.float64)
+    pendentes = np.flatnonzero(np.isfinite(resultado) & (resultado != 0))
+    if len(pendentes) == 0:
+        return resultado
+    originais = valores.reshape(-1)[pendentes]
+    largos = resultado.reshape(-1)[pendentes]
+    magnitude = np.floor(np.log10(np.abs(largos))).astype(np.int64)
+    plano = resultado.reshape(-1)
+    for digitos in DIGITOS_FLOAT32:
+        candidatos = _arredondar(largos, digitos - 1 - magnitude)
+        # O último número de dígitos sempre reproduz; aceita o que sobrou
+        exatos = (candidatos.astype(np.float32) == originais) | (digitos == DIGITOS_FLOAT32[-1])
+        plano[pendentes[exatos]] = candidatos[exatos]
+        pendentes, originais, largos, magnitude = (
+            pendentes[~exatos], originais[~exatos], largos[~exatos], magnitude[~exatos]
+        )
+        if len(pendentes) == 0:
+            break
+    return resultado
+
+
+class FrameCompacto:
+    """
+    Struct-of-arrays de um DataFrame de preços/indicadores
+
+    - índice: int64 (tempo desde a época em UTC, na unidade original) + fuso horário
+    - colunas numéricas: float32 (exceto COLUNAS_EXATAS)
+    - colunas booleanas (padrões de candle): bitset via np.packbits
+
+    A conversão de volta para pandas (para_frame) fica na borda, quando o
+    frame é de fato usado.
+    """
+
+    __slots__ = ('indice', 'unidade', 'fuso', 'nome_indice', 'ordem', 'numericas', 'booleanas')
+
+    def __init__(self, indice: np.ndarray, unidade: str, fuso: Optional[str], nome_indice: Optional[str],
+                 ordem: Tuple[str, ...], numericas: Dict[str, np.ndarray], booleanas: Dict[str, np.ndarray]):
+        self.indice = indice
+        self.unidade = unidade
+        self.fuso = fuso
+        self.nome_indice = nome_indice
+        self.ordem = ordem
+        self.numericas = numericas
+        self.booleanas = booleanas
+
+    @classmethod
+    def de_frame(cls, dados: pd.DataFrame) -> 'FrameCompacto':
+        """Compacta o frame (índice precisa ser um DatetimeIndex)"""
+        indice = pd.DatetimeIndex(dados.index)
+        numericas: Dict[str, np.ndarray] = {}
+        booleanas: Dict[str, np.ndarray] = {}
+        for coluna in dados.columns:
+            serie = dados[coluna]
+            if pd.api.types.is_bool_dtype(serie.dtype):
+                booleanas[coluna] = np.packbits(serie.to_numpy(dtype=bool))
+            elif coluna in COLUNAS_EXATAS:
+                numericas[coluna] = serie.to_numpy().copy()
+            else:
+                numericas[coluna] = serie.to_numpy(dtype=np.float32, na_value=np.nan)
+        return cls(
+            indice=indice.asi8.copy(),
+            unidade=indice.unit,
+            fuso=str(indice.tz) if indice.tz is not None else None,
+            nome_indice=indice.name,
+            ordem=tuple(dados.columns),
+            numericas=numericas,
+            booleanas=booleanas,
+        )
+
+    def para_frame(self) -> pd.DataFrame:
+        """Reconstrói o DataFrame (float32 volta a float64 pelo decimal mais curto)"""
+        indice = pd.DatetimeIndex(self.indice.view(f'datetime64[{self.unidade}]'), name=self.nome_indice)
+        if self.fuso is not None:
+            indice = indice.tz_localize('UTC').tz_convert(self.fuso)
+
+        colunas = {}
+        for coluna in self.ordem:
+            if coluna in self.booleanas:
+                colunas[coluna] = np.unpackbits(self.booleanas[coluna], count=len(self)).astype(bool)
+            elif self.numericas[coluna].dtype == np.float32:
+                colunas[coluna] = arredondar_float32(self.numericas[coluna])
+            else:
+                colunas[coluna] = self.numericas[coluna]
+        return pd.DataFrame(colunas, index=indice, columns=list(self.ordem))
+
+    def __len__(self) -> int:
+        return len(self.indice)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados pelos arrays"""
+        return (
+            self.indice.nbytes
+            + sum(a.nbytes for a in self.numericas.values())
+            + sum(a.nbytes for a in self.booleanas.values())
+        )
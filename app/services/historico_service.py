@@ -0,0 +1,273 @@
+"""
+Serviço de Histórico Local (OHLCV)
+Mantém um arquivo Parquet por ticker em disco e busca apenas as barras novas
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from .calendario_service import calendario_service
+
+logger = logging.getLogger(__name__)
+
+# Diretório com um arquivo Parquet por ticker (sobrevive a reinícios)
+HISTORICO_DIR = Path("dados_historicos")
+
+COLUNAS_OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Ordem de cobertura dos períodos do Yahoo Finance (do menor para o maior)
+ORDEM_PERIODOS = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', 'max']
+
+# Períodos contados em pregões (barras) em vez de calendário
+PERIODOS_BARRAS = {'1d': 1, '5d': 5}
+
+PERIODOS_OFFSET = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+}
+
+# Barras já gravadas rebaixadas a cada atualização para detectar ajustes
+# retroativos (dividendos/desdobramentos alteram o histórico ajustado)
+BARRAS_SOBREPOSICAO = 5
+
+Baixador = Callable[..., pd.DataFrame]
+
+
+class HistoricoService:
+    """Armazém colunar de históricos diários com atualização incremental"""
+
+    def __init__(self, diretorio: Path = HISTORICO_DIR):
+        """
+        Args:
+            diretorio: Pasta onde os arquivos Parquet são gravados
+        """
+        self.diretorio = Path(diretorio)
+        self._arquivo_indice = self.diretorio / "_indice.json"
+        self._lock = threading.Lock()
+        self._locks_ticker: Dict[str, threading.Lock] = {}
+        self._indice: Dict[str, Dict[str, Any]] = self._carregar_indice()
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _carregar_indice(self) -> Dict[str, Dict[str, Any]]:
+        """Carrega o índice de cobertura dos tickers gravados"""
+        if self._arquivo_indice.exists():
+            try:
+                with open(self._arquivo_indice, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Erro ao ler índice do histórico: {e}")
+        return {}
+
+    def _salvar_indice(self):
+        """Salva o índice de cobertura (escrita atômica)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        temporario = self._arquivo_indice.with_suffix('.tmp')
+        with open(temporario, 'w') as f:
+            json.dump(self._indice, f, indent=2)
+        os.replace(temporario, self._arquivo_indice)
+
+    def _caminho(self, ticker: str) -> Path:
+        nome = ticker.replace('^', '_').replace('/', '_')
+        return self.diretorio / f"{nome}.parquet"
+
+    def _lock_ticker(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            if ticker not in self._locks_ticker:
+                self._locks_ticker[ticker] = threading.Lock()
+            return self._locks_ticker[ticker]
+
+    def ler(self, ticker: str) -> pd.DataFrame:
+        """Lê o histórico gravado de um ticker (vazio se não existir)"""
+        caminho = self._caminho(ticker)
+        if not caminho.exists():
+            return pd.DataFrame()
+        try:
+            return pd.read_parquet(caminho)
+        except Exception as e:
+            logger.error(f"Erro ao ler histórico local de {ticker}: {e}")
+            return pd.DataFrame()
+
+    def gravar(self, ticker: str, dados: pd.DataFrame):
+        """Grava o histórico completo de um ticker (escrita atômica)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self._caminho(ticker)
+        temporario = caminho.with_suffix('.tmp')
+        dados.to_parquet(temporario)
+        os.replace(temporario, caminho)
+
+    def anexar(self, ticker: str, novos: pd.DataFrame) -> pd.DataFrame:
+        """Anexa barras novas ao histórico (barras repetidas são substituídas)"""
+        novos = self._normalizar(novos)
+        existentes = self.ler(ticker)
+        if existentes.empty:
+            combinado = novos
+        elif novos.empty:
+            return existentes
+        else:
+            combinado = pd.concat([existentes, novos])
+            combinado = combinado[~combinado.index.duplicated(keep='last')].sort_index()
+        self.gravar(ticker, combinado)
+        return combinado
+
+    @staticmethod
+    def _normalizar(dados: pd.DataFrame) -> pd.DataFrame:
+        """Mantém apenas OHLCV com índice ordenado e sem duplicatas"""
+        if dados is None or dados.empty:
+            return pd.DataFrame()
+        colunas = [c for c in COLUNAS_OHLCV if c in dados.columns]
+        dados = dados[colunas]
+        dados = dados[~dados.index.duplicated(keep='last')]
+        return dados.sort_index()
+
+    # ------------------------------------------------------------------
+    # Cobertura e atualização
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cobre(periodo_gravado: Optional[str], periodo: str) -> bool:
+        if periodo_gravado not in ORDEM_PERIODOS or periodo not in ORDEM_PERIODOS:
+            return False
+        return ORDEM_PERIODOS.index(periodo_gravado) >= ORDEM_PERIODOS.index(periodo)
+
+    @staticmethod
+    def _verificado_recentemente(entrada: Dict[str, Any]) -> bool:
+        valido_ate = entrada.get('valido_ate')
+        if not valido_ate:
+            return False
+        return calendario_service.agora() < datetime.fromisoformat(valido_ate)
+
+    def obter(self, ticker: str, periodo: str, baixar: Baixador) -> pd.DataFrame:
+        """
+        Retorna o histórico completo gravado, garantindo cobertura do período
+
+        Args:
+            ticker: Código no provedor (ex: 'PETR4.SA', '^BVSP')
+            periodo: Período mínimo que o histórico deve cobrir
+            baixar: Função do provedor, chamada com period=... ou start=...
+        """
+        with self._lock_ticker(ticker):
+            entrada = self._indice.get(ticker, {})
+            existentes = self.ler(ticker) if entrada else pd.DataFrame()
+
+            if existentes.empty or not self._cobre(entrada.get('periodo'), periodo):
+                return self._baixar_completo(ticker, periodo, baixar)
+
+            if self._verificado_recentemente(entrada):
+                return existentes
+
+            return self._atualizar_incremental(ticker, existentes, entrada, baixar)
+
+    def pendencia(self, ticker: str, periodo: str) -> Optional[Dict[str, str]]:
+        """
+        Argumentos do download que obter() faria agora (None se o histórico
+        gravado estiver em dia). Não acessa a rede nem altera o armazém.
+        """
+        entrada = self._indice.get(ticker)
+        if not entrada or not self._caminho(ticker).exists() or not self._cobre(entrada.get('periodo'), periodo):
+            return {'period': periodo}
+        if self._verificado_recentemente(entrada):
+            return None
+        inicio = entrada.get('inicio_incremental')
+        if inicio is None:
+            existentes = self.ler(ticker)
+            if existentes.empty:
+                return {'period': periodo}
+            inicio = self._inicio_incremental(existentes)
+        return {'start': inicio}
+
+    def _baixar_completo(self, ticker: str, periodo: str, baixar: Baixador) -> pd.DataFrame:
+        dados = self._normalizar(baixar(period=periodo))
+        if dados.empty:
+            return dados
+        self.gravar(ticker, dados)
+        self._registrar(ticker, periodo, dados)
+        logger.info(f"💾 Histórico de {ticker} ({periodo}) gravado: {len(dados)} barras")
+        return dados
+
+    def _atualizar_incremental(self, ticker: str, existentes: pd.DataFrame,
+                               entrada: Dict[str, Any], baixar: Baixador) -> pd.DataFrame:
+        try:
+            novos = self._normalizar(baixar(start=self._inicio_incremental(existentes)))
+        except Exception as e:
+            logger.error(f"Erro na atualização incremental de {ticker}: {e}")
+            return existentes
+
+        if novos.empty:
+            self._registrar(ticker, entrada['periodo'], existentes)
+            return existentes
+
+        if self._historico_reajustado(existentes, novos):
+            logger.info(f"♻️ Histórico de {ticker} foi reajustado no provedor, rebaixando")
+            return self._baixar_completo(ticker, entrada['periodo'], baixar)
+
+        combinado = self.anexar(ticker, novos)
+        self._registrar(ticker, entrada['periodo'], combinado)
+        return combinado
+
+    @staticmethod
+    def _inicio_incremental(dados: pd.DataFrame) -> str:
+        """Data da primeira barra rebaixada na próxima atualização"""
+        return dados.index[-min(BARRAS_SOBREPOSICAO, len(dados))].strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _historico_reajustado(existentes: pd.DataFrame, novos: pd.DataFrame) -> bool:
+        """Compara barras fechadas sobrepostas (exceto a última, ainda em formação)"""
+        comuns = existentes.index.intersection(novos.index)[:-1]
+        if len(comuns) == 0:
+            return False
+        antigos = existentes.loc[comuns, 'Close']
+        atuais = novos.loc[comuns, 'Close']
+        diferenca = ((antigos - atuais).abs() / antigos.abs()).max()
+        return bool(diferenca > 1e-6)
+
+    def _registrar(self, ticker: str, periodo: str, dados: pd.DataFrame):
+        with self._lock:
+            # Fora do pregão a barra diária não muda: válido até a próxima abertura
+            validade = timedelta(seconds=calendario_service.ttl('barra_diaria'))
+            self._indice[ticker] = {
+                'periodo': periodo,
+                'verificado_em': datetime.now().isoformat(),
+                'valido_ate': (calendario_service.agora() + validade).isoformat(),
+                'inicio_incremental': self._inicio_incremental(dados),
+            }
+            try:
+                self._salvar_indice()
+            except Exception as e:
+                logger.error(f"Erro ao salvar índice do histórico: {e}")
+
+    # ------------------------------------------------------------------
+    # Recorte por período
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def fatiar(dados: pd.DataFrame, periodo: str) -> pd.DataFrame:
+        """Recorta o histórico para as barras do período pedido"""
+        if dados.empty or periodo == 'max':
+            return dados
+        if periodo in PERIODOS_BARRAS:
+            return dados.iloc[-PERIODOS_BARRAS[periodo]:]
+        offset = PERIODOS_OFFSET.get(periodo)
+        if offset is None:
+            return dados
+        inicio = pd.Timestamp.now(tz=dados.index.tz).normalize() - offset
+        return dados.iloc[dados.index.searchsorted(inicio):]
+
+
+# Instância global
+historico_service = HistoricoService()
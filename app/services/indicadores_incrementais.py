@@ -0,0 +1,497 @@
+"""
+Indicadores Incrementais
+Estado por indicador atualizado em O(1) a cada barra, serializável para retomar depois
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Any, Dict, Optional, Tuple, Type
+
+import pandas as pd
+
+NAN = float('nan')
+
+# Nome da classe -> classe, para restaurar estados serializados
+TIPOS: Dict[str, Type['Incremental']] = {}
+
+
+def _nulo(valor: Optional[float]) -> bool:
+    return valor is None or math.isnan(valor)
+
+
+def _dividir(a: float, b: float) -> float:
+    """Divisão com a semântica do NumPy (±inf ou NaN em vez de exceção)"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a)
+    return a / b
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, Incremental):
+        return valor.para_dict()
+    if isinstance(valor, deque):
+        return {'deque': list(valor), 'maxlen': valor.maxlen}
+    return valor
+
+
+def _desserializar(valor: Any) -> Any:
+    if isinstance(valor, dict) and valor.get('tipo') in TIPOS:
+        return restaurar(valor)
+    if isinstance(valor, dict) and 'deque' in valor:
+        return deque(valor['deque'], maxlen=valor['maxlen'])
+    return valor
+
+
+def restaurar(dados: Dict[str, Any]) -> 'Incremental':
+    """Recria um indicador a partir de para_dict()"""
+    return TIPOS[dados['tipo']].de_dict(dados)
+
+
+class Incremental:
+    """Base dos indicadores incrementais (serialização genérica do estado)"""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        TIPOS[cls.__name__] = cls
+
+    def para_dict(self) -> Dict[str, Any]:
+        """Estado completo em tipos compatíveis com JSON"""
+        return {
+            'tipo': type(self).__name__,
+            'estado': {chave: _serializar(valor) for chave, valor in vars(self).items()},
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> 'Incremental':
+        objeto = cls.__new__(cls)
+        objeto.__dict__.update({chave: _desserializar(valor) for chave, valor in dados['estado'].items()})
+        return objeto
+
+
+# ============= Blocos básicos =============
+
+class MediaMovel(Incremental):
+    """Média em janela deslizante (NaN até a janela estar cheia, como rolling().mean())"""
+
+    def __init__(self, janela: int):
+        self.janela = janela
+        self.valores: deque = deque(maxlen=janela)
+        self.soma = 0.0
+        self.nulos = 0
+
+    def atualizar(self, valor: float) -> float:
+        if len(self.valores) == self.janela:
+            saiu = self.valores[0]
+            if _nulo(saiu):
+                self.nulos -= 1
+            else:
+                self.soma -= saiu
+        self.valores.append(valor)
+        if _nulo(valor):
+            self.nulos += 1
+        else:
+            self.soma += valor
+
+        if len(self.valores) < self.janela or self.nulos:
+            return NAN
+        return self.soma / self.janela
+
+
+class DesvioMovel(Incremental):
+    """Média e desvio padrão amostral em janela deslizante (Welford com remoção)"""
+
+    def __init__(self, janela: int):
+        self.janela = janela
+        self.valores: deque = deque(maxlen=janela)
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.nulos = 0
+
+    def _remover(self, valor: float):
+        if _nulo(valor):
+            self.nulos -= 1
+            return
+        self.n -= 1
+        if self.n == 0:
+            self.media = self.m2 = 0.0
+            return
+        delta = valor - self.media
+        self.media -= delta / self.n
+        self.m2 -= delta * (valor - self.media)
+
+    def _adicionar(self, valor: float):
+        if _nulo(valor):
+            self.nulos += 1
+            return
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+    def atualizar(self, valor: float) -> Tuple[float, float]:
+        """Retorna (média, desvio padrão)"""
+        if len(self.valores) == self.janela:
+            self._remover(self.valores[0])
+        self.valores.append(valor)
+        self._adicionar(valor)
+
+        if len(self.valores) < self.janela or self.nulos:
+            return NAN, NAN
+        return self.media, math.sqrt(max(self.m2, 0.0) / (self.n - 1))
+
+
+class EMA(Incremental):
+    """
+    Média exponencial como ewm(span, adjust=False).mean() (ignore_na=False)
+
+    NaN mantém o valor anterior, mas conta como tempo decorrido: o peso do
+    valor acumulado decai (1 - alfa) por barra até a próxima observação.
+    """
+
+    def __init__(self, span: int):
+        self.alfa = 2 / (span + 1)
+        self.valor: Optional[float] = None
+        self.peso = 1.0
+
+    def atualizar(self, valor: float) -> float:
+        if self.valor is not None:
+            self.peso *= 1 - self.alfa
+        if _nulo(valor):
+            return NAN if self.valor is None else self.valor
+        if self.valor is None:
+            self.valor = valor
+        else:
+            self.valor = (self.peso * self.valor + self.alfa * valor) / (self.peso + self.alfa)
+        self.peso = 1.0
+        return self.valor
+
+
+class Defasagem(Incremental):
+    """Valor de N barras atrás"""
+
+    def __init__(self, periodo: int):
+        self.valores: deque = deque(maxlen=periodo + 1)
+
+    def atualizar(self, valor: float) -> float:
+        self.valores.append(valor)
+        if len(self.valores) < self.valores.maxlen:
+            return NAN
+        return self.valores[0]
+
+
+# ============= Indicadores =============
+
+class RSI(Incremental):
+    """
+    RSI com médias simples de ganhos e perdas, a mesma fórmula do registro de
+    indicadores (não a suavização de Wilder), para bater com o histórico
+    """
+
+    def __init__(self, periodo: int = 14):
+        self.ganhos = MediaMovel(periodo)
+        self.perdas = MediaMovel(periodo)
+        self.anterior: Optional[float] = None
+
+    def atualizar(self, close: float) -> float:
+        delta = NAN if self.anterior is None else close - self.anterior
+        self.anterior = close
+        ganho = self.ganhos.atualizar(delta if delta > 0 else 0.0)
+        perda = self.perdas.atualizar(-delta if delta < 0 else 0.0)
+        return 100 - _dividir(100, 1 + _dividir(ganho, perda))
+
+
+class MACD(Incremental):
+    """MACD (EMA 12 - EMA 26), linha de sinal (EMA 9) e histograma"""
+
+    def __init__(self, rapida: int = 12, lenta: int = 26, sinal: int = 9):
+        self.rapida = EMA(rapida)
+        self.lenta = EMA(lenta)
+        self.sinal = EMA(sinal)
+
+    def atualizar(self, close: float) -> Tuple[float, float, float]:
+        macd = self.rapida.atualizar(close) - self.lenta.atualizar(close)
+        sinal = self.sinal.atualizar(macd)
+        return macd, sinal, macd - sinal
+
+
+class Bollinger(Incremental):
+    """Bandas de Bollinger: (superior, média, inferior)"""
+
+    def __init__(self, janela: int = 20, desvios: float = 2):
+        self.janela = DesvioMovel(janela)
+        self.desvios = desvios
+
+    def atualizar(self, close: float) -> Tuple[float, float, float]:
+        media, desvio = self.janela.atualizar(close)
+        return media + desvio * self.desvios, media, media - desvio * self.desvios
+
+
+class Volatilidade(Incremental):
+    """
+    Desvio dos retornos diários na janela, anualizado em %
+
+    Como pct_change() do registro, um fechamento ausente repete o anterior
+    (retorno zero) e o seguinte é comparado com o último fechamento válido.
+    """
+
+    def __init__(self, janela: int = 20):
+        self.janela = DesvioMovel(janela)
+        self.anterior: Optional[float] = None
+
+    def atualizar(self, close: float) -> float:
+        if self.anterior is None:
+            retorno = NAN
+        elif _nulo(close):
+            retorno = 0.0
+        else:
+            retorno = _dividir(close, self.anterior) - 1
+        if not _nulo(close):
+            self.anterior = close
+        return self.janela.atualizar(retorno)[1] * math.sqrt(252) * 100
+
+
+class OBV(Incremental):
+    """On Balance Volume"""
+
+    def __init__(self):
+        self.valor: Optional[float] = None
+        self.anterior: Optional[float] = None
+
+    def atualizar(self, close: float, volume: float) -> float:
+        if self.valor is None:
+            self.valor = volume
+        elif self.anterior is not None and close > self.anterior:
+            self.valor += volume
+        elif self.anterior is not None and close < self.anterior:
+            self.valor -= volume
+        self.anterior = close
+        return self.valor
+
+
+class AcumulacaoDistribuicao(Incremental):
+    """Linha de Acumulação/Distribuição (barras indefinidas não somam, como cumsum)"""
+
+    def __init__(self):
+        self.valor = 0.0
+
+    def atualizar(self, high: float, low: float, close: float, volume: float) -> float:
+        clv = _dividir((close - low) - (high - close), high - low)
+        fluxo = (0.0 if _nulo(clv) else clv) * volume
+        if _nulo(fluxo):
+            return NAN
+        self.valor += fluxo
+        return self.valor
+
+
+class VWAP(Incremental):
+    """VWAP acumulado desde o início do histórico"""
+
+    def __init__(self):
+        self.preco_volume = 0.0
+        self.volume = 0.0
+
+    def atualizar(self, high: float, low: float, close: float, volume: float) -> float:
+        preco_volume = (high + low + close) / 3 * volume
+        if not _nulo(preco_volume):
+            self.preco_volume += preco_volume
+        if not _nulo(volume):
+            self.volume += volume
+        if _nulo(preco_volume) or _nulo(volume):
+            return NAN
+        return _dividir(self.preco_volume, self.volume)
+
+
+class ForceIndex(Incremental):
+    """Force Index: EMA da variação do fechamento vezes o volume"""
+
+    def __init__(self, periodo: int = 13):
+        self.media = EMA(periodo)
+        self.anterior: Optional[float] = None
+
+    def atualizar(self, close: float, volume: float) -> float:
+        forca = NAN if self.anterior is None else (close - self.anterior) * volume
+        self.anterior = close
+        return self.media.atualizar(forca)
+
+
+class ROC(Incremental):
+    """Rate of Change (%)"""
+
+    def __init__(self, periodo: int = 12):
+        self.defasagem = Defasagem(periodo)
+
+    def atualizar(self, close: float) -> float:
+        antigo = self.defasagem.atualizar(close)
+        return _dividir(close - antigo, antigo) * 100
+
+
+class Momentum(Incremental):
+    """Diferença para o fechamento de N barras atrás"""
+
+    def __init__(self, periodo: int = 10):
+        self.defasagem = Defasagem(periodo)
+
+    def atualizar(self, close: float) -> float:
+        return close - self.defasagem.atualizar(close)
+
+
+class MFI(Incremental):
+    """Money Flow Index"""
+
+    def __init__(self, periodo: int = 14):
+        self.positivo = MediaMovel(periodo)
+        self.negativo = MediaMovel(periodo)
+        self.anterior: Optional[float] = None
+
+    def atualizar(self, high: float, low: float, close: float, volume: float) -> float:
+        typical_price = (high + low + close) / 3
+        fluxo = typical_price * volume
+        subiu = self.anterior is not None and typical_price > self.anterior
+        caiu = self.anterior is not None and typical_price < self.anterior
+        self.anterior = typical_price
+        positivo = self.positivo.atualizar(fluxo if subiu else 0.0)
+        negativo = self.negativo.atualizar(fluxo if caiu else 0.0)
+        return 100 - _dividir(100, 1 + _dividir(positivo, negativo))
+
+
+class ADX(Incremental):
+    """ADX com as mesmas médias simples de AnaliseTecnicaAvancada.calcular_adx"""
+
+    def __init__(self, periodo: int = 14):
+        self.atr = MediaMovel(periodo)
+        self.mais = MediaMovel(periodo)
+        self.menos = MediaMovel(periodo)
+        self.dx = MediaMovel(periodo)
+        self.anterior: Optional[Tuple[float, float, float]] = None
+
+    def atualizar(self, high: float, low: float, close: float) -> float:
+        if self.anterior is None:
+            mais_dm = menos_dm = NAN
+            tr = high - low
+        else:
+            high_ant, low_ant, close_ant = self.anterior
+            mais_dm = high - high_ant
+            mais_dm = 0.0 if mais_dm < 0 else mais_dm
+            menos_dm = low - low_ant
+            menos_dm = abs(0.0 if menos_dm > 0 else menos_dm)
+            faixas = [v for v in (high - low, abs(high - close_ant), abs(low - close_ant)) if not _nulo(v)]
+            tr = max(faixas) if faixas else NAN
+        self.anterior = (high, low, close)
+
+        atr = self.atr.atualizar(tr)
+        mais_di = 100 * _dividir(self.mais.atualizar(mais_dm), atr)
+        menos_di = 100 * _dividir(self.menos.atualizar(menos_dm), atr)
+        dx = 100 * _dividir(abs(mais_di - menos_di), mais_di + menos_di)
+        return self.dx.atualizar(dx)
+
+
+# ============= Conjunto com as colunas do histórico =============
+
+class IndicadoresIncrementais(Incremental):
+    """
+    Todos os indicadores de um ticker, produzindo as mesmas colunas do
+    registro de indicadores a cada barra
+    """
+
+    def __init__(self):
+        self.rsi = RSI()
+        self.sma_20 = MediaMovel(20)
+        self.sma_50 = MediaMovel(50)
+        self.sma_200 = MediaMovel(200)
+        self.macd = MACD()
+        self.bollinger = Bollinger()
+        self.volatilidade = Volatilidade()
+        self.volume_sma = MediaMovel(20)
+        self.vwap = VWAP()
+        self.obv = OBV()
+        self.mfi = MFI()
+        self.force_index = ForceIndex()
+        self.ad = AcumulacaoDistribuicao()
+        self.roc = ROC()
+        self.momentum = Momentum()
+        self.adx = ADX()
+        # Estado antes da última barra quando ela ainda está em formação
+        self.anterior: Optional[Dict[str, Any]] = None
+
+    def para_dict(self) -> Dict[str, Any]:
+        # O estado anterior fica fora de 'estado' para não ser restaurado como indicador
+        dados = self._capturar()
+        dados['anterior'] = self.anterior
+        return dados
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> 'IndicadoresIncrementais':
+        objeto = super().de_dict(dados)
+        objeto.anterior = dados.get('anterior')
+        return objeto
+
+    def _capturar(self) -> Dict[str, Any]:
+        dados = super().para_dict()
+        dados['estado'].pop('anterior')
+        return dados
+
+    def atualizar(self, barra: Dict[str, float], em_formacao: bool = False) -> Dict[str, float]:
+        """
+        Processa uma barra nova
+
+        Args:
+            barra: {'Open', 'High', 'Low', 'Close', 'Volume'}
+            em_formacao: Barra do dia ainda aberta, que será revista com substituir_ultima()
+
+        Returns:
+            Valores atualizados, com os nomes de coluna do histórico
+        """
+        # Guardar o estado custa O(janela); só vale para a barra que ainda vai mudar
+        self.anterior = self._capturar() if em_formacao else None
+        high, low, close, volume = (float(barra[c]) for c in ('High', 'Low', 'Close', 'Volume'))
+
+        macd, sinal, histograma = self.macd.atualizar(close)
+        superior, media, inferior = self.bollinger.atualizar(close)
+        return {
+            'RSI': self.rsi.atualizar(close),
+            'SMA_20': self.sma_20.atualizar(close),
+            'SMA_50': self.sma_50.atualizar(close),
+            'SMA_200': self.sma_200.atualizar(close),
+            'MACD': macd,
+            'Signal': sinal,
+            'MACD_Histogram': histograma,
+            'BB_Middle': media,
+            'BB_Upper': superior,
+            'BB_Lower': inferior,
+            'Volatility': self.volatilidade.atualizar(close),
+            'Volume_SMA': self.volume_sma.atualizar(volume),
+            'VWAP': self.vwap.atualizar(high, low, close, volume),
+            'OBV': self.obv.atualizar(close, volume),
+            'MFI': self.mfi.atualizar(high, low, close, volume),
+            'Force_Index': self.force_index.atualizar(close, volume),
+            'AD': self.ad.atualizar(high, low, close, volume),
+            'ROC': self.roc.atualizar(close),
+            'Momentum': self.momentum.atualizar(close),
+            'ADX': self.adx.atualizar(high, low, close),
+        }
+
+    def substituir_ultima(self, barra: Dict[str, float], em_formacao: bool = True) -> Dict[str, float]:
+        """
+        Reprocessa a barra em formação com valores revisados
+
+        Args:
+            barra: Valores atuais da barra
+            em_formacao: False quando esta é a versão final (barra fechada)
+        """
+        if self.anterior is None:
+            raise ValueError("A última barra não está em formação")
+        self.__dict__.update(IndicadoresIncrementais.de_dict(self.anterior).__dict__)
+        return self.atualizar(barra, em_formacao)
+
+    @classmethod
+    def aquecer(cls, dados: pd.DataFrame) -> 'IndicadoresIncrementais':
+        """Cria o estado processando um histórico OHLCV (uma única vez)"""
+        indicadores = cls()
+        for barra in dados[['High', 'Low', 'Close', 'Volume']].itertuples(index=False):
+            indicadores.atualizar(barra._asdict())
+        return indicadores
@@ -0,0 +1,263 @@
+"""
+Kernels Vetorizados de Indicadores
+Implementações em arrays NumPy dos indicadores que antes percorriam a série em loop
+
+Os kernels de janela (média, desvio, EMA, RSI, extremos) operam no último eixo e aceitam
+tanto uma série (datas,) quanto uma matriz (tickers, datas).
+"""
+
+from __future__ import annotations
+
+import warnings
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _direcao(serie: np.ndarray) -> np.ndarray:
+    """+1 se subiu, -1 se caiu, 0 se igual ou indefinido (NaN) em relação à barra anterior"""
+    direcao = np.zeros(len(serie))
+    if len(serie) > 1:
+        direcao[1:] = np.sign(np.diff(serie))
+    return np.nan_to_num(direcao, nan=0.0)
+
+
+def soma_movel(valores: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Soma em janela deslizante (NaN nas primeiras janela-1 posições, como rolling().sum())
+
+    Cada janela é somada independentemente, sem acumular erro de arredondamento.
+    """
+    saida = np.full(len(valores), np.nan)
+    if len(valores) >= janela:
+        saida[janela - 1:] = sliding_window_view(valores, janela).sum(axis=1)
+    return saida
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """On Balance Volume: volume acumulado com o sinal da variação do fechamento"""
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(close) == 0:
+        return np.empty(0)
+
+    direcao = _direcao(close)
+    # Barras sem variação não somam nada, nem mesmo um volume indefinido
+    fluxo = np.where(direcao != 0, direcao * volume, 0.0)
+    fluxo[0] = volume[0]
+    return np.cumsum(fluxo)
+
+
+def mfi(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+        periodo: int = 14) -> np.ndarray:
+    """Money Flow Index: razão entre fluxos de dinheiro positivos e negativos na janela"""
+    typical_price = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float)
+                     + np.asarray(close, dtype=float)) / 3
+    money_flow = typical_price * np.asarray(volume, dtype=float)
+
+    direcao = _direcao(typical_price)
+    positivo = np.where(direcao > 0, money_flow, 0.0)
+    negativo = np.where(direcao < 0, money_flow, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        razao = soma_movel(positivo, periodo) / soma_movel(negativo, periodo)
+        return 100 - (100 / (1 + razao))
+
+
+def perfil_volume(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+                  faixas: np.ndarray) -> np.ndarray:
+    """Volume negociado em cada faixa de preço (pelo preço típico da barra)"""
+    typical_price = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float)
+                     + np.asarray(close, dtype=float)) / 3
+    quantidade = len(faixas) - 1
+    indices = np.digitize(typical_price, faixas) - 1
+    dentro = (indices >= 0) & (indices < quantidade)
+    return np.bincount(indices[dentro], weights=np.asarray(volume, dtype=float)[dentro],
+                       minlength=quantidade)
+
+
+# ============= Kernels de janela (último eixo = tempo) =============
+
+def media_movel(valores: np.ndarray, janela: int) -> np.ndarray:
+    """Média móvel como rolling(janela).mean(): NaN se faltar qualquer valor na janela"""
+    valores = np.asarray(valores, dtype=float)
+    saida = np.full(valores.shape, np.nan)
+    if valores.shape[-1] < janela:
+        return saida
+
+    nulos = np.isnan(valores)
+    soma = np.cumsum(np.where(nulos, 0.0, valores), axis=-1)
+    contagem = np.cumsum(nulos, axis=-1)
+    soma_janela = soma[..., janela - 1:].copy()
+    soma_janela[..., 1:] -= soma[..., :-janela]
+    nulos_janela = contagem[..., janela - 1:].copy()
+    nulos_janela[..., 1:] -= contagem[..., :-janela]
+    saida[..., janela - 1:] = np.where(nulos_janela == 0, soma_janela / janela, np.nan)
+    return saida
+
+
+def desvio_movel(valores: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Desvio padrão amostral em janela deslizante, como rolling(janela).std()
+
+    Usa somas acumuladas sobre a série centrada na própria média, o que evita a
+    perda de precisão de E[x²] - E[x]² com preços longe de zero.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if valores.shape[-1] < janela:
+        return np.full(valores.shape, np.nan)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # linhas inteiras de NaN
+        centrado = valores - np.nanmean(valores, axis=-1, keepdims=True)
+        media = media_movel(centrado, janela)
+        variancia = (media_movel(centrado ** 2, janela) - media ** 2) * janela / (janela - 1)
+    return np.sqrt(np.maximum(variancia, 0.0))
+
+
+def ema(valores: np.ndarray, span: int) -> np.ndarray:
+    """
+    Média exponencial como ewm(span, adjust=False).mean() (ignore_na=False)
+
+    A recursão percorre o tempo, mas cada passo é vetorizado entre os tickers.
+    Cada série começa no seu primeiro valor válido; NaN repete o valor anterior.
+    Como no pandas, as barras com NaN contam como tempo decorrido: após uma
+    lacuna de k barras o valor antigo pesa (1 - alfa)^(k+1) contra alfa do novo.
+    """
+    # Tempo no primeiro eixo para cada passo ler memória contígua
+    valores = np.ascontiguousarray(np.moveaxis(np.asarray(valores, dtype=float), -1, 0))
+    alfa = 2 / (span + 1)
+    saida = np.empty(valores.shape)
+    atual = np.full(valores.shape[1:], np.nan)
+    # Peso do valor acumulado (1 logo após uma observação; decai nas lacunas)
+    peso = np.ones(valores.shape[1:])
+    for t, x in enumerate(valores):
+        iniciado = ~np.isnan(atual)
+        observado = ~np.isnan(x)
+        peso = np.where(iniciado, peso * (1 - alfa), peso)
+        with np.errstate(invalid='ignore'):
+            proximo = (peso * atual + alfa * x) / (peso + alfa)
+        atual = np.where(~iniciado, x, np.where(observado, proximo, atual))
+        peso = np.where(observado, 1.0, peso)
+        saida[t] = atual
+    return np.moveaxis(saida, 0, -1)
+
+
+def diferenca(valores: np.ndarray, periodo: int = 1) -> np.ndarray:
+    """valores[t] - valores[t - periodo] (NaN nas primeiras posições)"""
+    valores = np.asarray(valores, dtype=float)
+    saida = np.full(valores.shape, np.nan)
+    saida[..., periodo:] = valores[..., periodo:] - valores[..., :-periodo]
+    return saida
+
+
+def rsi(close: np.ndarray, periodo: int = 14) -> np.ndarray:
+    """RSI com médias simples de ganhos e perdas (a mesma fórmula do histórico)"""
+    delta = diferenca(close)
+    ganho = media_movel(np.where(delta > 0, delta, 0.0), periodo)
+    perda = media_movel(np.where(delta < 0, -delta, 0.0), periodo)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + ganho / perda))
+
+
+# ============= Suportes e resistências =============
+
+def extremos_locais(valores: np.ndarray, janela: int, maximo: bool = True) -> np.ndarray:
+    """
+    Máscara das barras que são o máximo (ou mínimo) da janela centrada nelas,
+    como comparar com rolling(janela, center=True).max(). As primeiras e as
+    últimas `janela` barras ficam de fora, pois a janela delas não é confiável.
+    """
+    valores = np.asarray(valores, dtype=float)
+    mascara = np.zeros(valores.shape, dtype=bool)
+    n = valores.shape[-1]
+    if n < 2 * janela + 1:
+        return mascara
+
+    janelas = sliding_window_view(valores, janela, axis=-1)
+    extremo = janelas.max(axis=-1) if maximo else janelas.min(axis=-1)
+    # Janela da barra i: [i - janela//2, i - janela//2 + janela)
+    inicio = janela // 2
+    centro = valores[..., janela:n - janela]
+    mascara[..., janela:n - janela] = centro == extremo[..., janela - inicio:n - janela - inicio]
+    return mascara
+
+
+def agrupar_niveis(niveis: np.ndarray, pesos: np.ndarray, tolerancia: float,
+                   grupos: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Agrupamento 1-D de níveis de preço: ordena e separa onde a distância para o
+    nível anterior passa de `tolerancia` (fração do preço) ou onde muda o grupo
+    (ticker, em execuções sobre o universo inteiro)
+
+    Returns:
+        Arrays alinhados 'grupo', 'nivel' (média ponderada pelos pesos),
+        'toques' e 'peso', ordenados por grupo e, dentro dele, por toques e
+        peso decrescentes
+    """
+    niveis = np.asarray(niveis, dtype=float)
+    pesos = np.nan_to_num(np.asarray(pesos, dtype=float), nan=0.0)
+    grupos = np.zeros(len(niveis), dtype=np.int64) if grupos is None else np.asarray(grupos)
+    if len(niveis) == 0:
+        return {'grupo': grupos[:0], 'nivel': niveis[:0], 'toques': np.zeros(0, dtype=np.int64),
+                'peso': pesos[:0]}
+
+    ordem = np.lexsort((niveis, grupos))
+    niveis, pesos, grupos = niveis[ordem], pesos[ordem], grupos[ordem]
+
+    novo = np.ones(len(niveis), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        novo[1:] = (grupos[1:] != grupos[:-1]) | (np.diff(niveis) > tolerancia * np.abs(niveis[:-1]))
+    inicios = np.flatnonzero(novo)
+
+    toques = np.diff(np.append(inicios, len(niveis)))
+    peso = np.add.reduceat(pesos, inicios)
+    soma = np.add.reduceat(niveis, inicios)
+    soma_ponderada = np.add.reduceat(niveis * pesos, inicios)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Sem volume no grupo, média simples
+        nivel = np.where(peso > 0, soma_ponderada / peso, soma / toques)
+
+    grupo = grupos[inicios]
+    ranking = np.lexsort((-peso, -toques, grupo))
+    return {'grupo': grupo[ranking], 'nivel': nivel[ranking], 'toques': toques[ranking], 'peso': peso[ranking]}
+
+
+# ============= Score técnico =============
+
+# Faixas de recomendação do score (limite inferior, rótulo), da maior para a menor
+RECOMENDACOES = [
+    (75, 'COMPRA FORTE 🟢🟢'),
+    (60, 'COMPRA 🟢'),
+    (40, 'NEUTRO 🟡'),
+    (25, 'VENDA 🔴'),
+]
+RECOMENDACAO_MINIMA = 'VENDA FORTE 🔴🔴'
+
+
+def score_tecnico(rsi: np.ndarray, macd: np.ndarray, sinal: np.ndarray, close: np.ndarray,
+                  sma_20: np.ndarray, sma_50: np.ndarray, volume: np.ndarray,
+                  volume_medio: np.ndarray) -> np.ndarray:
+    """
+    Score técnico (0-100) elemento a elemento, com as mesmas regras de
+    AnaliseTecnicaAvancada.calcular_score_tecnico (comparações com NaN são falsas)
+    """
+    pontos_rsi = np.select([rsi < 30, rsi > 70], [100.0, 0.0], 50.0)
+    pontos_macd = np.where(macd > sinal, 75.0, 25.0)
+    pontos_tendencia = np.select(
+        [(close > sma_20) & (sma_20 > sma_50), (close < sma_20) & (sma_20 < sma_50)], [100.0, 0.0], 50.0
+    )
+    pontos_volume = np.select(
+        [volume > volume_medio * 1.5, volume < volume_medio * 0.5], [75.0, 25.0], 50.0
+    )
+    return (pontos_rsi + pontos_macd + pontos_tendencia + pontos_volume) / 4
+
+
+def recomendacao(score: np.ndarray) -> np.ndarray:
+    """Rótulo de recomendação para cada score"""
+    score = np.asarray(score, dtype=float)
+    return np.select(
+        [score >= limite for limite, _ in RECOMENDACOES],
+        [rotulo for _, rotulo in RECOMENDACOES],
+        RECOMENDACAO_MINIMA,
+    )
@@ -0,0 +1,234 @@
+"""
+Registro de Indicadores Técnicos
+Cada indicador declara as colunas que produz e as que consome; só o necessário é calculado
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analise_tecnica_avancada import AnaliseTecnicaAvancada
+
+logger = logging.getLogger(__name__)
+
+# Colunas que vêm do provedor e nunca precisam ser calculadas
+COLUNAS_BASE = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Incrementar quando o cálculo de algum indicador mudar: entra nas ETags das
+# respostas, que assim deixam de valer mesmo com a mesma última barra
+VERSAO_INDICADORES = 1
+
+Calculo = Callable[[pd.DataFrame], Dict[str, pd.Series]]
+
+
+class Indicador:
+    """Um cálculo que produz uma ou mais colunas a partir de outras"""
+
+    def __init__(self, nome: str, colunas: List[str], dependencias: List[str], calculo: Calculo):
+        """
+        Args:
+            nome: Identificador do indicador
+            colunas: Colunas produzidas
+            dependencias: Colunas lidas (base ou de outros indicadores)
+            calculo: Função que recebe o frame e retorna {coluna: série}
+        """
+        self.nome = nome
+        self.colunas = colunas
+        self.dependencias = dependencias
+        self.calculo = calculo
+
+
+# Coluna produzida -> indicador que a produz (em ordem de registro)
+REGISTRO: Dict[str, Indicador] = {}
+
+
+def registrar(colunas: List[str], dependencias: Iterable[str] = ('Close',)):
+    """Decorador que registra a função como produtora das colunas"""
+    def decorador(calculo: Calculo) -> Calculo:
+        indicador = Indicador(calculo.__name__, list(colunas), list(dependencias), calculo)
+        for coluna in indicador.colunas:
+            REGISTRO[coluna] = indicador
+        return calculo
+    return decorador
+
+
+def todas_colunas() -> List[str]:
+    """Todas as colunas de indicadores registradas"""
+    return list(REGISTRO)
+
+
+def _ordem_calculo(frame: pd.DataFrame, colunas: Iterable[str]) -> List[Indicador]:
+    """Indicadores faltantes no frame, com as dependências antes de quem as usa"""
+    ordem: List[Indicador] = []
+    visitados = set()
+
+    def visitar(coluna: str):
+        if coluna in frame.columns or coluna in COLUNAS_BASE:
+            return
+        indicador = REGISTRO.get(coluna)
+        if indicador is None:
+            raise KeyError(f"Indicador desconhecido: {coluna}")
+        if indicador.nome in visitados:
+            return
+        visitados.add(indicador.nome)
+        for dependencia in indicador.dependencias:
+            visitar(dependencia)
+        ordem.append(indicador)
+
+    for coluna in colunas:
+        visitar(coluna)
+    return ordem
+
+
+def calcular(frame: pd.DataFrame, colunas: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Retorna o frame com as colunas pedidas (e suas dependências) calculadas
+
+    O frame recebido não é alterado: as colunas novas vão para uma cópia rasa,
+    de modo que quem já lê o frame anterior em outra thread não é afetado.
+
+    Args:
+        frame: Histórico OHLCV, possivelmente com indicadores já calculados
+        colunas: Colunas desejadas (None: todas as registradas)
+    """
+    ordem = _ordem_calculo(frame, todas_colunas() if colunas is None else colunas)
+    if not ordem:
+        return frame
+
+    resultado = frame.copy(deep=False)
+    for indicador in ordem:
+        try:
+            for coluna, serie in indicador.calculo(resultado).items():
+                resultado[coluna] = serie
+        except Exception as e:
+            logger.error(f"Erro ao calcular indicador {indicador.nome}: {e}")
+    return resultado
+
+
+# ============= Indicadores =============
+
+@registrar(['RSI'])
+def rsi(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    """RSI (Relative Strength Index)"""
+    delta = dados['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    return {'RSI': 100 - (100 / (1 + rs))}
+
+
+@registrar(['SMA_20'])
+def sma_20(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'SMA_20': dados['Close'].rolling(window=20).mean()}
+
+
+@registrar(['SMA_50'])
+def sma_50(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'SMA_50': dados['Close'].rolling(window=50).mean()}
+
+
+@registrar(['SMA_200'])
+def sma_200(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'SMA_200': dados['Close'].rolling(window=200).mean()}
+
+
+@registrar(['MACD'])
+def macd(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    exp1 = dados['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = dados['Close'].ewm(span=26, adjust=False).mean()
+    return {'MACD': exp1 - exp2}
+
+
+@registrar(['Signal'], dependencias=['MACD'])
+def macd_signal(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Signal': dados['MACD'].ewm(span=9, adjust=False).mean()}
+
+
+@registrar(['MACD_Histogram'], dependencias=['MACD', 'Signal'])
+def macd_histograma(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'MACD_Histogram': dados['MACD'] - dados['Signal']}
+
+
+@registrar(['BB_Middle', 'BB_Upper', 'BB_Lower'], dependencias=['Close', 'SMA_20'])
+def bollinger(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Bandas de Bollinger (a média central é a própria SMA_20)"""
+    std = dados['Close'].rolling(window=20).std()
+    return {
+        'BB_Middle': dados['SMA_20'],
+        'BB_Upper': dados['SMA_20'] + (std * 2),
+        'BB_Lower': dados['SMA_20'] - (std * 2),
+    }
+
+
+@registrar(['Volatility'])
+def volatilidade(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Volatility': dados['Close'].pct_change().rolling(window=20).std() * np.sqrt(252) * 100}
+
+
+@registrar(['Volume_SMA'], dependencias=['Volume'])
+def volume_medio(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Volume_SMA': dados['Volume'].rolling(window=20).mean()}
+
+
+@registrar(['VWAP'], dependencias=['High', 'Low', 'Close', 'Volume'])
+def vwap(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'VWAP': AnaliseTecnicaAvancada.calcular_vwap(dados)}
+
+
+@registrar(['OBV'], dependencias=['Close', 'Volume'])
+def obv(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'OBV': AnaliseTecnicaAvancada.calcular_obv(dados)}
+
+
+@registrar(['MFI'], dependencias=['High', 'Low', 'Close', 'Volume'])
+def mfi(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'MFI': AnaliseTecnicaAvancada.calcular_mfi(dados)}
+
+
+@registrar(['Force_Index'], dependencias=['Close', 'Volume'])
+def force_index(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Force_Index': AnaliseTecnicaAvancada.calcular_force_index(dados)}
+
+
+@registrar(['AD'], dependencias=['High', 'Low', 'Close', 'Volume'])
+def accumulation_distribution(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'AD': AnaliseTecnicaAvancada.calcular_accumulation_distribution(dados)}
+
+
+@registrar(['ROC'])
+def roc(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'ROC': AnaliseTecnicaAvancada.calcular_roc(dados)}
+
+
+@registrar(['Momentum'])
+def momentum(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Momentum': AnaliseTecnicaAvancada.calcular_momentum(dados)}
+
+
+@registrar(['ADX'], dependencias=['High', 'Low', 'Close'])
+def adx(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'ADX': AnaliseTecnicaAvancada.calcular_adx(dados)}
+
+
+@registrar(['Doji'], dependencias=['Open', 'High', 'Low', 'Close'])
+def doji(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Doji': AnaliseTecnicaAvancada.detectar_doji(dados)}
+
+
+@registrar(['Martelo'], dependencias=['Open', 'High', 'Low', 'Close'])
+def martelo(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Martelo': AnaliseTecnicaAvancada.detectar_martelo(dados)}
+
+
+@registrar(['Engolfo_Alta'], dependencias=['Open', 'Close'])
+def engolfo_alta(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Engolfo_Alta': AnaliseTecnicaAvancada.detectar_engolfo_alta(dados)}
+
+
+@registrar(['Engolfo_Baixa'], dependencias=['Open', 'Close'])
+def engolfo_baixa(dados: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {'Engolfo_Baixa': AnaliseTecnicaAvancada.detectar_engolfo_baixa(dados)}
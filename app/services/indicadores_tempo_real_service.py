@@ -0,0 +1,246 @@
+"""
+Indicadores em Tempo Real
+Estado incremental dos indicadores de cada ticker, avançado a cada cotação sem recalcular o histórico
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .indicadores_incrementais import IndicadoresIncrementais
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTOS = 500
+
+COLUNAS_BARRA = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Mesmos limites de RSI do score técnico
+RSI_SOBREVENDIDO = 30
+RSI_SOBRECOMPRADO = 70
+
+
+class IndicadoresTempoRealService:
+    """
+    Indicadores intradiários de todo o universo
+
+    O estado de cada ticker (IndicadoresIncrementais) é aquecido uma única vez
+    com o histórico e depois só avança: a cotação do pregão corrente substitui
+    a barra em formação e uma cotação de data posterior abre a barra seguinte,
+    em O(1) por ticker. Mudanças de zona do RSI e cruzamentos do MACD com a
+    linha de sinal viram eventos para o feed de mercado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estados: Dict[str, IndicadoresIncrementais] = {}
+        # Data da barra em formação de cada ticker
+        self._datas: Dict[str, np.datetime64] = {}
+        self._valores: Dict[str, Dict[str, float]] = {}
+        # ticker -> {indicador: zona publicada}
+        self._zonas: Dict[str, Dict[str, str]] = {}
+        self._eventos: Deque[Dict[str, Any]] = deque(maxlen=MAX_EVENTOS)
+        self._sequencia = 0
+        self._ultimas_barras: Optional[pd.DataFrame] = None
+
+    # ============= Estado =============
+
+    def aquecer(self, tickers: List[str], datas: pd.DatetimeIndex, precos: Dict[str, np.ndarray]):
+        """
+        Sincroniza o estado com matrizes OHLCV (tickers × datas, NaN onde o
+        ticker não negociou), como as de MatrizUniverso
+
+        Tickers novos processam o histórico inteiro; os já aquecidos só
+        reprocessam a barra em formação (na versão do histórico) e as barras
+        posteriores a ela.
+        """
+        inicio = time.perf_counter()
+        dias = _dias(datas)
+        novos: Dict[str, tuple] = {}
+        avancos: Dict[str, tuple] = {}
+
+        for linha, ticker in enumerate(tickers):
+            validos = np.flatnonzero(~np.isnan(precos['Close'][linha]))
+            if len(validos) == 0:
+                continue
+            barras = np.column_stack([precos[c][linha, validos] for c in COLUNAS_BARRA])
+            if ticker in self._estados:
+                avancos[ticker] = (dias[validos], barras)
+            else:
+                novos[ticker] = (dias[validos[-1]], _processar(IndicadoresIncrementais(), barras))
+
+        with self._lock:
+            for ticker, (dias_ticker, barras) in avancos.items():
+                self._avancar(ticker, dias_ticker, barras)
+            for ticker, (data, (estado, valores)) in novos.items():
+                self._estados[ticker] = estado
+                self._datas[ticker] = data
+                self._valores[ticker] = valores
+                self._zonas[ticker] = _zonas(valores)
+            # As últimas cotações podem ser mais novas que o histórico
+            if self._ultimas_barras is not None:
+                self._aplicar(self._ultimas_barras)
+        logger.info(
+            f"📈 Indicadores em tempo real: {len(novos)} tickers aquecidos, {len(avancos)} sincronizados "
+            f"({(time.perf_counter() - inicio) * 1000:.0f}ms)"
+        )
+
+    def _avancar(self, ticker: str, dias: np.ndarray, barras: np.ndarray):
+        """Reprocessa a barra em formação e as seguintes a partir do histórico (com o lock)"""
+        atual = self._datas[ticker]
+        if dias[-1] < atual:
+            return  # a cotação já está à frente do histórico
+        posicao = np.searchsorted(dias, atual)
+        estado = self._estados[ticker]
+        if posicao == len(dias) or dias[posicao] != atual or estado.anterior is None:
+            # Histórico reescrito (ajuste de proventos, lacuna): recomeça do zero
+            estado, valores = _processar(IndicadoresIncrementais(), barras)
+        else:
+            ultima = len(dias) - 1
+            valores = estado.substituir_ultima(_barra(barras[posicao]), em_formacao=posicao == ultima)
+            for i in range(posicao + 1, len(dias)):
+                valores = estado.atualizar(_barra(barras[i]), em_formacao=i == ultima)
+        self._estados[ticker] = estado
+        self._datas[ticker] = dias[-1]
+        self._publicar(ticker, valores)
+
+    def atualizar(self, barras: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Aplica cotações novas (índice = ticker; colunas data, Open, High, Low,
+        Close, Volume) e retorna os sinais que surgiram com elas
+        """
+        if barras.empty:
+            return []
+
+        with self._lock:
+            self._ultimas_barras = barras
+            return self._aplicar(barras)
+
+    def _aplicar(self, barras: pd.DataFrame) -> List[Dict[str, Any]]:
+        datas = _dias(pd.DatetimeIndex(barras['data']))
+        valores = barras[COLUNAS_BARRA].to_numpy(dtype=float)
+        sinais = []
+        for ticker, data, barra in zip(barras.index, datas, valores):
+            estado = self._estados.get(ticker)
+            if estado is None or data < self._datas[ticker]:
+                continue  # sem histórico ou cotação atrasada
+            if data == self._datas[ticker]:
+                resultado = estado.substituir_ultima(_barra(barra))
+            else:
+                resultado = estado.atualizar(_barra(barra), em_formacao=True)
+                self._datas[ticker] = data
+            sinais.extend(self._publicar(ticker, resultado))
+        return sinais
+
+    def atualizar_snapshot(self, snapshot: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Aplica o snapshot de cotações do universo (B3DataService.buscar_snapshot_universo)"""
+        if snapshot.empty or 'data' not in snapshot.columns:
+            return []
+        barras = pd.DataFrame({
+            'data': snapshot['data'],
+            'Open': snapshot['abertura'],
+            'High': snapshot['maxima'],
+            'Low': snapshot['minima'],
+            'Close': snapshot['preco_atual'],
+            'Volume': snapshot['volume'],
+        }).dropna(subset=['Open', 'Close'])  # sem abertura: o ticker não negociou no pregão
+        return self.atualizar(barras)
+
+    # ============= Sinais =============
+
+    def _publicar(self, ticker: str, valores: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Guarda os valores e registra como evento cada zona que mudou (com o lock)"""
+        self._valores[ticker] = valores
+        zonas = _zonas(valores)
+        anteriores = self._zonas.get(ticker, {})
+        self._zonas[ticker] = zonas
+
+        sinais = []
+        for indicador, zona in zonas.items():
+            if anteriores.get(indicador, zona) == zona:
+                continue
+            self._sequencia += 1
+            sinal = {
+                'ticker': ticker.replace('.SA', ''),
+                'indicador': indicador,
+                'zona': zona,
+                'mensagem': MENSAGENS[(indicador, zona)],
+                'rsi': valores['RSI'],
+                'macd': valores['MACD'],
+                'sinal_macd': valores['Signal'],
+                'data': str(self._datas[ticker]),
+                'detectado_em': datetime.now().isoformat(),
+                'sequencia': self._sequencia,
+            }
+            self._eventos.append(sinal)
+            sinais.append(sinal)
+        return sinais
+
+    # ============= Consulta =============
+
+    def valores(self, ticker: str) -> Optional[Dict[str, float]]:
+        """Indicadores do ticker com a última cotação aplicada (None se não aquecido)"""
+        with self._lock:
+            return self._valores.get(ticker)
+
+    def eventos_desde(self, sequencia: int = 0) -> List[Dict[str, Any]]:
+        """Sinais posteriores à sequência informada"""
+        with self._lock:
+            return [evento for evento in self._eventos if evento['sequencia'] > sequencia]
+
+    @property
+    def sequencia(self) -> int:
+        return self._sequencia
+
+
+MENSAGENS = {
+    ('RSI', 'sobrevendido'): f'RSI abaixo de {RSI_SOBREVENDIDO} (sobrevendido)',
+    ('RSI', 'sobrecomprado'): f'RSI acima de {RSI_SOBRECOMPRADO} (sobrecomprado)',
+    ('RSI', 'neutro'): 'RSI voltou à zona neutra',
+    ('MACD', 'alta'): 'MACD cruzou a linha de sinal para cima',
+    ('MACD', 'baixa'): 'MACD cruzou a linha de sinal para baixo',
+}
+
+
+def _zonas(valores: Dict[str, float]) -> Dict[str, str]:
+    """Zona de cada indicador acompanhado (indicadores ainda sem valor ficam de fora)"""
+    zonas = {}
+    rsi = valores['RSI']
+    if not np.isnan(rsi):
+        zonas['RSI'] = ('sobrevendido' if rsi < RSI_SOBREVENDIDO
+                        else 'sobrecomprado' if rsi > RSI_SOBRECOMPRADO else 'neutro')
+    if not (np.isnan(valores['MACD']) or np.isnan(valores['Signal'])):
+        zonas['MACD'] = 'alta' if valores['MACD'] > valores['Signal'] else 'baixa'
+    return zonas
+
+
+def _barra(valores: np.ndarray) -> Dict[str, float]:
+    return dict(zip(COLUNAS_BARRA, valores.tolist()))
+
+
+def _processar(estado: IndicadoresIncrementais, barras: np.ndarray):
+    """Processa o histórico inteiro; a última barra fica em formação"""
+    valores = None
+    ultima = len(barras) - 1
+    for i, barra in enumerate(barras):
+        valores = estado.atualizar(_barra(barra), em_formacao=i == ultima)
+    return estado, valores
+
+
+def _dias(datas: pd.DatetimeIndex) -> np.ndarray:
+    """Datas como datetime64[D] na data local do pregão (ignora fuso e horário)"""
+    if datas.tz is not None:
+        datas = datas.tz_localize(None)
+    return datas.to_numpy().astype('datetime64[D]')
+
+
+# Instância global
+indicadores_tempo_real_service = IndicadoresTempoRealService()
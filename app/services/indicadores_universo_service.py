@@ -0,0 +1,238 @@
+"""
+Motor de Indicadores do Universo
+Alinha todos os tickers em matrizes (tickers × datas) e calcula os indicadores de uma vez
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import indicadores_kernels as kernels
+from .calendario_service import calendario_service
+
+logger = logging.getLogger(__name__)
+
+COLUNAS_PRECO = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+CACHE_KEY = "indicadores_universo"
+
+
+class MatrizUniverso:
+    """Preços e indicadores do universo como matrizes (linha = ticker, coluna = data)"""
+
+    def __init__(self, tickers: List[str], datas: pd.DatetimeIndex, precos: Dict[str, np.ndarray]):
+        """
+        Args:
+            tickers: Tickers na ordem das linhas
+            datas: Datas na ordem das colunas (união dos pregões de todos os tickers)
+            precos: Matrizes OHLCV (NaN onde o ticker não tem barra na data)
+        """
+        self.tickers = tickers
+        self.datas = datas
+        self.precos = precos
+        self.indicadores: Dict[str, np.ndarray] = {}
+        # Níveis de suporte/resistência, calculados na primeira consulta
+        self.niveis: Optional[pd.DataFrame] = None
+        # Datas em que cada ticker tem barra (as demais vêm só da união)
+        self.presentes = ~np.all([np.isnan(matriz) for matriz in precos.values()], axis=0)
+
+    @classmethod
+    def alinhar(cls, dados_por_ticker: Dict[str, pd.DataFrame]) -> 'MatrizUniverso':
+        """Alinha os históricos pela união das datas"""
+        dados_por_ticker = {t: d for t, d in dados_por_ticker.items() if not d.empty}
+        if not dados_por_ticker:
+            return cls([], pd.DatetimeIndex([]), {c: np.empty((0, 0)) for c in COLUNAS_PRECO})
+
+        tickers = list(dados_por_ticker)
+        combinado = pd.concat({t: d[COLUNAS_PRECO] for t, d in dados_por_ticker.items()}, axis=1).sort_index()
+        precos = {
+            coluna: combinado.xs(coluna, axis=1, level=1).reindex(columns=tickers).to_numpy(dtype=float).T
+            for coluna in COLUNAS_PRECO
+        }
+        return cls(tickers, combinado.index, precos)
+
+    def _compactar(self, matriz: np.ndarray) -> np.ndarray:
+        """
+        Junta as barras de cada ticker à esquerda (NaN no fim das linhas mais
+        curtas), para que as janelas andem sobre os pregões do próprio ticker
+        e não sobre as lacunas da união das datas
+        """
+        linhas, destino = self._posicoes_compactas()
+        compacta = np.full((matriz.shape[0], int(self.presentes.sum(axis=1).max(initial=0))), np.nan)
+        compacta[linhas, destino] = matriz[self.presentes]
+        return compacta
+
+    def _espalhar(self, compacta: np.ndarray) -> np.ndarray:
+        """Devolve uma matriz compactada às datas da união (NaN onde o ticker não tem barra)"""
+        linhas, destino = self._posicoes_compactas()
+        matriz = np.full(self.presentes.shape, np.nan)
+        matriz[self.presentes] = compacta[linhas, destino]
+        return matriz
+
+    def _posicoes_compactas(self):
+        """Linha e coluna compactada de cada barra presente (na ordem de matriz[presentes])"""
+        linhas = np.nonzero(self.presentes)[0]
+        destino = (np.cumsum(self.presentes, axis=1) - 1)[self.presentes]
+        return linhas, destino
+
+    def calcular(self) -> 'MatrizUniverso':
+        """
+        Calcula os indicadores de todos os tickers em uma passada vetorizada
+
+        Cada ticker é calculado sobre as próprias barras: um pregão que só
+        outro ticker teve não abre lacuna nas médias móveis.
+        """
+        close = self._compactar(self.precos['Close'])
+        volume = self._compactar(self.precos['Volume'])
+
+        sma_20 = kernels.media_movel(close, 20)
+        macd = kernels.ema(close, 12) - kernels.ema(close, 26)
+        sinal = kernels.ema(macd, 9)
+        desvio = kernels.desvio_movel(close, 20)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            retornos = kernels.diferenca(close) / np.roll(close, 1, axis=-1)
+
+        indicadores = {
+            'RSI': kernels.rsi(close),
+            'SMA_20': sma_20,
+            'SMA_50': kernels.media_movel(close, 50),
+            'SMA_200': kernels.media_movel(close, 200),
+            'MACD': macd,
+            'Signal': sinal,
+            'MACD_Histogram': macd - sinal,
+            'BB_Middle': sma_20,
+            'BB_Upper': sma_20 + desvio * 2,
+            'BB_Lower': sma_20 - desvio * 2,
+            'Volatility': kernels.desvio_movel(retornos, 20) * np.sqrt(252) * 100,
+            'Volume_SMA': kernels.media_movel(volume, 20),
+        }
+        indicadores['Score'] = kernels.score_tecnico(
+            indicadores['RSI'], macd, sinal, close, sma_20, indicadores['SMA_50'],
+            volume, indicadores['Volume_SMA'],
+        )
+        self.indicadores = {nome: self._espalhar(matriz) for nome, matriz in indicadores.items()}
+        return self
+
+    def ultimos(self) -> pd.DataFrame:
+        """Tabela com os valores da última barra de cada ticker (índice = ticker)"""
+        if not self.tickers:
+            return pd.DataFrame()
+
+        close = self.precos['Close']
+        valido = ~np.isnan(close)
+        # Última coluna com fechamento de cada ticker (alguns podem não ter a barra mais recente)
+        ultima = close.shape[1] - 1 - np.argmax(valido[:, ::-1], axis=1)
+        linhas = np.arange(len(self.tickers))
+
+        tabela = pd.DataFrame(
+            {nome: matriz[linhas, ultima] for nome, matriz in {**self.precos, **self.indicadores}.items()},
+            index=pd.Index(self.tickers, name='ticker'),
+        )
+        tabela['data'] = self.datas[ultima]
+        tabela['barras'] = valido.sum(axis=1)
+        if 'Score' in tabela:
+            tabela['Recomendacao'] = kernels.recomendacao(tabela['Score'].to_numpy())
+        return tabela
+
+    def suportes_resistencias(self, janela: int = 20, tolerancia: float = 0.005, limite: int = 5) -> pd.DataFrame:
+        """
+        Níveis de suporte/resistência de todos os tickers em uma passada, com
+        as regras de AnaliseTecnicaAvancada.detectar_suportes_resistencias
+        (uma linha por nível; os `limite` mais tocados de cada ticker e tipo)
+        """
+        if not self.tickers:
+            return pd.DataFrame(columns=['ticker', 'tipo', 'nivel', 'toques', 'volume'])
+
+        tabelas = []
+        volume = self._compactar(self.precos['Volume'])
+        # Como no histórico de um ticker, as últimas `janela` barras de cada um ficam de fora
+        barras = self.presentes.sum(axis=1)
+        confiaveis = np.arange(volume.shape[1]) < (barras - janela)[:, None]
+        for tipo, coluna, maximo in (('resistencia', 'High', True), ('suporte', 'Low', False)):
+            precos = self._compactar(self.precos[coluna])
+            toques = kernels.extremos_locais(precos, janela, maximo=maximo) & confiaveis
+            linhas, _ = np.nonzero(toques)
+            niveis = kernels.agrupar_niveis(precos[toques], volume[toques], tolerancia, grupos=linhas)
+            # Posição de cada nível no ranking do próprio ticker
+            inicio_grupo = np.searchsorted(niveis['grupo'], niveis['grupo'])
+            principais = np.arange(len(niveis['grupo'])) - inicio_grupo < limite
+            tabelas.append(pd.DataFrame({
+                'ticker': np.asarray(self.tickers, dtype=object)[niveis['grupo'][principais]],
+                'tipo': tipo,
+                'nivel': niveis['nivel'][principais],
+                'toques': niveis['toques'][principais],
+                'volume': niveis['peso'][principais],
+            }))
+        return pd.concat(tabelas, ignore_index=True)
+
+
+class IndicadoresUniversoService:
+    """Mantém a matriz do universo calculada e em cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def obter(self, forcar: bool = False) -> Optional[MatrizUniverso]:
+        """
+        Matriz do universo com indicadores (histórico canônico de todos os tickers ativos)
+
+        Args:
+            forcar: Recalcular mesmo com a matriz em cache (usado pelo agendador)
+        """
+        from .cache_service import cache_service
+
+        if not forcar:
+            matriz = cache_service.get(CACHE_KEY)
+            if matriz is not None:
+                return matriz
+
+        with self._lock:
+            # Outra thread pode ter calculado enquanto esperávamos
+            matriz = None if forcar else cache_service.get(CACHE_KEY)
+            if matriz is not None:
+                return matriz
+
+            matriz = self._montar()
+            if matriz.tickers:
+                cache_service.set(CACHE_KEY, matriz, ttl_seconds=calendario_service.ttl('indicador'))
+            return matriz
+
+    def ultimos(self, forcar: bool = False) -> pd.DataFrame:
+        """Tabela de últimos valores do universo (vazia se não houver dados)"""
+        matriz = self.obter(forcar)
+        return matriz.ultimos() if matriz is not None else pd.DataFrame()
+
+    def suportes_resistencias(self) -> pd.DataFrame:
+        """Níveis de suporte/resistência do universo (calculados uma vez por matriz)"""
+        matriz = self.obter()
+        if matriz is None:
+            return pd.DataFrame()
+        if matriz.niveis is None:
+            # Corrida entre threads só repete o cálculo; o resultado é o mesmo
+            matriz.niveis = matriz.suportes_resistencias()
+        return matriz.niveis
+
+    @staticmethod
+    def _montar() -> MatrizUniverso:
+        from .b3_data_service import b3_service, PERIODO_CANONICO
+
+        inicio = time.perf_counter()
+        # Só preços: os indicadores são calculados aqui, para todos de uma vez
+        dados = b3_service.buscar_varios(b3_service.universo.ativos(), PERIODO_CANONICO, indicadores=[])
+        carregado = time.perf_counter()
+        matriz = MatrizUniverso.alinhar(dados).calcular()
+        logger.info(
+            f"🧮 Indicadores do universo: {len(matriz.tickers)} tickers × {len(matriz.datas)} datas "
+            f"(carga {carregado - inicio:.2f}s, cálculo {(time.perf_counter() - carregado) * 1000:.1f}ms)"
+        )
+        return matriz
+
+
+# Instância global
+indicadores_universo_service = IndicadoresUniversoService()
@@ -85,6 +85,35 @@ class MarketFeedService:
         
         return evento
     
+    @staticmethod
+    def evento_anomalia(anomalia: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte uma anomalia do scanner no formato de evento do feed"""
+        return {
+            'id': f"{anomalia['ticker']}_anomalia_{anomalia['sequencia']}",
+            'ticker': anomalia['ticker'],
+            'tipo': 'anomalia',
+            'timestamp': datetime.now().strftime("%I:%M:%S %p"),
+            'variacao': anomalia['variacao_dia'],
+            'positivo': anomalia['variacao_dia'] >= 0,
+            'mensagem': anomalia['mensagem'],
+            'detalhes': f"{anomalia['tipo']} · severidade {anomalia['severidade']}"
+                        + (f" · z {anomalia['z_score']:+.1f}" if anomalia.get('z_score') is not None else ''),
+        }
+    
+    @staticmethod
+    def evento_sinal(sinal: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte um sinal dos indicadores em tempo real no formato de evento do feed"""
+        return {
+            'id': f"{sinal['ticker']}_sinal_{sinal['sequencia']}",
+            'ticker': sinal['ticker'],
+            'tipo': 'sinal_indicador',
+            'timestamp': datetime.now().strftime("%I:%M:%S %p"),
+            'variacao': round(sinal['rsi'], 2) if sinal['indicador'] == 'RSI' else round(sinal['macd'], 4),
+            'positivo': sinal['zona'] in ('alta', 'sobrevendido'),
+            'mensagem': sinal['mensagem'],
+            'detalhes': f"RSI {sinal['rsi']:.1f} · MACD {sinal['macd']:.3f} / sinal {sinal['sinal_macd']:.3f}",
+        }
+    
     @staticmethod
     async def stream_eventos(websocket, intervalo: float = 2.0):
         """
@@ -94,8 +123,22 @@ class MarketFeedService:
             websocket: Conexão WebSocket
             intervalo: Segundos entre eventos (padrão: 2s)
         """
+        from .anomalias_service import anomalias_service
+        from .indicadores_tempo_real_service import indicadores_tempo_real_service
+        
+        # Só as anomalias detectadas depois da conexão (as vigentes estão em /api/b3/anomalias)
+        sequencia = anomalias_service.sequencia
+        sequencia_sinais = indicadores_tempo_real_service.sequencia
         try:
             while True:
+                for anomalia in anomalias_service.eventos_desde(sequencia):
+                    await websocket.send_json(MarketFeedService.evento_anomalia(anomalia))
+                    sequencia = anomalia['sequencia']
+                
+                for sinal in indicadores_tempo_real_service.eventos_desde(sequencia_sinais):
+                    await websocket.send_json(MarketFeedService.evento_sinal(sinal))
+                    sequencia_sinais = sinal['sequencia']
+                
                 evento = MarketFeedService.gerar_evento()
                 await websocket.send_json(evento)
                 logger.info(f"📡 Evento enviado: {evento['ticker']} - {evento['tipo']}")
@@ -0,0 +1,177 @@
+"""
+Memo de Indicadores
+Frames com indicadores (e respostas montadas a partir deles) válidos enquanto a última barra não mudar
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .frame_compacto import FrameCompacto
+
+# Barras diárias (as demais periodicidades são reamostradas delas); o
+# intervalo faz parte da chave para não misturar barras
+INTERVALO_DIARIO = '1d'
+
+COLUNAS_IMPRESSAO = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Guarda os frames como FrameCompacto (float32 + bitsets): menos memória em
+# troca de ~7 dígitos significativos e de reconstruir o DataFrame a cada leitura
+MEMO_COMPACTO = os.getenv("B3_MEMO_COMPACTO", "0") == "1"
+
+# Teto de memória do memo: as respostas em linhas (um dict por barra) chegam a
+# vários MB por ticker, então a contagem de entradas sozinha não limita nada
+MEMO_MAX_BYTES = int(os.getenv("B3_MEMO_MAX_MB", "256")) * 1024 * 1024
+
+# Elementos medidos por lista ao estimar o tamanho (o restante é extrapolado)
+AMOSTRA_TAMANHO = 8
+
+# (quantidade de barras, data da última barra, bytes do OHLCV da última barra)
+Impressao = Tuple[int, pd.Timestamp, bytes]
+
+
+def impressao(dados: pd.DataFrame) -> Optional[Impressao]:
+    """
+    Identifica o estado do histórico pela última barra: uma barra nova ou a
+    barra do dia atualizada mudam a impressão, o que invalida o memo sem TTL.
+    """
+    if dados.empty:
+        return None
+    colunas = [c for c in COLUNAS_IMPRESSAO if c in dados.columns]
+    # Bytes em vez de hash de floats: NaN compara igual a NaN
+    ultima = np.ascontiguousarray(dados[colunas].iloc[-1].to_numpy(dtype=float)).tobytes()
+    return (len(dados), dados.index[-1], ultima)
+
+
+class MemoIndicadoresService:
+    """
+    Memo LRU de frames de indicadores e de respostas derivadas, limitado por
+    número de entradas e por bytes (tamanho estimado ao guardar)
+
+    Os valores guardados são compartilhados entre endpoints e threads e devem
+    ser tratados como somente leitura: quem precisar alterar um frame trabalha
+    sobre uma cópia (como indicadores_registro.calcular já faz).
+    """
+
+    def __init__(self, max_entradas: int = 1024, max_bytes: int = MEMO_MAX_BYTES,
+                 compacto: bool = MEMO_COMPACTO):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.compacto = compacto
+        # chave -> (impressão, valor, bytes estimados)
+        self._entradas: 'OrderedDict[Hashable, Tuple[Impressao, Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obter(self, chave: Hashable, marca: Optional[Impressao]) -> Optional[Any]:
+        """Valor memorizado para a chave, se ainda for da mesma impressão"""
+        if marca is None:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[0] != marca:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[1]
+
+    def guardar(self, chave: Hashable, marca: Optional[Impressao], valor: Any):
+        """Memoriza o valor (substitui o de impressão anterior)"""
+        if marca is None:
+            return
+        tamanho = _tamanho(valor)
+        with self._lock:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[2]
+            if tamanho > self.max_bytes:
+                # Sozinho já estouraria o teto: esvaziaria o memo sem caber
+                self.descartes += 1
+                return
+            self._entradas[chave] = (marca, valor, tamanho)
+            self.bytes += tamanho
+            while len(self._entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                _, (_, _, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+
+    def frame(self, ticker: str, periodo: str, marca: Optional[Impressao],
+              intervalo: str = INTERVALO_DIARIO) -> Optional[pd.DataFrame]:
+        """Frame de indicadores memorizado para o histórico (ticker, período, intervalo)"""
+        dados = self.obter(('frame', ticker, periodo, intervalo), marca)
+        return dados.para_frame() if isinstance(dados, FrameCompacto) else dados
+
+    def guardar_frame(self, ticker: str, periodo: str, marca: Optional[Impressao],
+                      dados: pd.DataFrame, intervalo: str = INTERVALO_DIARIO) -> pd.DataFrame:
+        """
+        Memoriza o frame e o devolve como frame() o devolverá depois: no modo
+        compacto, já arredondado a float32, para que a primeira resposta (e a
+        ETag derivada dela) seja idêntica às servidas do memo
+        """
+        if not self.compacto:
+            self.guardar(('frame', ticker, periodo, intervalo), marca, dados)
+            return dados
+        compacto = FrameCompacto.de_frame(dados)
+        self.guardar(('frame', ticker, periodo, intervalo), marca, compacto)
+        return compacto.para_frame()
+
+    def tamanhos(self) -> Dict[str, int]:
+        """Bytes estimados de cada entrada (chave 'tipo/ticker/período/...', do menos ao mais recente)"""
+        with self._lock:
+            return {'/'.join(map(str, chave)): tamanho for chave, (_, _, tamanho) in self._entradas.items()}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            frames = [tamanho for chave, (_, _, tamanho) in self._entradas.items() if chave[0] == 'frame']
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'descartes': self.descartes,
+                'compacto': self.compacto,
+                'frames': len(frames),
+                'bytes_frames': sum(frames),
+            }
+
+
+def _tamanho(valor: Any) -> int:
+    """
+    Bytes aproximados de um valor memorizado
+
+    Frames e arrays informam o próprio tamanho; listas (as respostas em
+    linhas têm um dict por barra) são medidas por amostragem, para não
+    percorrer dezenas de milhares de valores a cada guardar. As chaves dos
+    dicts não entram: são os mesmos nomes de campo repetidos em todas as barras.
+    """
+    if isinstance(valor, FrameCompacto):
+        return valor.nbytes
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        if not valor:
+            return sys.getsizeof(valor)
+        amostra = valor[::max(1, len(valor) // AMOSTRA_TAMANHO)][:AMOSTRA_TAMANHO]
+        return sys.getsizeof(valor) + sum(map(_tamanho, amostra)) * len(valor) // len(amostra)
+    return sys.getsizeof(valor)
+
+
+# Instância global
+memo_indicadores_service = MemoIndicadoresService()
@@ -0,0 +1,125 @@
+"""
+Serviço de Metadados de Ações
+Campos estáticos (nome, setor, market cap...) persistidos em disco e renovados diariamente
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .calendario_service import calendario_service
+
+logger = logging.getLogger(__name__)
+
+# Arquivo para persistir metadados entre reinícios
+METADADOS_FILE = Path("metadados_acoes.json")
+
+# Campos que mudam no máximo uma vez por dia: campo da API -> campo do Yahoo
+CAMPOS_ESTATICOS = {
+    'nome': 'longName',
+    'setor': 'sector',
+    'market_cap': 'marketCap',
+    'p_l': 'trailingPE',
+    'dividend_yield': 'dividendYield',
+    'minima_52s': 'fiftyTwoWeekLow',
+    'maxima_52s': 'fiftyTwoWeekHigh',
+    'volume_medio': 'averageVolume',
+    'acoes_em_circulacao': 'sharesOutstanding',
+}
+
+
+class MetadadosService:
+    """Cache persistente dos campos estáticos de cada ticker"""
+
+    def __init__(self, arquivo: Path = METADADOS_FILE):
+        self.arquivo = Path(arquivo)
+        self._lock = threading.Lock()
+        self._metadados: Dict[str, Dict[str, Any]] = self._carregar()
+
+    def _carregar(self) -> Dict[str, Dict[str, Any]]:
+        """Carrega metadados do arquivo"""
+        if self.arquivo.exists():
+            try:
+                with open(self.arquivo, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Erro ao ler metadados: {e}")
+        return {}
+
+    def _salvar(self):
+        """Salva metadados no arquivo (escrita atômica)"""
+        temporario = self.arquivo.with_suffix('.tmp')
+        with open(temporario, 'w') as f:
+            json.dump(self._metadados, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.arquivo)
+
+    @staticmethod
+    def _valido(entrada: Dict[str, Any]) -> bool:
+        valido_ate = entrada.get('valido_ate')
+        if not valido_ate:
+            return False
+        return calendario_service.agora() < datetime.fromisoformat(valido_ate)
+
+    def consultar(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Retorna os metadados gravados (mesmo vencidos) sem acessar a rede"""
+        with self._lock:
+            return self._metadados.get(ticker)
+
+    def consultar_valido(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Metadados gravados apenas se ainda válidos (sem acessar a rede)"""
+        entrada = self.consultar(ticker)
+        return entrada if entrada is not None and self._valido(entrada) else None
+
+    def obter(self, ticker: str, baixar_info: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Retorna os campos estáticos do ticker, renovando-os se vencidos
+
+        Args:
+            ticker: Código no provedor (ex: 'PETR4.SA')
+            baixar_info: Função que retorna o dicionário completo de info do provedor
+        """
+        entrada = self.consultar(ticker)
+        if entrada is not None and self._valido(entrada):
+            return entrada
+
+        try:
+            info = baixar_info()
+        except Exception as e:
+            if entrada is not None:
+                logger.warning(f"Usando metadados vencidos de {ticker}: {e}")
+                return entrada
+            raise
+
+        entrada = self.extrair(ticker, info)
+        with self._lock:
+            self._metadados[ticker] = entrada
+            try:
+                self._salvar()
+            except Exception as e:
+                logger.error(f"Erro ao salvar metadados: {e}")
+        return entrada
+
+    @staticmethod
+    def extrair(ticker: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrai os campos estáticos do dicionário de info do Yahoo"""
+        entrada = {campo: info.get(origem) for campo, origem in CAMPOS_ESTATICOS.items()}
+        entrada['nome'] = entrada['nome'] or ticker
+        entrada['setor'] = entrada['setor'] or 'N/A'
+        for campo in ('market_cap', 'p_l', 'minima_52s', 'maxima_52s', 'volume_medio', 'acoes_em_circulacao'):
+            entrada[campo] = entrada[campo] or 0
+        entrada['dividend_yield'] = entrada['dividend_yield'] * 100 if entrada['dividend_yield'] else 0
+        entrada['atualizado_em'] = datetime.now().isoformat()
+        # Renovação diária; em fins de semana e feriados vale até a próxima abertura
+        validade = timedelta(seconds=calendario_service.ttl('metadados'))
+        entrada['valido_ate'] = (calendario_service.agora() + validade).isoformat()
+        return entrada
+
+
+# Instância global
+metadados_service = MetadadosService()
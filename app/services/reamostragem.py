@@ -0,0 +1,73 @@
+"""
+Reamostragem de Históricos
+Barras semanais, mensais e trimestrais montadas a partir do histórico diário local
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import pandas as pd
+
+from .historico_service import PERIODOS_BARRAS, PERIODOS_OFFSET
+from .memo_indicadores_service import INTERVALO_DIARIO
+
+# Intervalo (nomes do Yahoo Finance) -> regra do pandas. Cada barra é rotulada
+# pelo início do período (segunda-feira, dia 1º do mês/trimestre), como no Yahoo
+REGRAS_INTERVALO = {
+    '1wk': 'W-MON',
+    '1mo': 'MS',
+    '3mo': 'QS',
+}
+
+INTERVALOS = [INTERVALO_DIARIO, *REGRAS_INTERVALO]
+
+AGREGACAO_OHLCV = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+}
+
+
+def reamostrar(dados: pd.DataFrame, intervalo: str) -> pd.DataFrame:
+    """
+    Agrega o histórico diário no intervalo pedido (só as colunas OHLCV;
+    indicadores precisam ser calculados de novo sobre as barras agregadas)
+    """
+    if intervalo == INTERVALO_DIARIO or dados.empty:
+        return dados
+    regra = REGRAS_INTERVALO.get(intervalo)
+    if regra is None:
+        raise ValueError(f"Intervalo não suportado: {intervalo}")
+
+    colunas = {c: f for c, f in AGREGACAO_OHLCV.items() if c in dados.columns}
+    agregado = dados[list(colunas)].resample(regra, label='left', closed='left').agg(colunas)
+    # Períodos sem pregão (feriados longos, ticker suspenso) não viram barras
+    return agregado.dropna(subset=['Close'])
+
+
+def fatiar(dados: pd.DataFrame, periodo: str, sessoes: Optional[pd.DatetimeIndex] = None) -> pd.DataFrame:
+    """
+    Recorta barras agregadas para o período pedido, incluindo a barra que
+    contém o início do período (ela começa antes, mas cobre a data pedida)
+
+    Args:
+        dados: Barras agregadas por reamostrar()
+        periodo: Período pedido ('1d', '5d', '1mo', ..., 'max')
+        sessoes: Datas do histórico diário de origem; '1d'/'5d' contam pregões,
+            e os últimos N podem cair em mais de uma barra agregada
+    """
+    if dados.empty or periodo == 'max':
+        return dados
+    if periodo in PERIODOS_BARRAS:
+        if sessoes is None or len(sessoes) == 0:
+            return dados.iloc[-1:]
+        inicio = sessoes[-min(PERIODOS_BARRAS[periodo], len(sessoes))]
+    else:
+        offset = PERIODOS_OFFSET.get(periodo)
+        if offset is None:
+            return dados
+        inicio = pd.Timestamp.now(tz=dados.index.tz).normalize() - offset
+    return dados.iloc[max(dados.index.searchsorted(inicio, side='right') - 1, 0):]
@@ -0,0 +1,147 @@
+"""
+Registro do Universo de Tickers
+Normaliza e deduplica tickers, mapeia setores e evita símbolos sem dados (cache negativo)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Arquivo para persistir o cache negativo entre reinícios
+INATIVOS_FILE = Path("tickers_inativos.json")
+
+# Códigos de negociação da B3: 4 caracteres + 1 ou 2 dígitos (PETR4, TAEE11, B3SA3)
+PADRAO_TICKER_B3 = re.compile(r'^[A-Z0-9]{4}\d{1,2}$')
+
+# Backoff exponencial antes de tentar de novo um símbolo sem dados
+ESPERA_BASE = timedelta(hours=1)
+ESPERA_MAXIMA = timedelta(days=7)
+
+
+class UniversoService:
+    """Universo de tickers monitorados, com cache negativo de símbolos mortos"""
+
+    def __init__(self, tickers: Iterable[str], setores: Dict[str, List[str]],
+                 arquivo: Path = INATIVOS_FILE):
+        """
+        Args:
+            tickers: Lista bruta de tickers (pode conter duplicatas e símbolos inválidos)
+            setores: Mapa setor -> tickers
+            arquivo: Onde persistir o cache negativo
+        """
+        self.arquivo = Path(arquivo)
+        self._lock = threading.Lock()
+        self._inativos: Dict[str, Dict[str, Any]] = self._carregar()
+
+        self._tickers: List[str] = []
+        for ticker in tickers:
+            normalizado = self.normalizar(ticker)
+            if normalizado is None:
+                logger.warning(f"Ticker inválido ignorado no universo: {ticker}")
+            elif normalizado not in self._tickers:
+                self._tickers.append(normalizado)
+
+        self._setores: Dict[str, str] = {}
+        for setor, tickers_setor in setores.items():
+            for ticker in tickers_setor:
+                normalizado = self.normalizar(ticker)
+                if normalizado is not None:
+                    self._setores.setdefault(normalizado, setor)
+
+    @staticmethod
+    def normalizar(ticker: str) -> Optional[str]:
+        """Converte para o formato do Yahoo ('petr4' -> 'PETR4.SA'); None se inválido"""
+        codigo = ticker.strip().upper()
+        if codigo.endswith('.SA'):
+            codigo = codigo[:-3]
+        if not PADRAO_TICKER_B3.match(codigo):
+            return None
+        return f"{codigo}.SA"
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @property
+    def tickers(self) -> List[str]:
+        """Todos os tickers válidos do universo, sem duplicatas"""
+        return list(self._tickers)
+
+    def ativos(self) -> List[str]:
+        """Tickers do universo, exceto os que estão em espera no cache negativo"""
+        agora = datetime.now()
+        with self._lock:
+            return [
+                ticker for ticker in self._tickers
+                if ticker not in self._inativos
+                or datetime.fromisoformat(self._inativos[ticker]['proxima_tentativa']) <= agora
+            ]
+
+    def setor(self, ticker: str) -> str:
+        normalizado = self.normalizar(ticker)
+        return self._setores.get(normalizado, 'Outros') if normalizado else 'Outros'
+
+    def setor_por_ticker(self) -> Dict[str, str]:
+        return dict(self._setores)
+
+    def inativos(self) -> Dict[str, Dict[str, Any]]:
+        """Cache negativo atual (para monitoramento)"""
+        with self._lock:
+            return dict(self._inativos)
+
+    # ------------------------------------------------------------------
+    # Cache negativo
+    # ------------------------------------------------------------------
+
+    def registrar_falha(self, ticker: str):
+        """Registra que o ticker não retornou dados e agenda a próxima tentativa"""
+        if ticker not in self._tickers:
+            return
+        with self._lock:
+            entrada = self._inativos.get(ticker, {'falhas': 0})
+            falhas = entrada['falhas'] + 1
+            espera = min(ESPERA_BASE * (2 ** (falhas - 1)), ESPERA_MAXIMA)
+            self._inativos[ticker] = {
+                'falhas': falhas,
+                'ultima_falha': datetime.now().isoformat(),
+                'proxima_tentativa': (datetime.now() + espera).isoformat(),
+            }
+            self._salvar()
+        logger.info(f"🚫 {ticker} sem dados ({falhas}x), nova tentativa em {espera}")
+
+    def registrar_sucesso(self, ticker: str):
+        """Remove o ticker do cache negativo"""
+        with self._lock:
+            if ticker not in self._inativos:
+                return
+            del self._inativos[ticker]
+            self._salvar()
+
+    def _carregar(self) -> Dict[str, Dict[str, Any]]:
+        """Carrega o cache negativo do arquivo"""
+        if self.arquivo.exists():
+            try:
+                with open(self.arquivo, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Erro ao ler cache negativo: {e}")
+        return {}
+
+    def _salvar(self):
+        """Salva o cache negativo no arquivo (escrita atômica)"""
+        try:
+            temporario = self.arquivo.with_suffix('.tmp')
+            with open(temporario, 'w') as f:
+                json.dump(self._inativos, f, indent=2)
+            os.replace(temporario, self.arquivo)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache negativo: {e}")
@@ -0,0 +1,30 @@
+"""
+Dados de Teste
+Históricos OHLCV sintéticos e reprodutíveis para os testes
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def ohlcv(n: int, lacunas: bool = False, semente: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    close = 30 + np.round(rng.standard_normal(n).cumsum(), 2)
+    # Barras repetidas exercitam o caso "sem variação"
+    repetidas = np.flatnonzero(rng.random(n) < 0.1)
+    repetidas = repetidas[repetidas > 0]
+    close[repetidas] = close[repetidas - 1]
+
+    dados = pd.DataFrame({
+        'Open': close + rng.normal(0, 0.2, n),
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, n).astype(float),
+    }, index=pd.bdate_range('2020-01-01', periods=n))
+    dados['High'] = dados[['Open', 'Close']].max(axis=1) + rng.random(n)
+    dados['Low'] = dados[['Open', 'Close']].min(axis=1) - rng.random(n)
+
+    if lacunas and n > 2:
+        posicoes = rng.choice(np.arange(1, n), size=max(1, n // 10), replace=False)
+        dados.iloc[posicoes, dados.columns.get_loc('Close')] = np.nan
+        dados.iloc[posicoes[::2], dados.columns.get_loc('High')] = np.nan
+    return dados
@@ -0,0 +1,51 @@
+"""
+Agendador de Tarefas
+Intervalos das tarefas registradas pela API contra o TTL das chaves que elas renovam
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.api import main
+from app.services import agendador_service as modulo_agendador
+from app.services.agendador_service import AgendadorService
+from app.services.calendario_service import FUSO_B3, calendario_service
+
+# Terça-feira comum (sem feriado) e um sábado
+MOMENTOS = {
+    'madrugada': datetime(2026, 3, 10, 3, 0, tzinfo=FUSO_B3),
+    'quase_pre_abertura': datetime(2026, 3, 10, 9, 44, 30, tzinfo=FUSO_B3),
+    'pre_abertura': datetime(2026, 3, 10, 9, 50, tzinfo=FUSO_B3),
+    'pregao': datetime(2026, 3, 10, 12, 0, tzinfo=FUSO_B3),
+    'pos_fechamento': datetime(2026, 3, 10, 17, 30, tzinfo=FUSO_B3),
+    'noite': datetime(2026, 3, 10, 21, 0, tzinfo=FUSO_B3),
+    'fim_de_semana': datetime(2026, 3, 14, 12, 0, tzinfo=FUSO_B3),
+}
+
+
+@pytest.fixture
+def tarefas(monkeypatch):
+    agendador = AgendadorService()
+    monkeypatch.setattr(modulo_agendador, 'agendador_service', agendador)
+    main._registrar_tarefas_agendadas()
+    return agendador.tarefas()
+
+
+@pytest.mark.parametrize("momento", list(MOMENTOS.values()), ids=list(MOMENTOS))
+def test_intervalo_abaixo_do_ttl_das_chaves_renovadas(tarefas, momento):
+    assert {tarefa.nome: tarefa.classe_ttl for tarefa in tarefas} == {
+        'universo': 'cotacao', 'ibovespa': 'barra_diaria', 'indicadores_universo': 'indicador',
+    }
+    for tarefa in tarefas:
+        assert 0 < tarefa.proximo_intervalo(momento) < calendario_service.ttl(tarefa.classe_ttl, momento)
+
+
+def test_intervalo_acompanha_a_fase_do_pregao(tarefas):
+    universo = next(tarefa for tarefa in tarefas if tarefa.nome == 'universo')
+    assert universo.proximo_intervalo(MOMENTOS['pregao']) < universo.proximo_intervalo(MOMENTOS['noite'])
+
+
+def test_classe_de_ttl_desconhecida():
+    with pytest.raises(ValueError):
+        AgendadorService().registrar('x', lambda: None, intervalo=60, classe_ttl='cotacoes')
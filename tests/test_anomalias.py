@@ -0,0 +1,161 @@
+"""
+Scanner de Anomalias
+Aquecimento pela matriz do universo, eventos de pico e buffers circulares
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.anomalias_service import AnomaliasService
+from app.services.indicadores_universo_service import MatrizUniverso
+from app.services.market_feed_service import MarketFeedService
+
+JANELA = 20
+
+
+def calmo(n: int, semente: int) -> pd.DataFrame:
+    """Histórico sem gaps nem amplitude grande: nenhuma anomalia por construção"""
+    rng = np.random.default_rng(semente)
+    close = 30 * np.exp(rng.normal(0, 0.005, n).cumsum())
+    abertura = np.append(30, close[:-1])
+    dados = pd.DataFrame({
+        'Open': abertura,
+        'Close': close,
+        'Volume': rng.integers(900_000, 1_100_000, n).astype(float),
+    }, index=pd.bdate_range('2024-01-01', periods=n))
+    dados['High'] = dados[['Open', 'Close']].max(axis=1) * 1.002
+    dados['Low'] = dados[['Open', 'Close']].min(axis=1) * 0.998
+    return dados
+
+
+@pytest.fixture
+def historicos():
+    return {'AAAA3.SA': calmo(60, 1), 'BBBB4.SA': calmo(60, 2)}
+
+
+@pytest.fixture
+def scanner(historicos):
+    scanner = AnomaliasService(janela=JANELA)
+    matriz = MatrizUniverso.alinhar(historicos)
+    scanner.aquecer(matriz.tickers, matriz.datas, matriz.precos)
+    return scanner
+
+
+def snapshot(historicos, data, volumes=None, fechamentos=None):
+    """Cotações do pregão `data` no formato de buscar_snapshot_universo (sem gap nem amplitude)"""
+    linhas = []
+    for ticker, dados in historicos.items():
+        abertura = dados['Close'].iloc[-1]
+        fechamento = (fechamentos or {}).get(ticker, abertura)
+        linhas.append({
+            'ticker': ticker,
+            'data': pd.Timestamp(data),
+            'abertura': abertura,
+            'maxima': max(abertura, fechamento) * 1.001,
+            'minima': min(abertura, fechamento) * 0.999,
+            'preco_atual': fechamento,
+            'volume': (volumes or {}).get(ticker, 1_000_000.0),
+        })
+    return pd.DataFrame(linhas).set_index('ticker')
+
+
+def proximo_pregao(historicos):
+    return next(iter(historicos.values())).index[-1] + pd.offsets.BDay()
+
+
+def test_aquecimento_sem_anomalias(scanner):
+    assert scanner.anomalias() == []
+    assert scanner.sequencia == 0
+    assert scanner._preenchidos.tolist() == [JANELA, JANELA]
+
+
+def test_pico_de_volume_gera_um_evento_com_z_score(scanner, historicos):
+    volumes = historicos['AAAA3.SA']['Volume'].to_numpy()
+    pico = 10 * volumes.mean()
+
+    eventos = scanner.atualizar_snapshot(
+        snapshot(historicos, proximo_pregao(historicos), volumes={'AAAA3.SA': pico}))
+
+    assert len(eventos) == 1
+    evento = eventos[0]
+    assert (evento['ticker'], evento['tipo'], evento['severidade']) == ('AAAA3', 'VOLUME_ALTO', 'alta')
+    # A barra do último pregão aquecido fechou e entrou no buffer: janela = os JANELA últimos volumes
+    janela = volumes[-JANELA:]
+    esperado = (pico - janela.mean()) / janela.std(ddof=1)
+    assert evento['z_score'] == pytest.approx(round(esperado, 2))
+    assert scanner.eventos_desde(0) == eventos
+    assert 'z' in MarketFeedService.evento_anomalia(evento)['detalhes']
+
+
+def test_pico_de_preco_gera_um_evento_de_volatilidade(scanner, historicos):
+    fechamentos = historicos['BBBB4.SA']['Close'].to_numpy()
+    novo = fechamentos[-1] * 1.04
+
+    eventos = scanner.atualizar_snapshot(
+        snapshot(historicos, proximo_pregao(historicos), fechamentos={'BBBB4.SA': novo}))
+
+    assert [(e['ticker'], e['tipo']) for e in eventos] == [('BBBB4', 'VOLATILIDADE')]
+    retornos = fechamentos[-JANELA:] / fechamentos[-JANELA - 1:-1] - 1
+    esperado = (novo / fechamentos[-1] - 1) / retornos.std(ddof=1)
+    assert eventos[0]['z_score'] == pytest.approx(round(esperado, 2))
+    assert eventos[0]['variacao_dia'] == pytest.approx(4.0)
+
+
+def test_mesma_cotacao_nao_repete_o_evento(scanner, historicos):
+    data = proximo_pregao(historicos)
+    pico = {'AAAA3.SA': 10e6}
+    assert len(scanner.atualizar_snapshot(snapshot(historicos, data, volumes=pico))) == 1
+    assert scanner.atualizar_snapshot(snapshot(historicos, data, volumes={'AAAA3.SA': 11e6})) == []
+    assert scanner.sequencia == 1
+    assert [a['tipo'] for a in scanner.anomalias()] == ['VOLUME_ALTO']
+
+    # Volume volta ao normal: a anomalia deixa de valer, sem novo evento
+    assert scanner.atualizar_snapshot(snapshot(historicos, data)) == []
+    assert scanner.anomalias() == []
+
+
+def test_historico_curto_nao_dispara_volume(historicos):
+    scanner = AnomaliasService(janela=JANELA)
+    curtos = {ticker: dados.iloc[:10] for ticker, dados in historicos.items()}
+    matriz = MatrizUniverso.alinhar(curtos)
+    scanner.aquecer(matriz.tickers, matriz.datas, matriz.precos)
+
+    eventos = scanner.atualizar_snapshot(
+        snapshot(curtos, proximo_pregao(curtos), volumes={'AAAA3.SA': 50e6}))
+    assert eventos == []
+
+
+def test_buffer_circular_da_volta_apos_a_capacidade(historicos):
+    janela = 5
+    scanner = AnomaliasService(janela=janela)
+    matriz = MatrizUniverso.alinhar(historicos)
+    scanner.aquecer(matriz.tickers, matriz.datas, matriz.precos)
+    linha = scanner._linhas['AAAA3.SA']
+    assert scanner._posicao[linha] == 0  # buffer cheio: a próxima escrita descarta o mais antigo
+
+    # Pregões novos além da capacidade (cada barra fecha a anterior)
+    volumes = list(historicos['AAAA3.SA']['Volume'])
+    fechamentos = list(historicos['AAAA3.SA']['Close'])
+    data = historicos['AAAA3.SA'].index[-1]
+    for passo in range(janela + 3):
+        data += pd.offsets.BDay()
+        volume, fechamento = 1_000_000.0 + passo, fechamentos[-1] * 1.001
+        scanner.atualizar(pd.DataFrame(
+            {'data': [data], 'Open': [fechamentos[-1]], 'High': [fechamento], 'Low': [fechamentos[-1]],
+             'Close': [fechamento], 'Volume': [volume]}, index=['AAAA3.SA']))
+        volumes.append(volume)
+        fechamentos.append(fechamento)
+
+        # Do mais antigo ao mais recente a partir da posição de escrita
+        posicao = scanner._posicao[linha]
+        assert posicao == (passo + 1) % janela
+        ordenado = np.roll(scanner._volumes[linha], -posicao)
+        np.testing.assert_allclose(ordenado, volumes[-janela - 1:-1])
+        retornos = np.array(fechamentos[-janela - 1:]) / np.array(fechamentos[-janela - 2:-1]) - 1
+        np.testing.assert_allclose(np.roll(scanner._retornos[linha], -posicao), retornos[:-1])
+        assert scanner._preenchidos[linha] == janela
+
+    # O outro ticker não recebeu barras e fica intacto
+    outra = scanner._linhas['BBBB4.SA']
+    np.testing.assert_allclose(scanner._volumes[outra], historicos['BBBB4.SA']['Volume'].to_numpy()[-janela - 1:-1])
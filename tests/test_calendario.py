@@ -0,0 +1,105 @@
+"""
+Calendário da B3
+Feriados móveis, fases do pregão e TTL por fase com o relógio fixo
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.services import calendario_service as modulo
+from app.services.calendario_service import FUSO_B3, TTLS, CalendarioService, _pascoa, feriados
+
+calendario = CalendarioService()
+
+
+def momento(texto: str) -> datetime:
+    return datetime.fromisoformat(texto).replace(tzinfo=FUSO_B3)
+
+
+@pytest.mark.parametrize("ano, pascoa", [(2024, date(2024, 3, 31)), (2025, date(2025, 4, 20)),
+                                         (2026, date(2026, 4, 5)), (2027, date(2027, 3, 28)),
+                                         (2038, date(2038, 4, 25))])
+def test_pascoa(ano, pascoa):
+    assert _pascoa(ano) == pascoa
+
+
+@pytest.mark.parametrize("dia", [
+    date(2025, 3, 3), date(2025, 3, 4),      # Carnaval
+    date(2026, 2, 16), date(2026, 2, 17),
+    date(2026, 4, 3),                        # Sexta-feira Santa
+    date(2025, 6, 19), date(2026, 6, 4),     # Corpus Christi
+    date(2026, 4, 21), date(2026, 11, 20), date(2026, 12, 24), date(2026, 12, 31),
+])
+def test_feriados(dia):
+    assert dia in feriados(dia.year)
+    assert not calendario.dia_util(dia)
+
+
+@pytest.mark.parametrize("dia", [date(2026, 2, 18), date(2026, 4, 2), date(2026, 4, 6), date(2026, 6, 5)])
+def test_dias_uteis_vizinhos_dos_feriados(dia):
+    assert calendario.dia_util(dia)
+
+
+@pytest.mark.parametrize("agora, fase", [
+    ('2026-03-10 09:44:59', 'fechado'),
+    ('2026-03-10 09:45:00', 'pre_abertura'),
+    ('2026-03-10 09:59:59', 'pre_abertura'),
+    ('2026-03-10 10:00:00', 'pregao'),
+    ('2026-03-10 16:59:59', 'pregao'),
+    ('2026-03-10 17:00:00', 'pos_fechamento'),
+    ('2026-03-10 17:59:59', 'pos_fechamento'),
+    ('2026-03-10 18:00:00', 'fechado'),
+    ('2026-03-14 12:00:00', 'fechado'),      # sábado
+    ('2026-02-17 12:00:00', 'fechado'),      # terça de Carnaval
+    ('2026-02-18 10:30:00', 'fechado'),      # Quarta de Cinzas: só à tarde
+    ('2026-02-18 12:45:00', 'pre_abertura'),
+    ('2026-02-18 13:00:00', 'pregao'),
+])
+def test_fases(agora, fase):
+    assert calendario.fase(momento(agora)) == fase
+
+
+def test_fase_em_outro_fuso():
+    # 13:30 UTC = 10:30 em Brasília
+    assert calendario.fase(datetime.fromisoformat('2026-03-10T13:30:00+00:00')) == 'pregao'
+
+
+@pytest.mark.parametrize("agora, proxima", [
+    ('2026-03-10 12:00:00', '2026-03-11 09:45:00'),
+    ('2026-03-10 09:00:00', '2026-03-10 09:45:00'),
+    ('2026-03-13 20:00:00', '2026-03-16 09:45:00'),   # sexta -> segunda
+    ('2026-02-13 20:00:00', '2026-02-18 12:45:00'),   # Carnaval -> Cinzas à tarde
+    ('2026-04-02 19:00:00', '2026-04-06 09:45:00'),   # Sexta-feira Santa
+])
+def test_proxima_abertura(agora, proxima):
+    assert calendario.proxima_abertura(momento(agora)) == momento(proxima)
+
+
+@pytest.mark.parametrize("fase, agora", [('pre_abertura', '2026-03-10 09:50:00'),
+                                         ('pregao', '2026-03-10 12:00:00'),
+                                         ('pos_fechamento', '2026-03-10 17:30:00')])
+@pytest.mark.parametrize("classe", ['cotacao', 'barra_diaria', 'indicador', 'metadados'])
+def test_ttl_nas_fases_de_negociacao(fase, agora, classe):
+    assert calendario.ttl(classe, momento(agora)) == TTLS[fase][classe]
+
+
+@pytest.mark.parametrize("agora, ate_abertura", [
+    ('2026-03-10 20:00:00', timedelta(hours=13, minutes=45)),
+    ('2026-03-14 12:00:00', timedelta(days=1, hours=21, minutes=45)),
+])
+def test_ttl_fora_do_pregao_vai_ate_a_abertura(agora, ate_abertura):
+    segundos = int(ate_abertura.total_seconds())
+    assert calendario.ttl('cotacao', momento(agora)) == segundos
+    assert calendario.ttl('indicador', momento(agora)) == segundos
+    assert calendario.ttl('metadados', momento(agora)) == max(segundos, TTLS['pregao']['metadados'])
+
+
+def test_ttl_minimo_logo_antes_da_abertura():
+    assert calendario.ttl('cotacao', momento('2026-03-10 09:44:50')) == modulo.TTL_MINIMO
+
+
+def test_ttl_usa_agora_sem_momento(monkeypatch):
+    monkeypatch.setattr(CalendarioService, 'agora', staticmethod(lambda: momento('2026-03-10 12:00:00')))
+    assert CalendarioService().ttl('cotacao') == TTLS['pregao']['cotacao']
+    assert CalendarioService().em_negociacao()
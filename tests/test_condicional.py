@@ -0,0 +1,134 @@
+"""
+Respostas Condicionais e Compressão
+ETag/If-None-Match, Last-Modified e o middleware gzip num app mínimo via TestClient
+"""
+
+import gzip
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from app.api import condicional
+from app.services.calendario_service import FUSO_B3, calendario_service
+
+HOJE = datetime(2026, 3, 10, 14, 0, tzinfo=FUSO_B3)
+GRANDE = b"x" * 4096
+PEQUENO = b"{}"
+
+
+def historico(ultima: str) -> pd.DataFrame:
+    return pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.to_datetime(['2026-03-06', ultima]))
+
+
+@pytest.fixture(autouse=True)
+def agora(monkeypatch):
+    monkeypatch.setattr(calendario_service, 'agora', lambda: HOJE)
+
+
+@pytest.fixture
+def cliente():
+    app = FastAPI()
+    app.add_middleware(condicional.CompressaoMiddleware, minimo=1024)
+
+    @app.get("/serie")
+    async def serie(request: Request, ultima: str = '2026-03-09', grande: bool = True):
+        dados = historico(ultima)
+        tag = condicional.etag('serie', ultima, grande)
+        modificacao = condicional.ultima_modificacao(dados)
+        resposta = condicional.nao_modificado(request, tag, modificacao)
+        if resposta is not None:
+            return resposta
+        corpo = GRANDE if grande else PEQUENO
+        return condicional.validadores(Response(corpo, media_type="application/json"), tag, modificacao)
+
+    return TestClient(app)
+
+
+SEM_COMPRESSAO = {'Accept-Encoding': 'identity'}
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def primeira(cliente, **params):
+    return cliente.get("/serie", params=params, headers=SEM_COMPRESSAO)
+
+
+@pytest.mark.parametrize("forma", ['{}', 'W/{}', '{}-gzip', 'W/{}-br', '"outra", {}'])
+def test_304_com_if_none_match(cliente, forma):
+    tag = primeira(cliente).headers['ETag']
+    sufixos = {'{}-gzip': tag[:-1] + '-gzip"', 'W/{}-br': 'W/' + tag[:-1] + '-br"'}
+    valor = sufixos.get(forma) or forma.format(tag)
+    resposta = cliente.get("/serie", headers={**SEM_COMPRESSAO, 'If-None-Match': valor})
+    assert resposta.status_code == 304
+    assert resposta.headers['ETag'] == tag
+    assert resposta.content == b""
+
+
+def test_etag_diferente_monta_a_resposta(cliente):
+    resposta = cliente.get("/serie", headers={**SEM_COMPRESSAO, 'If-None-Match': '"velha"'})
+    assert resposta.status_code == 200 and resposta.content == GRANDE
+
+
+def test_if_modified_since_ignorado_com_if_none_match(cliente):
+    modificado = primeira(cliente).headers['Last-Modified']
+    # Data em dia, mas a ETag não bate: vale o If-None-Match
+    resposta = cliente.get("/serie", headers={
+        **SEM_COMPRESSAO, 'If-None-Match': '"velha"', 'If-Modified-Since': modificado,
+    })
+    assert resposta.status_code == 200
+    # Sem If-None-Match, a mesma data dá 304
+    resposta = cliente.get("/serie", headers={**SEM_COMPRESSAO, 'If-Modified-Since': modificado})
+    assert resposta.status_code == 304
+
+
+def test_if_modified_since_anterior_monta_a_resposta(cliente):
+    anterior = (HOJE - timedelta(days=7)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    resposta = cliente.get("/serie", headers={**SEM_COMPRESSAO, 'If-Modified-Since': anterior})
+    assert resposta.status_code == 200
+
+
+def test_barra_em_formacao_sem_last_modified(cliente):
+    fechada = primeira(cliente)
+    assert fechada.headers['Last-Modified'] == 'Mon, 09 Mar 2026 03:00:00 GMT'
+    em_formacao = primeira(cliente, ultima='2026-03-10')
+    assert 'Last-Modified' not in em_formacao.headers
+    # Sem validador de data, If-Modified-Since sozinho não gera 304
+    resposta = cliente.get("/serie", params={'ultima': '2026-03-10'},
+                           headers={**SEM_COMPRESSAO, 'If-Modified-Since': fechada.headers['Last-Modified']})
+    assert resposta.status_code == 200
+
+
+def test_ultima_modificacao_so_no_diario():
+    assert condicional.ultima_modificacao(historico('2026-03-09'), '1wk') is None
+    assert condicional.ultima_modificacao(pd.DataFrame()) is None
+
+
+def test_corpo_pequeno_nao_e_comprimido(cliente):
+    resposta = cliente.get("/serie", params={'grande': False}, headers=GZIP)
+    assert 'Content-Encoding' not in resposta.headers
+    assert not resposta.headers['ETag'].endswith('-gzip"')
+    assert resposta.content == PEQUENO
+
+
+def test_resposta_comprimida(cliente):
+    tag = primeira(cliente).headers['ETag']
+    resposta = cliente.get("/serie", headers=GZIP)
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert resposta.headers['ETag'] == tag[:-1] + '-gzip"'
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    assert 'Accept' in [v.strip() for v in resposta.headers['Vary'].split(',')]
+    assert resposta.content == GRANDE  # o httpx descomprime
+    assert int(resposta.headers['Content-Length']) == len(gzip.compress(GRANDE, mtime=0))
+
+
+def test_304_devolve_a_etag_com_sufixo(cliente):
+    sufixada = cliente.get("/serie", headers=GZIP).headers['ETag']
+    resposta = cliente.get("/serie", headers={**GZIP, 'If-None-Match': sufixada})
+    assert resposta.status_code == 304
+    assert resposta.headers['ETag'] == sufixada
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    assert 'Content-Encoding' not in resposta.headers
@@ -0,0 +1,109 @@
+"""
+Cursor de Sincronização
+Parâmetro desde em /api/b3/acao e /api/b3/ibovespa: validação, recorte e a barra em formação
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api import main
+from app.services import indicadores_registro
+from app.services.b3_async_service import b3_async_service
+from app.services.calendario_service import FUSO_B3, calendario_service
+
+from .dados import ohlcv
+
+# Quarta-feira, 11/03/2026, durante o pregão
+AGORA = datetime(2026, 3, 11, 14, 0, tzinfo=FUSO_B3)
+
+
+def historico(ultima: str, n: int = 60) -> pd.DataFrame:
+    dados = ohlcv(n)
+    dados.index = pd.bdate_range(end=ultima, periods=n)
+    return dados
+
+
+@pytest.fixture
+def ultima(monkeypatch):
+    """Data da última barra servida pelos stubs (terça = fechada, quarta = em formação)"""
+    estado = {'ultima': '2026-03-10'}
+    monkeypatch.setattr(calendario_service, 'agora', lambda: AGORA)
+
+    async def buscar_dados_acao(ticker, periodo='1y', indicadores=None, intervalo='1d'):
+        return indicadores_registro.calcular(historico(estado['ultima']), indicadores)
+
+    async def buscar_info_acao(ticker):
+        return {'ticker': ticker}
+
+    async def buscar_ibovespa(periodo='1y'):
+        return historico(estado['ultima'])
+
+    monkeypatch.setattr(b3_async_service, 'buscar_dados_acao', buscar_dados_acao)
+    monkeypatch.setattr(b3_async_service, 'buscar_info_acao', buscar_info_acao)
+    monkeypatch.setattr(b3_async_service, 'buscar_ibovespa', buscar_ibovespa)
+    return estado
+
+
+@pytest.fixture
+def cliente():
+    return TestClient(main.app)
+
+
+def datas(resposta):
+    return [registro['data'] for registro in resposta.json()['dados']]
+
+
+@pytest.mark.parametrize("desde", ['ontem', '2026-13-01', '2026-02-30', ''])
+@pytest.mark.parametrize("caminho", ['/api/b3/acao/AAAA3', '/api/b3/ibovespa'])
+def test_cursor_invalido_e_400_antes_do_304(cliente, ultima, caminho, desde):
+    resposta = cliente.get(caminho, params={'desde': desde}, headers={'If-None-Match': '*'})
+    assert resposta.status_code == 400
+
+
+@pytest.mark.parametrize("caminho", ['/api/b3/acao/AAAA3', '/api/b3/ibovespa'])
+def test_cursor_na_ultima_barra_fechada_nao_traz_nada(cliente, ultima, caminho):
+    resposta = cliente.get(caminho, params={'desde': '2026-03-10'})
+    assert resposta.status_code == 200
+    assert datas(resposta) == []
+    assert resposta.json()['cursor'] == '2026-03-10'
+
+
+@pytest.mark.parametrize("caminho", ['/api/b3/acao/AAAA3', '/api/b3/ibovespa'])
+def test_barra_em_formacao_volta_sempre(cliente, ultima, caminho):
+    ultima['ultima'] = '2026-03-11'
+    assert datas(cliente.get(caminho, params={'desde': '2026-03-11'})) == ['2026-03-11']
+    assert datas(cliente.get(caminho, params={'desde': '2026-03-09'})) == ['2026-03-10', '2026-03-11']
+
+
+@pytest.mark.parametrize("caminho", ['/api/b3/acao/AAAA3', '/api/b3/ibovespa'])
+def test_cursor_anterior_a_janela_traz_tudo(cliente, ultima, caminho):
+    completo = cliente.get(caminho)
+    delta = cliente.get(caminho, params={'desde': '2001-01-01'})
+    assert datas(delta) == datas(completo)
+    assert len(datas(delta)) == 60
+
+
+def test_cursor_em_dia_sem_pregao(cliente, ultima):
+    # Sábado: as barras a partir da segunda seguinte
+    resposta = cliente.get('/api/b3/acao/AAAA3', params={'desde': '2026-03-07'})
+    assert datas(resposta) == ['2026-03-09', '2026-03-10']
+    assert resposta.json()['total_barras'] == 2
+
+
+def test_delta_com_os_indicadores_do_historico_completo(cliente, ultima):
+    completo = cliente.get('/api/b3/acao/AAAA3').json()['dados']
+    delta = cliente.get('/api/b3/acao/AAAA3', params={'desde': '2026-03-06'}).json()['dados']
+    assert delta == completo[-2:]
+
+
+def test_cursor_aceita_data_com_horario_e_fuso():
+    dados = historico('2026-03-10').tz_localize(FUSO_B3)
+    inicio = main._cursor('2026-03-06T15:30:00-03:00')
+    assert main._a_partir(dados, inicio).index.strftime('%Y-%m-%d').tolist() == ['2026-03-09', '2026-03-10']
+    assert main._cursor(None) is None
+    with pytest.raises(HTTPException):
+        main._cursor('NaT')
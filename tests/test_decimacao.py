@@ -0,0 +1,112 @@
+"""
+Decimação de Séries
+LTTB (tabela e balde a balde) contra o laço de referência e candles agregados contra o agrupamento direto
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import decimacao
+
+from .dados import ohlcv
+
+
+def lttb_referencia(valores, pontos):
+    """LTTB ingênuo: um balde por vez, um ponto por vez"""
+    n = len(valores)
+    inicios = decimacao.baldes(n - 1, pontos - 2, inicio=1).tolist()
+    fins = inicios[1:] + [n - 1]
+    escolhidos = [0]
+    for balde, (ini, fim) in enumerate(zip(inicios, fins)):
+        if balde + 1 < len(inicios):
+            proximo = range(inicios[balde + 1], fins[balde + 1])
+            validos = [valores[i] for i in proximo if np.isfinite(valores[i])]
+            cx = sum(proximo) / len(proximo)
+            cy = sum(validos) / len(validos) if validos else np.nan
+        else:
+            cx, cy = n - 1, valores[-1]
+        ax, ay = escolhidos[-1], valores[escolhidos[-1]]
+        melhor, maior = ini, -np.inf
+        for i in range(ini, fim):
+            area = abs((ax - cx) * (valores[i] - ay) - (ax - i) * (cy - ay))
+            if np.isnan(area):
+                area = -1.0
+            if area > maior:
+                melhor, maior = i, area
+        escolhidos.append(melhor)
+    return escolhidos + [n - 1]
+
+
+def serie(n, semente=0, lacunas=False):
+    return ohlcv(n, lacunas, semente)['Close'].to_numpy()
+
+
+@pytest.fixture(params=['tabela', 'por_balde'])
+def caminho(request, monkeypatch):
+    # Limite 0 força o laço por balde; o padrão cobre a tabela nesses tamanhos
+    if request.param == 'por_balde':
+        monkeypatch.setattr(decimacao, 'LIMITE_TABELA_LTTB', 0)
+    return request.param
+
+
+@pytest.mark.parametrize("n, pontos", [(10, 3), (500, 50), (1000, 97), (2000, 500)])
+@pytest.mark.parametrize("lacunas", [False, True])
+def test_lttb_igual_a_referencia(caminho, n, pontos, lacunas):
+    valores = serie(n, semente=n, lacunas=lacunas)
+    assert decimacao.lttb(valores, pontos).tolist() == lttb_referencia(valores, pontos)
+
+
+def test_lttb_usa_o_laco_por_balde_em_baldes_largos():
+    valores = 30 + np.random.default_rng(1).standard_normal(100_000).cumsum()
+    pontos = 10
+    largura = -(-(len(valores) - 2) // (pontos - 2))
+    assert (pontos - 2) * largura * largura > decimacao.LIMITE_TABELA_LTTB
+    assert decimacao.lttb(valores, pontos).tolist() == lttb_referencia(valores, pontos)
+
+
+@pytest.mark.parametrize("pontos", [3, 7, 120])
+def test_lttb_mantem_primeiro_e_ultimo(caminho, pontos):
+    selecionados = decimacao.lttb(serie(365, semente=2), pontos)
+    assert len(selecionados) == pontos
+    assert selecionados[0] == 0 and selecionados[-1] == 364
+    assert (np.diff(selecionados) > 0).all()
+
+
+@pytest.mark.parametrize("pontos", [100, 101, 500])
+def test_lttb_serie_que_ja_cabe_fica_inteira(pontos):
+    assert decimacao.lttb(serie(100), pontos).tolist() == list(range(100))
+
+
+def test_lttb_com_nan_nas_pontas_e_baldes_vazios(caminho):
+    valores = serie(300, semente=3)
+    valores[0] = valores[-1] = np.nan
+    valores[100:140] = np.nan  # baldes inteiros sem preço
+    selecionados = decimacao.lttb(valores, 30)
+    assert selecionados.tolist() == lttb_referencia(valores, 30)
+    assert selecionados[0] == 0 and selecionados[-1] == 299
+
+
+@pytest.mark.parametrize("n, pontos", [(100, 7), (253, 60), (1000, 999)])
+def test_velas_agrega_cada_balde(n, pontos):
+    dados = ohlcv(n, lacunas=True, semente=4)
+    dados['RSI'] = np.arange(n, dtype=float)
+    resultado = decimacao.velas(dados, pontos)
+
+    grupos = np.repeat(np.arange(pontos), np.diff(np.append(decimacao.baldes(n, pontos), n)))
+    agrupado = dados.groupby(grupos)
+    assert len(resultado) == pontos
+    assert (resultado.index == agrupado.apply(lambda g: g.index[0])).all()
+    np.testing.assert_array_equal(resultado['Open'], agrupado['Open'].first(skipna=False))
+    np.testing.assert_array_equal(resultado['Close'], agrupado['Close'].last(skipna=False))
+    np.testing.assert_array_equal(resultado['High'], agrupado['High'].max())
+    np.testing.assert_array_equal(resultado['Low'], agrupado['Low'].min())
+    np.testing.assert_array_equal(resultado['Volume'], agrupado['Volume'].sum())
+    np.testing.assert_array_equal(resultado['RSI'], agrupado['RSI'].last())
+
+
+def test_velas_serie_que_ja_cabe_fica_inteira():
+    dados = ohlcv(50)
+    assert decimacao.velas(dados, 50) is dados
+    assert decimacao.velas(dados, 80) is dados
+    assert decimacao.velas(pd.DataFrame(), 10).empty
@@ -0,0 +1,136 @@
+"""
+Executor Compartilhado de Buscas
+Limite de concorrência em executar()/executar_async() chamados de fora do pool
+"""
+
+import asyncio
+import threading
+import time
+
+from app.services.fetch_executor_service import FetchExecutorService
+
+# Rate limit que nunca espera: só o limite de concorrência está em teste
+SEM_RATE_LIMIT = {'yahoo': (1e9, 1000)}
+
+
+class Contador:
+    """Quantas chamadas estão em andamento ao mesmo tempo (e o pico)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ativas = 0
+        self.pico = 0
+
+    def entrar(self):
+        with self._lock:
+            self.ativas += 1
+            self.pico = max(self.pico, self.ativas)
+
+    def sair(self):
+        with self._lock:
+            self.ativas -= 1
+
+
+def test_executar_respeita_o_limite_entre_threads():
+    executor = FetchExecutorService(max_concorrencia=3, limites=SEM_RATE_LIMIT)
+    contador = Contador()
+
+    def buscar():
+        contador.entrar()
+        time.sleep(0.02)
+        contador.sair()
+
+    threads = [threading.Thread(target=executor.executar, args=(buscar,)) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert contador.pico == 3
+    executor.encerrar()
+
+
+def test_executar_aninhado_nao_trava():
+    executor = FetchExecutorService(max_concorrencia=1, limites=SEM_RATE_LIMIT)
+    assert executor.executar(lambda: executor.executar(lambda: 42)) == 42
+    executor.encerrar()
+
+
+def test_executar_async_respeita_o_limite():
+    executor = FetchExecutorService(max_concorrencia=2, limites=SEM_RATE_LIMIT)
+    contador = Contador()
+
+    async def buscar():
+        contador.entrar()
+        await asyncio.sleep(0.01)
+        contador.sair()
+
+    async def principal():
+        await asyncio.gather(*(executor.executar_async(buscar) for _ in range(10)))
+
+    asyncio.run(principal())
+    # Outro event loop usa o mesmo orçamento sem falhar
+    asyncio.run(principal())
+    assert contador.pico == 2
+    executor.encerrar()
+
+
+def test_sync_e_async_dividem_o_mesmo_limite():
+    executor = FetchExecutorService(max_concorrencia=3, limites=SEM_RATE_LIMIT)
+    contador = Contador()
+
+    def buscar():
+        contador.entrar()
+        time.sleep(0.02)
+        contador.sair()
+
+    async def buscar_async():
+        contador.entrar()
+        await asyncio.sleep(0.02)
+        contador.sair()
+
+    async def principal():
+        await asyncio.gather(*(executor.executar_async(buscar_async) for _ in range(12)))
+
+    threads = [threading.Thread(target=executor.executar, args=(buscar,)) for _ in range(12)]
+    threads.append(threading.Thread(target=asyncio.run, args=(principal(),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert contador.pico == 3
+    executor.encerrar()
+
+
+def test_cancelamento_nao_prende_vaga():
+    executor = FetchExecutorService(max_concorrencia=1, limites=SEM_RATE_LIMIT)
+
+    async def principal():
+        lenta = asyncio.create_task(executor.executar_async(asyncio.sleep, 1))
+        esperando = asyncio.create_task(executor.executar_async(asyncio.sleep, 0))
+        await asyncio.sleep(0.02)
+        lenta.cancel()
+        esperando.cancel()
+        await asyncio.gather(lenta, esperando, return_exceptions=True)
+        return await executor.executar_async(asyncio.sleep, 0, 'ok')
+
+    assert asyncio.run(principal()) == 'ok'
+    assert executor.executar(lambda: 'ok') == 'ok'
+    executor.encerrar()
+
+
+def test_vaga_liberada_apos_falhas():
+    executor = FetchExecutorService(max_concorrencia=1, limites=SEM_RATE_LIMIT, tentativas=2, espera_base=0)
+    chamadas = []
+
+    def falhar():
+        chamadas.append(1)
+        raise RuntimeError("provedor fora do ar")
+
+    for _ in range(2):
+        try:
+            executor.executar(falhar)
+        except RuntimeError:
+            pass
+    assert len(chamadas) == 4
+    assert executor.executar(lambda: 'ok') == 'ok'
+    executor.encerrar()
@@ -0,0 +1,78 @@
+"""
+Frame Compacto
+Perda de precisão do float32 nos indicadores expostos e ida e volta do frame
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api import serializacao
+from app.services import indicadores_registro
+from app.services.frame_compacto import FrameCompacto, arredondar_float32
+
+from .dados import ohlcv
+
+# Erro máximo por coluna, relativo à maior magnitude da coluna (OBV/AD/MACD
+# cruzam o zero, então o erro relativo ponto a ponto não é limitado): meio ulp
+# do float32 no armazenamento e até meio ulp no decimal mais curto, 2^-22
+LIMITES = {
+    'Open': 2.5e-7, 'High': 2.5e-7, 'Low': 2.5e-7, 'Close': 2.5e-7,
+    'SMA_20': 2.5e-7, 'SMA_50': 2.5e-7, 'SMA_200': 2.5e-7,
+    'BB_Upper': 2.5e-7, 'BB_Middle': 2.5e-7, 'BB_Lower': 2.5e-7,
+    'RSI': 2.5e-7, 'MACD': 2.5e-7, 'Signal': 2.5e-7, 'MACD_Histogram': 2.5e-7,
+    'OBV': 2.5e-7, 'AD': 2.5e-7, 'VWAP': 2.5e-7, 'MFI': 2.5e-7, 'ADX': 2.5e-7,
+}
+
+
+@pytest.fixture(scope="module")
+def frame():
+    dados = ohlcv(1500)
+    dados.index = dados.index.tz_localize('America/Sao_Paulo')
+    return indicadores_registro.calcular(dados, indicadores_registro.todas_colunas())
+
+
+@pytest.fixture(scope="module")
+def reconstruido(frame):
+    return FrameCompacto.de_frame(frame).para_frame()
+
+
+def test_ida_e_volta_preserva_estrutura(frame, reconstruido):
+    assert list(reconstruido.columns) == list(frame.columns)
+    pd.testing.assert_index_equal(reconstruido.index, frame.index)
+    for coluna in ['Doji', 'Martelo', 'Engolfo_Alta', 'Engolfo_Baixa']:
+        np.testing.assert_array_equal(reconstruido[coluna], frame[coluna])
+    np.testing.assert_array_equal(reconstruido['Volume'], frame['Volume'])
+
+
+@pytest.mark.parametrize("coluna", sorted(LIMITES))
+def test_erro_float32_limitado(frame, reconstruido, coluna):
+    original = frame[coluna].to_numpy(dtype=float)
+    volta = reconstruido[coluna].to_numpy(dtype=float)
+    np.testing.assert_array_equal(np.isnan(volta), np.isnan(original))
+    escala = np.nanmax(np.abs(original))
+    assert np.nanmax(np.abs(volta - original)) <= LIMITES[coluna] * escala
+
+
+def test_precos_com_centavos_voltam_exatos(frame, reconstruido):
+    # Preços com centavos voltam como o mesmo decimal, sem o ruído do float32
+    np.testing.assert_array_equal(reconstruido['Close'], np.round(frame['Close'], 2))
+
+
+def test_json_sem_ruido_do_float32(reconstruido):
+    colunas = serializacao.colunas(reconstruido.iloc[-50:], serializacao.CAMPOS_ACAO)
+    for campo in ('fechamento', 'sma_20', 'rsi'):
+        for valor in serializacao.lista(colunas[campo]):
+            assert valor is None or len(repr(valor).replace('-', '').replace('.', '').lstrip('0')) <= 8
+
+
+def test_arredondar_float32_casos_limite():
+    valores = np.array([35.47, 0.0, np.nan, np.inf, -12.34, 1e-9, 3.2e9, 11878685.0], dtype=np.float32)
+    np.testing.assert_array_equal(
+        arredondar_float32(valores), [35.47, 0.0, np.nan, np.inf, -12.34, 1e-9, 3.2e9, 11878685.0]
+    )
+    aleatorios = np.random.default_rng(0).lognormal(0, 8, 10_000).astype(np.float32)
+    volta = arredondar_float32(aleatorios)
+    np.testing.assert_array_equal(volta.astype(np.float32), aleatorios)
+    # Mesmo decimal que o repr do numpy escolhe para o float32
+    np.testing.assert_array_equal(volta, [float(str(v)) for v in aleatorios])
@@ -0,0 +1,168 @@
+"""
+Histórico Local (Parquet)
+Download completo, atualização incremental com sobreposição, reajuste retroativo, índice em disco e recortes
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from app.services import b3_data_service
+from app.services.b3_data_service import b3_service
+from app.services.calendario_service import FUSO_B3, calendario_service
+from app.services.historico_service import BARRAS_SOBREPOSICAO, HistoricoService
+
+from .dados import ohlcv
+
+TICKER = 'TEST3.SA'
+
+
+class Provedor:
+    """Substitui yf.Ticker: histórico 'do Yahoo' que o teste altera entre as chamadas"""
+
+    def __init__(self):
+        self.dados = ohlcv(300, semente=11)[['Open', 'High', 'Low', 'Close', 'Volume']]
+        self.chamadas = []
+        self.falhar = False
+
+    def Ticker(self, ticker):
+        provedor = self
+
+        class Ticker:
+            def history(self, period=None, start=None):
+                provedor.chamadas.append({'period': period} if period else {'start': start})
+                if provedor.falhar:
+                    raise ConnectionError("sem rede")
+                if start is not None:
+                    return provedor.dados.loc[start:].copy()
+                return provedor.dados.copy()
+        return Ticker()
+
+    def nova_barra(self, fechamento=None):
+        ultima = self.dados.iloc[-1].copy()
+        if fechamento is not None:
+            ultima['Close'] = fechamento
+        self.dados.loc[self.dados.index[-1] + pd.offsets.BDay()] = ultima
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    estado = {'agora': datetime(2026, 3, 10, 12, 0, tzinfo=FUSO_B3)}
+    monkeypatch.setattr(calendario_service, 'agora', lambda: estado['agora'])
+    return estado
+
+
+@pytest.fixture
+def provedor(monkeypatch):
+    provedor = Provedor()
+    monkeypatch.setattr(b3_data_service.yf, 'Ticker', provedor.Ticker)
+    return provedor
+
+
+@pytest.fixture
+def servico(tmp_path, relogio):
+    return HistoricoService(tmp_path)
+
+
+def obter(servico, periodo='2y'):
+    return servico.obter(TICKER, periodo, b3_service.baixador(TICKER))
+
+
+def expirar(relogio):
+    relogio['agora'] += timedelta(hours=1)
+
+
+def test_primeira_busca_grava_o_parquet_e_o_indice(servico, provedor):
+    dados = obter(servico)
+    assert provedor.chamadas == [{'period': '2y'}]
+    pd.testing.assert_frame_equal(dados, provedor.dados)
+    pd.testing.assert_frame_equal(servico.ler(TICKER), provedor.dados, check_freq=False)
+    assert servico._indice[TICKER]['periodo'] == '2y'
+
+
+def test_dentro_da_validade_nao_baixa(servico, provedor):
+    obter(servico)
+    provedor.nova_barra()
+    assert len(obter(servico)) == 300
+    assert len(provedor.chamadas) == 1
+    assert servico.pendencia(TICKER, '2y') is None
+
+
+def test_atualizacao_incremental_com_sobreposicao(servico, provedor, relogio):
+    obter(servico)
+    gravado = provedor.dados.copy()
+    # Barra do dia revista (a última sobreposta) e duas barras novas
+    provedor.dados.iloc[-1, provedor.dados.columns.get_loc('Close')] *= 1.03
+    provedor.nova_barra()
+    provedor.nova_barra()
+    expirar(relogio)
+
+    inicio = gravado.index[-BARRAS_SOBREPOSICAO].strftime('%Y-%m-%d')
+    assert servico.pendencia(TICKER, '2y') == {'start': inicio}
+    dados = obter(servico)
+
+    assert provedor.chamadas == [{'period': '2y'}, {'start': inicio}]
+    pd.testing.assert_frame_equal(dados, provedor.dados, check_freq=False)
+    pd.testing.assert_frame_equal(servico.ler(TICKER), provedor.dados, check_freq=False)
+    assert servico._indice[TICKER]['inicio_incremental'] == dados.index[-BARRAS_SOBREPOSICAO].strftime('%Y-%m-%d')
+
+
+def test_reajuste_retroativo_rebaixa_tudo(servico, provedor, relogio):
+    obter(servico)
+    # Dividendo: o provedor reajusta todo o histórico
+    provedor.dados[['Open', 'High', 'Low', 'Close']] *= 0.98
+    provedor.nova_barra()
+    expirar(relogio)
+
+    dados = obter(servico)
+    assert provedor.chamadas[1:] == [{'start': provedor.dados.index[-BARRAS_SOBREPOSICAO - 1].strftime('%Y-%m-%d')},
+                                     {'period': '2y'}]
+    pd.testing.assert_frame_equal(dados, provedor.dados)
+    pd.testing.assert_frame_equal(servico.ler(TICKER), provedor.dados, check_freq=False)
+
+
+def test_falha_na_atualizacao_mantem_o_gravado(servico, provedor, relogio):
+    gravado = obter(servico)
+    provedor.falhar = True
+    expirar(relogio)
+    pd.testing.assert_frame_equal(obter(servico), gravado, check_freq=False)
+
+
+def test_indice_sobrevive_ao_reinicio(tmp_path, servico, provedor, relogio):
+    obter(servico)
+    reiniciado = HistoricoService(tmp_path)
+    assert reiniciado._indice == servico._indice
+    # Ainda válido: nada a baixar depois do reinício
+    pd.testing.assert_frame_equal(obter(reiniciado), provedor.dados, check_freq=False)
+    assert len(provedor.chamadas) == 1
+
+    expirar(relogio)
+    assert reiniciado.pendencia(TICKER, '2y') == {'start': servico._indice[TICKER]['inicio_incremental']}
+
+
+def test_periodo_maior_que_o_gravado_baixa_completo(servico, provedor):
+    obter(servico, '1y')
+    obter(servico, '6mo')
+    assert provedor.chamadas == [{'period': '1y'}]
+    assert servico.pendencia(TICKER, '5y') == {'period': '5y'}
+    obter(servico, '5y')
+    assert provedor.chamadas == [{'period': '1y'}, {'period': '5y'}]
+    assert servico._indice[TICKER]['periodo'] == '5y'
+
+
+@pytest.mark.parametrize("periodo, barras", [('1d', 1), ('5d', 5), ('max', 600)])
+def test_fatiar_em_pregoes(periodo, barras):
+    assert len(HistoricoService.fatiar(ohlcv(600), periodo)) == barras
+
+
+@pytest.mark.parametrize("periodo, offset", [('1mo', pd.DateOffset(months=1)), ('3mo', pd.DateOffset(months=3)),
+                                             ('1y', pd.DateOffset(years=1)), ('2y', pd.DateOffset(years=2))])
+def test_fatiar_por_calendario(periodo, offset):
+    dados = ohlcv(600)
+    dados.index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=600)
+    recorte = HistoricoService.fatiar(dados, periodo)
+    inicio = pd.Timestamp.now().normalize() - offset
+    assert recorte.index[0] >= inicio
+    assert len(recorte) == (dados.index >= inicio).sum()
+    assert recorte.index[-1] == dados.index[-1]
@@ -0,0 +1,132 @@
+"""
+Indicadores Incrementais
+Barra a barra contra o registro de indicadores, retomada do estado serializado e serviço em tempo real
+"""
+
+import json
+
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose
+
+from app.services import indicadores_registro
+from app.services.indicadores_incrementais import IndicadoresIncrementais, restaurar
+from app.services.indicadores_tempo_real_service import IndicadoresTempoRealService
+from app.services.indicadores_universo_service import MatrizUniverso
+
+from .dados import ohlcv
+
+COLUNAS = ['SMA_20', 'SMA_50', 'SMA_200', 'MACD', 'Signal', 'MACD_Histogram',
+           'BB_Upper', 'BB_Middle', 'BB_Lower', 'OBV', 'AD', 'ADX',
+           'RSI', 'Volatility', 'Volume_SMA', 'VWAP', 'MFI', 'Force_Index', 'ROC', 'Momentum']
+
+
+def barra_a_barra(dados: pd.DataFrame, estado=None) -> pd.DataFrame:
+    estado = estado or IndicadoresIncrementais()
+    linhas = [estado.atualizar(barra._asdict())
+              for barra in dados[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)]
+    return pd.DataFrame(linhas, index=dados.index)
+
+
+@pytest.mark.filterwarnings("ignore:The default fill_method")
+@pytest.mark.parametrize("n, lacunas", [(15, False), (300, False), (300, True)])
+@pytest.mark.parametrize("coluna", COLUNAS)
+def test_barra_a_barra_igual_ao_registro(n, lacunas, coluna):
+    dados = ohlcv(n, lacunas, semente=3)
+    esperado = indicadores_registro.calcular(dados, [coluna])[coluna]
+    assert_allclose(barra_a_barra(dados)[coluna], esperado, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("lacunas", [False, True])
+def test_retomar_do_estado_serializado_nao_perde_nada(lacunas):
+    dados = ohlcv(300, lacunas, semente=4)
+    continuo = barra_a_barra(dados)
+
+    estado = IndicadoresIncrementais()
+    barra_a_barra(dados.iloc[:180], estado)
+    retomado = restaurar(json.loads(json.dumps(estado.para_dict())))
+    assert json.dumps(retomado.para_dict()) == json.dumps(estado.para_dict())
+    pd.testing.assert_frame_equal(barra_a_barra(dados.iloc[180:], retomado), continuo.iloc[180:])
+
+
+def test_barra_em_formacao_revista_apos_retomar():
+    dados = ohlcv(120, semente=5)
+    final = barra_a_barra(dados).iloc[-1].to_dict()
+
+    estado = IndicadoresIncrementais()
+    barra_a_barra(dados.iloc[:-1], estado)
+    parcial = dados.iloc[-1].to_dict()
+    estado.atualizar({**parcial, 'Close': parcial['Close'] * 0.9, 'Volume': parcial['Volume'] / 3}, em_formacao=True)
+
+    retomado = restaurar(json.loads(json.dumps(estado.para_dict())))
+    pd.testing.assert_series_equal(pd.Series(retomado.substituir_ultima(parcial, em_formacao=False)),
+                                   pd.Series(final))
+    with pytest.raises(ValueError):
+        retomado.substituir_ultima(parcial)
+
+
+# ============= Serviço em tempo real =============
+
+def matriz(historicos):
+    return MatrizUniverso.alinhar(historicos)
+
+
+def cotacoes(historicos, posicao):
+    return pd.DataFrame(
+        [{'data': dados.index[posicao], **dados.iloc[posicao][['Open', 'High', 'Low', 'Close', 'Volume']]}
+         for dados in historicos.values()],
+        index=list(historicos),
+    )
+
+
+def test_servico_avanca_com_cotacoes_igual_ao_registro():
+    completos = {'AAAA3.SA': ohlcv(260, semente=6), 'BBBB4.SA': ohlcv(260, semente=7)}
+    historicos = {t: d.iloc[:-2] for t, d in completos.items()}
+    servico = IndicadoresTempoRealService()
+    m = matriz(historicos)
+    servico.aquecer(m.tickers, m.datas, m.precos)
+
+    # Cotação parcial do pregão seguinte, revista e depois um pregão novo
+    parcial = cotacoes(completos, -2)
+    parcial['Close'] *= 1.02
+    servico.atualizar(parcial)
+    servico.atualizar(cotacoes(completos, -2))
+    servico.atualizar(cotacoes(completos, -1))
+
+    for ticker, dados in completos.items():
+        esperado = indicadores_registro.calcular(dados, COLUNAS).iloc[-1]
+        valores = servico.valores(ticker)
+        assert_allclose([valores[c] for c in COLUNAS], esperado[COLUNAS].to_numpy(float), rtol=1e-9)
+
+
+def test_servico_sincroniza_com_historico_mais_novo():
+    completos = {'AAAA3.SA': ohlcv(260, semente=8)}
+    servico = IndicadoresTempoRealService()
+    m = matriz({t: d.iloc[:-5] for t, d in completos.items()})
+    servico.aquecer(m.tickers, m.datas, m.precos)
+    m = matriz(completos)
+    servico.aquecer(m.tickers, m.datas, m.precos)
+
+    esperado = indicadores_registro.calcular(completos['AAAA3.SA'], COLUNAS).iloc[-1]
+    valores = servico.valores('AAAA3.SA')
+    assert_allclose([valores[c] for c in COLUNAS], esperado[COLUNAS].to_numpy(float), rtol=1e-9)
+
+
+def test_servico_publica_cruzamento_do_macd():
+    dados = ohlcv(100, semente=9)
+    servico = IndicadoresTempoRealService()
+    m = matriz({'AAAA3.SA': dados})
+    servico.aquecer(m.tickers, m.datas, m.precos)
+    zona = 'alta' if servico.valores('AAAA3.SA')['MACD'] > servico.valores('AAAA3.SA')['Signal'] else 'baixa'
+
+    # Fechamento bem longe do atual na direção oposta força o cruzamento
+    ultima = dados.iloc[-1]
+    fechamento = ultima['Close'] * (0.3 if zona == 'alta' else 1.7)
+    sinais = servico.atualizar(pd.DataFrame(
+        [{'data': dados.index[-1] + pd.offsets.BDay(), 'Open': ultima['Close'], 'High': max(ultima['Close'], fechamento),
+          'Low': min(ultima['Close'], fechamento), 'Close': fechamento, 'Volume': ultima['Volume']}],
+        index=['AAAA3.SA'],
+    ))
+    macd = [s for s in sinais if s['indicador'] == 'MACD']
+    assert len(macd) == 1 and macd[0]['zona'] != zona and macd[0]['ticker'] == 'AAAA3'
+    assert servico.eventos_desde(0) == sinais
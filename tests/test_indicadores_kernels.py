@@ -0,0 +1,148 @@
+"""
+Kernels de Indicadores
+Equivalência dos kernels vetorizados com as implementações em loop que eles substituíram
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose
+
+from app.services import indicadores_kernels
+from app.services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+
+from .dados import ohlcv
+
+TAMANHOS = [1, 2, 14, 15, 300]
+
+
+# ============= Implementações de referência (versões em loop anteriores) =============
+
+def obv_referencia(dados: pd.DataFrame) -> pd.Series:
+    obv = pd.Series(index=dados.index, dtype=float)
+    obv.iloc[0] = dados['Volume'].iloc[0]
+
+    for i in range(1, len(dados)):
+        if dados['Close'].iloc[i] > dados['Close'].iloc[i-1]:
+            obv.iloc[i] = obv.iloc[i-1] + dados['Volume'].iloc[i]
+        elif dados['Close'].iloc[i] < dados['Close'].iloc[i-1]:
+            obv.iloc[i] = obv.iloc[i-1] - dados['Volume'].iloc[i]
+        else:
+            obv.iloc[i] = obv.iloc[i-1]
+
+    return obv
+
+
+def mfi_referencia(dados: pd.DataFrame, periodo: int = 14) -> pd.Series:
+    typical_price = (dados['High'] + dados['Low'] + dados['Close']) / 3
+    money_flow = typical_price * dados['Volume']
+
+    # 0.0 em vez de 0: o original dependia do upcast de int para float na atribuição
+    positive_flow = pd.Series(0.0, index=dados.index)
+    negative_flow = pd.Series(0.0, index=dados.index)
+
+    for i in range(1, len(dados)):
+        if typical_price.iloc[i] > typical_price.iloc[i-1]:
+            positive_flow.iloc[i] = money_flow.iloc[i]
+        elif typical_price.iloc[i] < typical_price.iloc[i-1]:
+            negative_flow.iloc[i] = money_flow.iloc[i]
+
+    positive_mf = positive_flow.rolling(window=periodo).sum()
+    negative_mf = negative_flow.rolling(window=periodo).sum()
+
+    return 100 - (100 / (1 + (positive_mf / negative_mf)))
+
+
+def volume_profile_referencia(dados: pd.DataFrame, bins: int = 20) -> np.ndarray:
+    price_min = dados['Low'].min()
+    price_max = dados['High'].max()
+
+    price_bins = np.linspace(price_min, price_max, bins + 1)
+    volume_at_price = np.zeros(bins)
+
+    for _, row in dados.iterrows():
+        typical_price = (row['High'] + row['Low'] + row['Close']) / 3
+        bin_idx = np.digitize(typical_price, price_bins) - 1
+        if 0 <= bin_idx < bins:
+            volume_at_price[bin_idx] += row['Volume']
+
+    return volume_at_price
+
+
+def extremos_referencia(valores: pd.Series, janela: int, maximo: bool) -> np.ndarray:
+    rolagem = valores.rolling(window=janela, center=True)
+    extremo = rolagem.max() if maximo else rolagem.min()
+    mascara = np.zeros(len(valores), dtype=bool)
+    for i in range(janela, len(valores) - janela):
+        mascara[i] = valores.iloc[i] == extremo.iloc[i]
+    return mascara
+
+
+CASOS = [(n, lacunas) for n in TAMANHOS for lacunas in (False, True)]
+
+
+# ============= OBV, MFI e volume profile =============
+
+@pytest.mark.parametrize("n, lacunas", CASOS)
+def test_obv_igual_ao_loop(n, lacunas):
+    dados = ohlcv(n, lacunas)
+    assert_allclose(AnaliseTecnicaAvancada.calcular_obv(dados), obv_referencia(dados), rtol=1e-12)
+
+
+@pytest.mark.parametrize("n, lacunas", CASOS)
+def test_mfi_igual_ao_loop(n, lacunas):
+    dados = ohlcv(n, lacunas)
+    assert_allclose(AnaliseTecnicaAvancada.calcular_mfi(dados), mfi_referencia(dados), rtol=1e-9)
+
+
+@pytest.mark.parametrize("n, lacunas", CASOS)
+def test_volume_profile_igual_ao_loop(n, lacunas):
+    dados = ohlcv(n, lacunas)
+    perfil = AnaliseTecnicaAvancada.calcular_volume_profile(dados)
+    volumes = np.array([faixa['volume'] for faixa in perfil['profile']])
+    assert_allclose(volumes, volume_profile_referencia(dados), rtol=1e-12)
+
+
+def test_obv_volume_inicial_ausente_propaga():
+    dados = ohlcv(15)
+    dados.iloc[0, dados.columns.get_loc('Volume')] = np.nan
+    assert_allclose(AnaliseTecnicaAvancada.calcular_obv(dados), obv_referencia(dados))
+
+
+# ============= Extremos locais (suportes/resistências) =============
+
+@pytest.mark.parametrize("n, lacunas", CASOS)
+@pytest.mark.parametrize("janela", [3, 5, 20])
+@pytest.mark.parametrize("maximo", [True, False])
+def test_extremos_locais_igual_ao_rolling_centrado(n, lacunas, janela, maximo):
+    dados = ohlcv(n, lacunas)
+    coluna = dados['High'] if maximo else dados['Low']
+    np.testing.assert_array_equal(
+        indicadores_kernels.extremos_locais(coluna.to_numpy(), janela, maximo),
+        extremos_referencia(coluna, janela, maximo),
+    )
+
+
+def test_extremos_locais_em_matriz_igual_por_linha():
+    matriz = np.vstack([ohlcv(300, lacunas, semente)['High'].to_numpy()
+                        for semente, lacunas in enumerate([False, True, False])])
+    por_linha = np.vstack([indicadores_kernels.extremos_locais(linha, 20) for linha in matriz])
+    np.testing.assert_array_equal(indicadores_kernels.extremos_locais(matriz, 20), por_linha)
+
+
+# ============= EMA =============
+
+@pytest.mark.parametrize("n, lacunas", CASOS)
+@pytest.mark.parametrize("span", [9, 12, 26])
+def test_ema_igual_ao_ewm_com_lacunas(n, lacunas, span):
+    close = ohlcv(n, lacunas)['Close']
+    if lacunas and n > 3:
+        close.iloc[:2] = np.nan  # série que começa com NaN
+    esperado = close.ewm(span=span, adjust=False, ignore_na=False).mean()
+    assert_allclose(indicadores_kernels.ema(close.to_numpy(), span), esperado, rtol=1e-12)
+
+
+def test_ema_em_matriz_igual_por_linha():
+    matriz = np.vstack([ohlcv(300, True, semente)['Close'].to_numpy() for semente in range(4)])
+    esperado = np.vstack([pd.Series(linha).ewm(span=12, adjust=False).mean().to_numpy() for linha in matriz])
+    assert_allclose(indicadores_kernels.ema(matriz, 12), esperado, rtol=1e-12)
@@ -0,0 +1,79 @@
+"""
+Indicadores do Universo
+Matriz alinhada pela união das datas contra o cálculo por ticker do registro
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose
+
+from app.services import indicadores_registro
+from app.services.analise_tecnica_avancada import AnaliseTecnicaAvancada
+from app.services.indicadores_universo_service import MatrizUniverso
+
+from .dados import ohlcv
+
+COLUNAS = ['RSI', 'SMA_20', 'SMA_50', 'SMA_200', 'MACD', 'Signal', 'MACD_Histogram',
+           'BB_Middle', 'BB_Upper', 'BB_Lower', 'Volatility', 'Volume_SMA']
+
+
+@pytest.fixture(scope="module")
+def historicos():
+    # Calendários diferentes: cada um pula pregões que o outro teve
+    a = ohlcv(400, semente=1)
+    b = ohlcv(400, semente=2)
+    a = a.drop(a.index[5::7])
+    b = b.drop(b.index[3::11])
+    return {'AAAA3': a, 'BBBB4': b}
+
+
+@pytest.fixture(scope="module")
+def matriz(historicos):
+    return MatrizUniverso.alinhar(historicos).calcular()
+
+
+def test_uniao_das_datas(historicos, matriz):
+    assert len(matriz.datas) > max(len(dados) for dados in historicos.values())
+    assert matriz.presentes.sum(axis=1).tolist() == [len(dados) for dados in historicos.values()]
+
+
+@pytest.mark.parametrize("coluna", COLUNAS)
+def test_indicadores_iguais_ao_registro_por_ticker(historicos, matriz, coluna):
+    for linha, (ticker, dados) in enumerate(historicos.items()):
+        esperado = indicadores_registro.calcular(dados, [coluna])[coluna]
+        presentes = matriz.presentes[linha]
+        assert_allclose(matriz.indicadores[coluna][linha, presentes], esperado, rtol=1e-9, atol=1e-9)
+        assert np.isnan(matriz.indicadores[coluna][linha, ~presentes]).all()
+
+
+def test_sma_200_nao_fica_nan_pelas_lacunas_da_uniao(historicos, matriz):
+    for linha, dados in enumerate(historicos.values()):
+        validos = ~np.isnan(matriz.indicadores['SMA_200'][linha])
+        assert validos.sum() == len(dados) - 199
+
+
+def test_ultimos_usa_a_ultima_barra_de_cada_ticker(historicos, matriz):
+    tabela = matriz.ultimos()
+    for ticker, dados in historicos.items():
+        assert tabela.loc[ticker, 'data'] == dados.index[-1]
+        assert tabela.loc[ticker, 'Close'] == dados['Close'].iloc[-1]
+        esperado = indicadores_registro.calcular(dados, ['SMA_200'])['SMA_200'].iloc[-1]
+        assert tabela.loc[ticker, 'SMA_200'] == pytest.approx(esperado, rel=1e-12)
+
+
+def test_universo_vazio():
+    matriz = MatrizUniverso.alinhar({'VAZIO3': pd.DataFrame()}).calcular()
+    assert matriz.tickers == []
+    assert matriz.ultimos().empty
+
+
+@pytest.mark.parametrize("tipo, chave", [('resistencia', 'resistencias_detalhe'), ('suporte', 'suportes_detalhe')])
+def test_suportes_resistencias_iguais_ao_detector_por_ticker(historicos, matriz, tipo, chave):
+    niveis = matriz.suportes_resistencias()
+    for ticker, dados in historicos.items():
+        esperado = AnaliseTecnicaAvancada.detectar_suportes_resistencias(dados)[chave]
+        do_ticker = niveis[(niveis['ticker'] == ticker) & (niveis['tipo'] == tipo)]
+        assert len(do_ticker) == len(esperado) == 5
+        obtido = sorted(zip(do_ticker['nivel'].round(2), do_ticker['toques'], do_ticker['volume']), reverse=True)
+        assert obtido == [(n['nivel'], n['toques'], n['volume']) for n in esperado]
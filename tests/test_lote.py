@@ -0,0 +1,118 @@
+"""
+Lote de Análises
+POST /api/b3/batch contra os endpoints individuais, uma busca por (ticker, período) e falhas isoladas
+"""
+
+import zlib
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import main
+from app.services import indicadores_registro
+from app.services.b3_async_service import b3_async_service
+from app.services.historico_service import HistoricoService
+
+from .dados import ohlcv
+
+ENDPOINTS = {
+    'score': '/api/b3/analise/score/{}',
+    'padroes': '/api/b3/analise/padroes/{}',
+    'fibonacci': '/api/b3/analise/fibonacci/{}',
+    'volume_profile': '/api/b3/analise/volume-profile/{}',
+    'indicadores_avancados': '/api/b3/analise/indicadores-avancados/{}',
+}
+
+
+@pytest.fixture
+def buscas(monkeypatch):
+    chamadas = []
+
+    async def buscar_dados_acao(ticker, periodo='1y', indicadores=None, intervalo='1d'):
+        chamadas.append((ticker, periodo, tuple(indicadores)))
+        if ticker.startswith('FALHA'):
+            raise RuntimeError("provedor fora do ar")
+        if ticker.startswith('VAZIO'):
+            return ohlcv(0)
+        historico = ohlcv(600, semente=zlib.crc32(ticker.encode()))
+        # Termina hoje: os períodos são recortados a partir da data atual
+        historico.index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=len(historico))
+        return HistoricoService.fatiar(indicadores_registro.calcular(historico, indicadores), periodo)
+
+    async def buscar_info_acao(ticker):
+        return {'ticker': ticker, 'nome': ticker, 'preco_atual': 10.0}
+
+    monkeypatch.setattr(b3_async_service, 'buscar_dados_acao', buscar_dados_acao)
+    monkeypatch.setattr(b3_async_service, 'buscar_info_acao', buscar_info_acao)
+    return chamadas
+
+
+@pytest.fixture
+def cliente():
+    # Sem o bloco with: os eventos de startup (agendador) não rodam
+    return TestClient(main.app)
+
+
+def sem_timestamp(corpo):
+    return {chave: valor for chave, valor in corpo.items() if chave != 'timestamp'}
+
+
+def test_uma_busca_por_ticker_e_periodo(cliente, buscas):
+    resposta = cliente.post("/api/b3/batch", json={'itens': [
+        {'ticker': 'AAAA3', 'analises': ['acao', 'score']},
+        {'ticker': ' aaaa3 ', 'analises': ['score', 'fibonacci']},
+        {'ticker': 'BBBB4', 'analises': ['padroes', 'volume_profile'], 'periodo': '3mo'},
+    ]})
+    assert resposta.status_code == 200
+
+    assert sorted((ticker, periodo) for ticker, periodo, _ in buscas) == [
+        ('AAAA3', '1y'), ('AAAA3', '3mo'), ('BBBB4', '3mo'),
+    ]
+    indicadores = {(ticker, periodo): set(colunas) for ticker, periodo, colunas in buscas}
+    assert indicadores[('AAAA3', '3mo')] == set(main.INDICADORES_SCORE)
+    assert indicadores[('BBBB4', '3mo')] == set(main.INDICADORES_PADROES)
+
+    resultados = resposta.json()['resultados']
+    assert resposta.json()['total_tickers'] == 2
+    assert set(resultados['AAAA3']) == {'acao', 'score', 'fibonacci'}
+    assert set(resultados['BBBB4']) == {'padroes', 'volume_profile'}
+
+
+@pytest.mark.parametrize("analise", list(ENDPOINTS))
+def test_mesmo_corpo_do_endpoint_individual(cliente, buscas, analise):
+    lote = cliente.post("/api/b3/batch", json={'itens': [
+        {'ticker': 'CCCC3', 'analises': ['acao', 'score', 'padroes', 'fibonacci',
+                                         'volume_profile', 'indicadores_avancados']},
+    ]}).json()['resultados']['CCCC3'][analise]
+    individual = cliente.get(ENDPOINTS[analise].format('CCCC3'), headers={'Accept-Encoding': 'identity'}).json()
+    assert sem_timestamp(lote) == sem_timestamp(individual)
+
+
+def test_acao_igual_ao_endpoint_em_linhas(cliente, buscas):
+    lote = cliente.post("/api/b3/batch", json={'itens': [{'ticker': 'DDDD3', 'analises': ['acao']}]})
+    acao = lote.json()['resultados']['DDDD3']['acao']
+    individual = cliente.get("/api/b3/acao/DDDD3", params={'formato': 'linhas'}).json()
+    for campo in ('ticker', 'info', 'dados', 'periodo', 'intervalo', 'formato', 'cursor', 'total_registros'):
+        assert acao[campo] == individual[campo], campo
+
+
+def test_ticker_com_falha_nao_derruba_o_lote(cliente, buscas):
+    resposta = cliente.post("/api/b3/batch", json={'itens': [
+        {'ticker': 'FALHA3', 'analises': ['score', 'fibonacci']},
+        {'ticker': 'VAZIO3', 'analises': ['acao']},
+        {'ticker': 'EEEE3', 'analises': ['score']},
+    ]})
+    assert resposta.status_code == 200
+    resultados = resposta.json()['resultados']
+    assert resultados['FALHA3'] == {'score': {'erro': 'provedor fora do ar'},
+                                    'fibonacci': {'erro': 'provedor fora do ar'}}
+    assert 'não encontrada' in resultados['VAZIO3']['acao']['erro']
+    assert 'erro' not in resultados['EEEE3']['score']
+    assert resultados['EEEE3']['score']['score'] is not None
+
+
+def test_analise_desconhecida_e_422(cliente, buscas):
+    resposta = cliente.post("/api/b3/batch", json={'itens': [{'ticker': 'AAAA3', 'analises': ['tudo']}]})
+    assert resposta.status_code == 422
+    assert buscas == []
@@ -0,0 +1,77 @@
+"""
+Market Cap do Heatmap
+Metadados gravados sem rede, poucos Ticker.info para os tickers frios e peso estimado para o resto
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import b3_data_service as modulo
+from app.services.b3_data_service import b3_service
+from app.services.metadados_service import MetadadosService
+
+
+@pytest.fixture
+def metadados(tmp_path, monkeypatch):
+    servico = MetadadosService(tmp_path / "metadados.json")
+    monkeypatch.setattr(modulo, 'metadados_service', servico)
+    return servico
+
+
+@pytest.fixture
+def buscas(metadados, monkeypatch):
+    chamadas = []
+
+    def buscar_metadados(ticker):
+        chamadas.append(ticker)
+        return metadados.obter(ticker, lambda: {'marketCap': 1e9, 'sharesOutstanding': 1e8})
+
+    monkeypatch.setattr(b3_service, 'buscar_metadados', buscar_metadados)
+    monkeypatch.setattr(modulo, 'MAX_MARKET_CAPS_FRIOS', 3)
+    return chamadas
+
+
+def snapshot(n):
+    tickers = [f"T{i:03d}3.SA" for i in range(n)]
+    return pd.DataFrame({
+        'preco_atual': np.linspace(10, 20, n),
+        'volume': np.arange(1, n + 1) * 1e5,
+    }, index=tickers)
+
+
+def test_so_os_frios_de_maior_volume_buscam_info(metadados, buscas):
+    dados = snapshot(170)
+    # Gravado (mesmo vencido): ações em circulação x preço do snapshot; sem ações, o market cap gravado
+    metadados._metadados['T0003.SA'] = {'acoes_em_circulacao': 5e8, 'market_cap': 1.0, 'valido_ate': '2000-01-01'}
+    metadados._metadados['T0013.SA'] = {'acoes_em_circulacao': 0, 'market_cap': 7e9, 'valido_ate': '2000-01-01'}
+
+    market_caps, estimado = b3_service._buscar_market_caps(dados)
+
+    assert buscas == ['T1693.SA', 'T1683.SA', 'T1673.SA']
+    assert market_caps['T0003.SA'] == 5e8 * dados.loc['T0003.SA', 'preco_atual']
+    assert market_caps['T0013.SA'] == 7e9
+    assert market_caps['T1693.SA'] == 1e8 * dados.loc['T1693.SA', 'preco_atual']
+    assert estimado.sum() == 170 - 5
+    assert not estimado[['T0003.SA', 'T0013.SA', *buscas]].any()
+
+    # Estimados: volume financeiro na escala mediana dos conhecidos, sempre positivos
+    assert (market_caps[estimado] > 0).all()
+    financeiro = dados['preco_atual'] * dados['volume']
+    razoes = (market_caps / financeiro)[estimado]
+    assert np.allclose(razoes, razoes.iloc[0])
+
+
+def test_segunda_chamada_nao_busca_de_novo(metadados, buscas):
+    dados = snapshot(20)
+    b3_service._buscar_market_caps(dados)
+    b3_service._buscar_market_caps(dados)
+    assert len(buscas) == 6 and len(set(buscas)) == 6
+
+
+def test_sem_nenhum_conhecido_o_peso_e_o_volume_financeiro(metadados, monkeypatch):
+    monkeypatch.setattr(modulo, 'MAX_MARKET_CAPS_FRIOS', 0)
+    dados = snapshot(5)
+    market_caps, estimado = b3_service._buscar_market_caps(dados)
+    assert estimado.all()
+    pd.testing.assert_series_equal(market_caps, dados['preco_atual'] * dados['volume'], check_names=False)
@@ -0,0 +1,93 @@
+"""
+Memo de Indicadores
+Limite por bytes, estimativa de tamanho das respostas, relatório por entrada e resposta igual com ou sem acerto
+"""
+
+import sys
+
+import pandas as pd
+import pytest
+
+from app.api import serializacao
+from app.services import b3_data_service, indicadores_registro
+from app.services.b3_data_service import b3_service
+from app.services.memo_indicadores_service import MemoIndicadoresService, _tamanho, impressao
+
+from .dados import ohlcv
+
+
+def tamanho_real(valor) -> int:
+    """Percorre todos os valores (a estimativa só amostra as listas)"""
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamanho += sum(tamanho_real(v) for v in valor.values())
+    elif isinstance(valor, list):
+        tamanho += sum(tamanho_real(v) for v in valor)
+    return tamanho
+
+
+def test_estimativa_das_respostas_em_linhas():
+    frame = indicadores_registro.calcular(ohlcv(1000), indicadores_registro.todas_colunas())
+    registros = serializacao.registros(serializacao.colunas(frame, serializacao.CAMPOS_ACAO))
+    assert 0.8 < _tamanho(registros) / tamanho_real(registros) < 1.25
+
+
+def test_descarta_as_menos_recentes_pelo_teto_de_bytes():
+    valor = [{'fechamento': float(i), 'volume': i} for i in range(1000)]
+    tamanho = _tamanho(valor)
+    memo = MemoIndicadoresService(max_bytes=int(tamanho * 2.5))
+    marca = impressao(ohlcv(5))
+
+    for chave in ('a', 'b', 'c'):
+        memo.guardar(chave, marca, valor)
+    assert memo.obter('a', marca) is None
+    assert memo.obter('b', marca) is valor and memo.obter('c', marca) is valor
+    assert memo.bytes == 2 * tamanho <= memo.max_bytes
+
+    # Substituir a mesma chave não conta o valor duas vezes
+    memo.guardar('c', marca, valor)
+    assert memo.bytes == 2 * tamanho
+
+
+def test_valor_maior_que_o_teto_nao_entra():
+    memo = MemoIndicadoresService(max_bytes=1024)
+    marca = impressao(ohlcv(5))
+    memo.guardar('pequeno', marca, {'a': 1})
+    memo.guardar('grande', marca, list(range(10_000)))
+    assert memo.obter('grande', marca) is None
+    assert memo.obter('pequeno', marca) == {'a': 1}
+    assert memo.estatisticas()['descartes'] == 1
+
+
+def test_tamanhos_lista_todas_as_entradas():
+    memo = MemoIndicadoresService()
+    dados = ohlcv(50)
+    marca = impressao(dados)
+    memo.guardar_frame('PETR4', '5y', marca, dados)
+    memo.guardar(('acao', 'PETR4', '1y', '1d', 'linhas', None), marca, [{'x': 1.0}] * 10)
+    memo.guardar(('ibovespa', '1y', None), marca, {'dados': [1.0] * 10})
+
+    tamanhos = memo.tamanhos()
+    assert list(tamanhos) == ['frame/PETR4/5y/1d', 'acao/PETR4/1y/1d/linhas/None', 'ibovespa/1y/None']
+    assert tamanhos['frame/PETR4/5y/1d'] == int(dados.memory_usage(index=True, deep=True).sum())
+    estatisticas = memo.estatisticas()
+    assert estatisticas['bytes'] == sum(tamanhos.values())
+    assert estatisticas['frames'] == 1 and estatisticas['bytes_frames'] == tamanhos['frame/PETR4/5y/1d']
+
+
+@pytest.mark.parametrize("compacto", [False, True])
+@pytest.mark.parametrize("intervalo", ['1d', '1wk'])
+def test_primeira_resposta_igual_as_do_memo(monkeypatch, compacto, intervalo):
+    historico = ohlcv(300, semente=7)
+    monkeypatch.setattr(b3_data_service, 'memo_indicadores_service', MemoIndicadoresService(compacto=compacto))
+    monkeypatch.setattr(b3_data_service.historico_service, 'obter', lambda *args: historico)
+
+    def resposta():
+        frame, _ = b3_service._historico_com_indicadores('TEST3.SA', '2y', intervalo=intervalo)
+        return frame, serializacao.resposta_json(serializacao.colunas(frame, serializacao.CAMPOS_ACAO)).body
+
+    frame_fresco, corpo_fresco = resposta()
+    frame_memo, corpo_memo = resposta()
+    pd.testing.assert_frame_equal(frame_fresco, frame_memo, check_exact=True)
+    assert corpo_fresco == corpo_memo
+    assert impressao(frame_fresco) == impressao(frame_memo)
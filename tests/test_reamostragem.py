@@ -0,0 +1,27 @@
+"""
+Reamostragem de Históricos
+Recorte das barras agregadas pelos pregões dos períodos curtos
+"""
+
+import pytest
+
+from app.services import reamostragem
+
+from .dados import ohlcv
+
+
+@pytest.mark.parametrize("n, intervalo, periodo, barras", [
+    (29, '1wk', '1d', 1),  # termina numa segunda-feira
+    (29, '1wk', '5d', 2),  # segunda + terça a sexta da semana anterior
+    (28, '1wk', '5d', 1),  # sexta: os 5 pregões cabem numa semana
+    (25, '1mo', '5d', 2),  # 29/01 a 04/02
+])
+def test_periodos_em_pregoes_incluem_todas_as_barras(n, intervalo, periodo, barras):
+    diario = ohlcv(n)
+    agregado = reamostragem.reamostrar(diario, intervalo)
+    recorte = reamostragem.fatiar(agregado, periodo, diario.index)
+    assert len(recorte) == barras
+    assert recorte.index[-1] == agregado.index[-1]
+
+    sessoes = diario.index[-reamostragem.PERIODOS_BARRAS[periodo]:]
+    assert recorte['Volume'].sum() >= diario.loc[sessoes, 'Volume'].sum()
@@ -0,0 +1,117 @@
+"""
+Serialização das Respostas da API
+Colunas e registros com lacunas, JSON com e sem orjson e Arrow IPC com várias séries
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.api import serializacao
+
+from .dados import ohlcv
+
+
+def ler_arrow(resposta):
+    leitor = pa.ipc.open_stream(resposta.body)
+    return leitor.read_all(), json.loads(leitor.schema.metadata[b"metadados"])
+
+
+def test_arrow_unifica_tipos_entre_series():
+    com_lacuna = ohlcv(30, semente=1)
+    com_lacuna.iloc[5, com_lacuna.columns.get_loc('Volume')] = np.nan
+    series = {
+        'PETR4': serializacao.colunas_numpy(ohlcv(20), serializacao.CAMPOS_ACAO),
+        'VALE3': serializacao.colunas_numpy(com_lacuna, serializacao.CAMPOS_ACAO),
+    }
+    # Volume sem lacunas sai int64; com lacuna, float64
+    assert series['PETR4']['volume'].dtype == np.int64
+    assert series['VALE3']['volume'].dtype == np.float64
+
+    tabela, metadados = ler_arrow(serializacao.resposta_binaria(
+        serializacao.MIME_ARROW, series, {'periodo': '1y'}, rotulo='ticker'
+    ))
+    assert metadados == {'periodo': '1y'}
+    assert tabela.schema.field('volume').type == pa.float64()
+    assert tabela.num_rows == 50
+    assert tabela.column('ticker').to_pylist() == ['PETR4'] * 20 + ['VALE3'] * 30
+    volume = tabela.column('volume').to_numpy(zero_copy_only=False)
+    np.testing.assert_array_equal(volume[:20], series['PETR4']['volume'])
+    np.testing.assert_array_equal(volume[20:], series['VALE3']['volume'])
+
+
+def test_arrow_completa_campos_ausentes_com_nulos():
+    indice = pd.bdate_range('2024-01-01', periods=3)
+    series = {
+        'A': {'data': indice, 'fechamento': np.array([1.0, 2.0, 3.0]), 'volume': np.array([1, 2, 3])},
+        'B': {'data': indice, 'fechamento': np.array([4.0, 5.0, 6.0])},
+    }
+    tabela, _ = ler_arrow(serializacao.resposta_binaria(serializacao.MIME_ARROW, series, {}, rotulo='ticker'))
+    assert tabela.column('volume').to_pylist() == [1, 2, 3, None, None, None]
+    assert tabela.column('fechamento').to_pylist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+
+def frame_com_lacunas():
+    dados = ohlcv(6, semente=3)
+    dados['RSI'] = [np.nan, 55.5, np.inf, 40.0, -np.inf, 60.0]
+    dados.iloc[2, dados.columns.get_loc('Volume')] = np.nan
+    dados.iloc[4, dados.columns.get_loc('Close')] = np.nan
+    return dados
+
+
+def test_colunas_e_registros_trocam_nan_e_inf_por_null():
+    dados = frame_com_lacunas()
+    por_campo = serializacao.colunas(dados, serializacao.CAMPOS_ACAO)
+    linhas = serializacao.registros(por_campo)
+
+    assert [linha['rsi'] for linha in linhas] == [None, 55.5, None, 40.0, None, 60.0]
+    assert linhas[4]['fechamento'] is None
+    # Coluna ausente do frame: null em todas as linhas
+    assert {linha['sma_200'] for linha in linhas} == {None}
+    assert [linha['data'] for linha in linhas] == por_campo['data']
+    assert list(linhas[0]) == ['data'] + [campo for campo, _ in serializacao.CAMPOS_ACAO]
+
+    # Formato colunas: os mesmos valores, coluna a coluna
+    assert serializacao.lista(por_campo['rsi']) == [linha['rsi'] for linha in linhas]
+
+
+def test_volume_inteiro_com_none_nas_lacunas():
+    dados = frame_com_lacunas()
+    linhas = serializacao.registros(serializacao.colunas(dados, serializacao.CAMPOS_ACAO))
+    volumes = [linha['volume'] for linha in linhas]
+    assert volumes[2] is None
+    assert all(type(v) is int for i, v in enumerate(volumes) if i != 2)
+    assert volumes == [None if i == 2 else int(v) for i, v in enumerate(dados['Volume'])]
+
+    sem_lacunas = serializacao.registros(serializacao.colunas(ohlcv(5), serializacao.CAMPOS_ACAO))
+    assert all(type(linha['volume']) is int for linha in sem_lacunas)
+
+
+def test_lista_preserva_tipos_nao_float():
+    assert serializacao.lista(np.array([1, 2, 3])) == [1, 2, 3]
+    assert serializacao.lista(np.array([1.5, np.nan, -np.inf])) == [1.5, None, None]
+    assert serializacao.lista(np.array([], dtype=float)) == []
+
+
+def test_resposta_json_igual_com_e_sem_orjson(monkeypatch):
+    dados = frame_com_lacunas()
+    conteudo = {
+        'ticker': 'PETR4',
+        'total': np.int64(6),
+        'variacao': np.float64(np.nan),
+        'maximo': np.float32(1.5),
+        'ativo': np.bool_(True),
+        'colunas': serializacao.colunas(dados, serializacao.CAMPOS_ACAO),
+        'registros': serializacao.registros(serializacao.colunas(dados, serializacao.CAMPOS_ACAO)),
+        'aninhado': [{'valores': np.array([1.0, np.inf])}, (np.int32(2), None)],
+    }
+    com_orjson = serializacao.resposta_json(conteudo, status_code=201)
+    monkeypatch.setattr(serializacao, 'orjson', None)
+    sem_orjson = serializacao.resposta_json(conteudo, status_code=201)
+
+    assert com_orjson.status_code == sem_orjson.status_code == 201
+    assert com_orjson.media_type == sem_orjson.media_type == 'application/json'
+    assert json.loads(com_orjson.body) == json.loads(sem_orjson.body)
+    assert json.loads(sem_orjson.body)['colunas']['rsi'] == [None, 55.5, None, 40.0, None, 60.0]
@@ -0,0 +1,135 @@
+"""
+Registro do Universo de Tickers
+Códigos de negociação aceitos e backoff do cache negativo
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import universo_service as modulo
+from app.services.universo_service import ESPERA_BASE, ESPERA_MAXIMA, UniversoService
+
+INICIO = datetime(2025, 3, 10, 11, 0)
+
+
+class Relogio(datetime):
+    """datetime com now() controlado pelo teste"""
+    atual = INICIO
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.atual
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    Relogio.atual = INICIO
+    monkeypatch.setattr(modulo, 'datetime', Relogio)
+    return Relogio
+
+
+@pytest.fixture
+def universo(tmp_path, relogio):
+    return UniversoService(['PETR4', 'VALE3', 'TAEE11'], {}, arquivo=tmp_path / 'inativos.json')
+
+
+@pytest.mark.parametrize('bruto, esperado', [
+    ('PETR4', 'PETR4.SA'),
+    ('petr4', 'PETR4.SA'),
+    (' Vale3 ', 'VALE3.SA'),
+    ('PETR4.SA', 'PETR4.SA'),
+    ('petr4.sa', 'PETR4.SA'),
+    ('TAEE11', 'TAEE11.SA'),   # units
+    ('BOVA11', 'BOVA11.SA'),   # ETFs
+    ('B3SA3', 'B3SA3.SA'),     # dígito no radical
+])
+def test_codigos_validos(bruto, esperado):
+    assert UniversoService.normalizar(bruto) == esperado
+
+
+@pytest.mark.parametrize('bruto', [
+    'PETR4F',      # mercado fracionário
+    'TAEE11F',
+    'PETR',        # sem número
+    'PET4',        # radical curto
+    'PETRO4',      # radical longo
+    'PETR123',     # três dígitos
+    '^BVSP',       # índice
+    'BRL=X',       # câmbio
+    'PETR4.F',
+    '',
+])
+def test_codigos_invalidos(bruto):
+    assert UniversoService.normalizar(bruto) is None
+
+
+def test_universo_deduplica_e_descarta_invalidos(tmp_path):
+    universo = UniversoService(['PETR4', 'petr4.sa', 'PETR4F', 'VALE3', ' vale3'],
+                               {'Petróleo': ['petr4', 'PETR4F'], 'Mineração': ['VALE3.SA']},
+                               arquivo=tmp_path / 'inativos.json')
+    assert universo.tickers == ['PETR4.SA', 'VALE3.SA']
+    assert universo.setor('PETR4') == 'Petróleo'
+    assert universo.setor('PETR4F') == 'Outros'
+    assert universo.setor_por_ticker() == {'PETR4.SA': 'Petróleo', 'VALE3.SA': 'Mineração'}
+
+
+def test_backoff_dobra_ate_o_teto(universo, relogio):
+    esperas = []
+    for _ in range(12):
+        universo.registrar_falha('PETR4.SA')
+        entrada = universo.inativos()['PETR4.SA']
+        esperas.append(datetime.fromisoformat(entrada['proxima_tentativa']) - relogio.atual)
+
+    assert esperas[:8] == [ESPERA_BASE * 2 ** i for i in range(8)]  # 1h ... 128h
+    assert esperas[8:] == [ESPERA_MAXIMA] * 4
+    assert universo.inativos()['PETR4.SA']['falhas'] == 12
+
+
+def test_ticker_em_espera_sai_dos_ativos_ate_a_proxima_tentativa(universo, relogio):
+    universo.registrar_falha('PETR4.SA')
+    universo.registrar_falha('PETR4.SA')  # 2h
+    assert universo.ativos() == ['VALE3.SA', 'TAEE11.SA']
+
+    relogio.atual = INICIO + timedelta(hours=2) - timedelta(seconds=1)
+    assert 'PETR4.SA' not in universo.ativos()
+    relogio.atual = INICIO + timedelta(hours=2)
+    assert universo.ativos() == ['PETR4.SA', 'VALE3.SA', 'TAEE11.SA']
+    # Liberado para nova tentativa, mas o histórico de falhas continua
+    assert universo.inativos()['PETR4.SA']['falhas'] == 2
+
+
+def test_sucesso_zera_o_backoff(universo, relogio):
+    for _ in range(5):
+        universo.registrar_falha('VALE3.SA')
+    universo.registrar_sucesso('VALE3.SA')
+    assert universo.inativos() == {}
+    assert 'VALE3.SA' in universo.ativos()
+
+    universo.registrar_falha('VALE3.SA')
+    entrada = universo.inativos()['VALE3.SA']
+    assert entrada['falhas'] == 1
+    assert datetime.fromisoformat(entrada['proxima_tentativa']) - relogio.atual == ESPERA_BASE
+
+
+def test_ticker_fora_do_universo_nao_entra_no_cache(universo):
+    universo.registrar_falha('ITUB4.SA')
+    universo.registrar_sucesso('ITUB4.SA')
+    assert universo.inativos() == {}
+
+
+def test_cache_negativo_sobrevive_ao_reinicio(tmp_path, relogio):
+    arquivo = tmp_path / 'inativos.json'
+    universo = UniversoService(['PETR4', 'VALE3'], {}, arquivo=arquivo)
+    for _ in range(3):
+        universo.registrar_falha('PETR4.SA')
+
+    reiniciado = UniversoService(['PETR4', 'VALE3'], {}, arquivo=arquivo)
+    assert reiniciado.inativos() == universo.inativos()
+    assert reiniciado.ativos() == ['VALE3.SA']
+
+    # O backoff continua de onde parou
+    reiniciado.registrar_falha('PETR4.SA')
+    entrada = reiniciado.inativos()['PETR4.SA']
+    assert entrada['falhas'] == 4
+    assert datetime.fromisoformat(entrada['proxima_tentativa']) - relogio.atual == ESPERA_BASE * 8